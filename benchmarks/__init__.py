@@ -0,0 +1,5 @@
+"""Benchmarks package.
+
+Synthetic data generation and an endpoint benchmark runner that drives
+every route through the Flask test client. See `benchmarks.run`.
+"""
@@ -0,0 +1,257 @@
+"""Synthetic data generator for benchmarks.
+
+Seeds `User`, `Contract` and `Order` rows with realistic distributions:
+- Airports are drawn with hub-heavy (Zipf-like) weights.
+- Order dates follow a weekly and seasonal pattern over one year.
+- Cargo weight is log-normal, volume correlates with weight.
+- Cargo types, currencies and payment statuses use skewed weights.
+
+Rows are generated lazily and written in chunks with Core executemany
+inserts, so seeding 10M orders keeps memory flat. Exchange rates are
+stored, normalized prices computed in SQL and the per-user order
+summaries rebuilt afterwards.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from database.rates import normalize_prices, rate_table, store_rates
+from database.summaries import rebuild_summaries
+from model.dbModels import (
+    CargoTypeEnum, Contract, ContractStatusEnum, CurrencyEnum, Order,
+    PaymentStatusEnum, User, UserTypeEnum
+)
+
+BENCH_PASSWORD = "benchmark1"
+
+# (IATA code, city), roughly ordered by cargo volume.
+AIRPORTS = [
+    ("HKG", "Hong Kong"), ("MEM", "Memphis"), ("PVG", "Shanghai"),
+    ("ANC", "Anchorage"), ("ICN", "Seoul"), ("SDF", "Louisville"),
+    ("DOH", "Doha"), ("TPE", "Taipei"), ("NRT", "Tokyo"),
+    ("LAX", "Los Angeles"), ("DXB", "Dubai"), ("FRA", "Frankfurt"),
+    ("CDG", "Paris"), ("MIA", "Miami"), ("SIN", "Singapore"),
+    ("ORD", "Chicago"), ("LEJ", "Leipzig"), ("CAN", "Guangzhou"),
+    ("PEK", "Beijing"), ("AMS", "Amsterdam"), ("LHR", "London"),
+    ("JFK", "New York"), ("LGG", "Liege"), ("CGN", "Cologne"),
+    ("IST", "Istanbul"), ("SVO", "Moscow"), ("BTS", "Bratislava"),
+    ("VIE", "Vienna"), ("MUC", "Munich"), ("LED", "Saint Petersburg"),
+]
+AIRPORT_WEIGHTS = [1 / (rank + 1) ** 0.8 for rank in range(len(AIRPORTS))]
+
+AIRCRAFT = ["B747-8F", "B777F", "B767-300F", "A330-200F", "B737-800BCF",
+            "An-124", "A321P2F", "ATR 72F"]
+
+CARGO_TYPES = list(CargoTypeEnum)
+CARGO_WEIGHTS = [60, 12, 6, 10, 9, 3]
+
+CURRENCIES = list(CurrencyEnum)
+CURRENCY_WEIGHTS = [55, 30, 5, 6, 4]
+
+PAYMENT_STATUSES = list(PaymentStatusEnum)
+PAYMENT_WEIGHTS = [50, 20, 6, 5, 3, 8, 3, 3, 2]
+
+
+def _order_date(rng, start, days):
+    # Weekday traffic is higher than weekend traffic and there is a
+    # mild seasonal peak towards the end of the year.
+    while True:
+        offset = rng.random() * days
+        moment = start + timedelta(days=offset)
+        weekday = 1.0 if moment.weekday() < 5 else 0.55
+        season = 0.8 + 0.2 * math.sin(2 * math.pi * (offset / 365 - 0.5))
+        if rng.random() < weekday * season:
+            return moment.replace(microsecond=0)
+
+
+def _cargo(rng):
+    weight = round(min(rng.lognormvariate(2.3, 0.9), 120.0), 2)
+    volume = round(weight * rng.uniform(4.0, 8.0), 2)
+    return rng.choices(CARGO_TYPES, CARGO_WEIGHTS)[0], weight, volume
+
+
+def generate_users(count, password_hash, seed=0):
+    """
+    Yield user rows as dictionaries.
+
+    Every user shares the same password hash (of `BENCH_PASSWORD`) so
+    that seeding does not spend time in bcrypt.
+    """
+    rng = random.Random(seed)
+    user_types = list(UserTypeEnum)
+    for number in range(1, count + 1):
+        yield {
+            "id": number,
+            "email": f"user{number}@bench.example",
+            "fullName": f"Bench User {number}",
+            "company": f"Company {number % 997}",
+            "userType": rng.choice(user_types),
+            "userRep": round(rng.uniform(30, 100), 2),
+            "password": password_hash,
+        }
+
+
+def generate_contracts(count, users, start, seed=0):
+    """Yield contract rows between random pairs of users."""
+    rng = random.Random(seed + 1)
+    statuses = list(ContractStatusEnum)
+    for number in range(1, count + 1):
+        charterer, carrier = rng.sample(range(1, users + 1), 2)
+        signed = start + timedelta(days=rng.randint(0, 365))
+        yield {
+            "id": number,
+            "chartererId": charterer,
+            "carrierId": carrier,
+            "contractDate": signed,
+            "effectiveFrom": signed,
+            "effectiveTo": signed + timedelta(days=rng.choice([90, 180, 365])),
+            "contractStatus": rng.choices(statuses, [2, 7, 1])[0],
+            "contractFileUrl": None,
+            "termsSummary": None,
+            "createdAt": signed,
+        }
+
+
+def generate_orders(count, users, contracts, start, days=365, seed=0):
+    """
+    Yield order rows as dictionaries.
+
+    Args:
+        count (int): Number of orders.
+        users (int): Number of seeded users (ids 1..users).
+        contracts (int): Number of seeded contracts (ids 1..contracts).
+        start (datetime): First possible order date.
+        days (int): Length of the date range.
+        seed (int): Random seed.
+    """
+    rng = random.Random(seed + 2)
+    # A few large brokers own a big share of the orders.
+    owner_weights = [1 / (rank + 1) ** 0.6 for rank in range(users)]
+    owners = rng.choices(
+        range(1, users + 1), owner_weights, k=min(count, 100000)
+    )
+    for number in range(1, count + 1):
+        (dep_code, dep_city), (arr_code, arr_city) = _route(rng)
+        order_date = _order_date(rng, start, days)
+        departure = order_date + timedelta(hours=rng.randint(12, 24 * 21))
+        arrival = departure + timedelta(hours=rng.randint(2, 16))
+        dep_type, dep_weight, dep_volume = _cargo(rng)
+        round_trip = rng.random() < 0.3
+        if round_trip:
+            arr_type, arr_weight, arr_volume = _cargo(rng)
+        else:
+            arr_type, arr_weight, arr_volume = dep_type, 0.0, 0.0
+        owner = owners[number % len(owners)]
+        partner = rng.randint(1, users)
+        if partner == owner:
+            partner = partner % users + 1
+        yield {
+            "userId": owner,
+            "orderNumber": number,
+            "orderDate": order_date,
+            "partnerUser": partner,
+            "aircraftType": rng.choice(AIRCRAFT),
+            "flightNumber": f"{dep_code[:2]}{rng.randint(100, 9999)}",
+            "departureDate": departure,
+            "departureCity": dep_city,
+            "departureAirport": dep_code,
+            "departureCargoType": dep_type,
+            "departureCargoWeight": dep_weight,
+            "departureCargoVolume": dep_volume,
+            "arrivalDate": arrival,
+            "arrivalCity": arr_city,
+            "arrivalAirport": arr_code,
+            "arrivalCargoType": arr_type,
+            "arrivalCargoWeight": arr_weight,
+            "arrivalCargoVolume": arr_volume,
+            "roundTrip": round_trip,
+            "orderPrice": round(dep_weight * rng.uniform(900, 2500), 2),
+            "orderCurrency": rng.choices(CURRENCIES, CURRENCY_WEIGHTS)[0],
+            "paymentStatus": rng.choices(PAYMENT_STATUSES, PAYMENT_WEIGHTS)[0],
+            "contractOrder": rng.randint(1, contracts)
+            if contracts and rng.random() < 0.4 else None,
+            "orderStatus": rng.choice(["open", "open", "confirmed", "closed"]),
+            "isEmptyLegMatch": rng.random() < 0.1,
+        }
+
+
+def _route(rng):
+    departure, arrival = rng.choices(AIRPORTS, AIRPORT_WEIGHTS, k=2)
+    while arrival == departure:
+        arrival = rng.choices(AIRPORTS, AIRPORT_WEIGHTS)[0]
+    return departure, arrival
+
+
+def _insert_chunks(engine, table, rows, chunk_size):
+    # One transaction per chunk keeps transactions short at 10M rows.
+    chunk = []
+    written = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            with engine.begin() as connection:
+                connection.execute(insert(table), chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+        written += len(chunk)
+    return written
+
+
+def _sync_sequences(engine, tables):
+    # Ids were inserted explicitly; move Postgres sequences past them so
+    # later inserts (e.g. signups during the benchmark) do not collide.
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in tables:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+            ))
+
+
+def seed(engine, orders, users=None, contracts=None, password_hash=None,
+         chunk_size=5000, seed=0, progress=None):
+    """
+    Seed a database with synthetic users, contracts and orders.
+
+    Args:
+        engine (Engine): Target database engine (schema must exist).
+        orders (int): Number of orders, e.g. 10_000 to 10_000_000.
+        users (int | None): Number of users (default: orders / 50,
+            at least 20).
+        contracts (int | None): Number of contracts (default: users).
+        password_hash (str): bcrypt hash stored for every user.
+        chunk_size (int): Rows per executemany.
+        seed (int): Random seed, for reproducible data sets.
+        progress (callable | None): Called with `(table, rows_written)`.
+
+    Returns:
+        dict: Number of rows written per table.
+    """
+    users = users or max(orders // 50, 20)
+    contracts = contracts if contracts is not None else users
+    start = datetime(2025, 1, 1)
+    written = {}
+    plan = [
+        (User.__table__, generate_users(users, password_hash, seed)),
+        (Contract.__table__, generate_contracts(contracts, users, start, seed)),
+        (Order.__table__, generate_orders(orders, users, contracts, start,
+                                          seed=seed)),
+    ]
+    for table, rows in plan:
+        written[table.name] = _insert_chunks(engine, table, rows, chunk_size)
+        if progress:
+            progress(table.name, written[table.name])
+    _sync_sequences(engine, [User.__tablename__, Contract.__tablename__])
+    with engine.begin() as connection:
+        store_rates(connection, rate_table.rates())
+        normalize_prices(connection, currencies=())
+    with Session(engine) as db:
+        rebuild_summaries(db)
+    return written
@@ -0,0 +1,393 @@
+"""Endpoint benchmark runner.
+
+Seeds a local SQLite or throwaway Postgres database with synthetic data
+(see `benchmarks.datagen`) and drives the routes of the application
+(see `build_scenarios` for the few without a scenario) through the
+Flask test client, first sequentially and then with a concurrent load
+driver. Latency percentiles, throughput and SQL query
+counts per route are written as JSON, so results of two commits can be
+compared with `--compare`.
+
+Usage:
+    python -m benchmarks.run --database-url sqlite:////tmp/bench.db \\
+        --orders 10000 --requests 200 --concurrency 8 \\
+        --output bench.json [--compare previous.json]
+
+Never point `--database-url` at a database with real data: the schema is
+created and rows are inserted (and, with `--reseed`, dropped).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import bcrypt
+from sqlalchemy import func, select
+
+from benchmarks.datagen import BENCH_PASSWORD, seed
+from monitoring.querycount import track_queries
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+def summarize(name, mode, latencies, queries, errors, wall_time):
+    """Build the JSON result entry of one route and mode."""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "route": name,
+        "mode": mode,
+        "requests": count,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        "throughput_rps": round(count / wall_time, 2) if wall_time else 0.0,
+        "queries_per_request": round(sum(queries) / count, 2)
+        if count else 0.0,
+    }
+
+
+def build_scenarios(bench, deep_cursor):
+    """
+    Return `(name, method, path, client_kind, form_factory)` tuples.
+
+    `client_kind` is "anonymous", "user" (logged in as the benchmark
+    user) or "stateless" (no cookies, e.g. for repeated logins).
+    `form_factory` is called once per request and returns the POST body.
+
+    `bench` describes the benchmark user and one of their orders
+    (`email`, `firstName`, `lastName`, `company`, `userType`,
+    `orderNumber`, `departureAirport`, `departureDate`).
+
+    Routes without a scenario:
+    - `/api/feed/orders`: a never-ending event stream, not a request
+      with a latency.
+    - `PUT` / `GET /api/contracts/<id>/document`: uploads write files
+      into the document store, and the seeded contracts have no
+      document to download.
+    - `/status/*`: only enabled with `METRICS_ENABLED`, and they read
+      counters without touching the database.
+    - `/profile/newOrder`: not implemented.
+    """
+    signups = iter(range(10 ** 9))
+
+    def signup_form():
+        number = next(signups)
+        return {
+            "firstName": "Bench", "lastName": f"Signup{number}",
+            "company": "Bench Co",
+            "email": f"signup{number}-{os.getpid()}@bench.example",
+            "userType": "carrier",
+            "password": BENCH_PASSWORD, "confirmPassword": BENCH_PASSWORD,
+        }
+
+    def login_form():
+        return {"email": bench["email"], "password": BENCH_PASSWORD}
+
+    def profile_form():
+        # The current values: the benchmark user keeps logging in.
+        return {
+            field: bench[field]
+            for field in ("firstName", "lastName", "company", "email",
+                          "userType")
+        }
+
+    order = bench["orderNumber"]
+    departure = bench["departureDate"].isoformat()
+
+    scenarios = [
+        ("home", "GET", "/", "anonymous", None),
+        ("home_de", "GET", "/?lang=de", "anonymous", None),
+        ("about", "GET", "/about", "anonymous", None),
+        ("features", "GET", "/features", "anonymous", None),
+        ("contacts", "GET", "/contacts", "anonymous", None),
+        ("signup_form", "GET", "/signUp", "anonymous", None),
+        ("login_form", "GET", "/logIn", "anonymous", None),
+        ("login_submit", "POST", "/logIn", "stateless", login_form),
+        ("signup_submit", "POST", "/signUp", "stateless", signup_form),
+        ("profile", "GET", "/profile", "user", None),
+        ("orders_first_page", "GET", "/profile/orders?rows=20", "user", None),
+        ("orders_by_price", "GET", "/profile/orders?rows=20&sort=price",
+         "user", None),
+        ("order_detail", "GET", f"/profile/orders/{order}", "user", None),
+        ("export_csv", "GET", "/profile/orders/export?format=csv", "user",
+         None),
+        ("export_xlsx", "GET", "/profile/orders/export?format=xlsx",
+         "user", None),
+        ("settings", "GET", "/profile/settings", "user", None),
+        ("update_profile", "POST", "/updateProfile", "user", profile_form),
+        ("logout", "GET", "/logout", "stateless", None),
+        ("ready", "GET", "/ready", "anonymous", None),
+        ("autocomplete", "GET", "/api/autocomplete?q=fra", "user", None),
+        ("nearby", "GET",
+         f"/api/orders/nearby?airport={bench['departureAirport']}"
+         f"&date={departure}", "user", None),
+        ("matches", "GET", f"/api/orders/{order}/matches", "user", None),
+        ("search_route", "GET",
+         "/api/orders/search?departureAirport=FRA&arrivalAirport=LHR",
+         "user", None),
+        ("search_cargo", "GET",
+         "/api/orders/search?cargoType=general&minWeight=1000"
+         "&fields=orderNumber,departureDate,orderPrice", "user", None),
+        ("search_by_price", "GET",
+         "/api/orders/search?sort=normalizedPrice&minNormalizedPrice=5000",
+         "user", None),
+    ]
+    if deep_cursor:
+        scenarios.append((
+            "orders_deep_page", "GET",
+            f"/profile/orders?rows=20&after={deep_cursor}", "user", None,
+        ))
+    return scenarios
+
+
+class Driver:
+    """Sends requests through per-thread Flask test clients."""
+
+    def __init__(self, app, bench_email):
+        self.app = app
+        self.bench_email = bench_email
+        self._local = threading.local()
+
+    def _client(self, kind):
+        client = getattr(self._local, kind, None)
+        if client is None:
+            client = self.app.test_client(use_cookies=kind != "stateless")
+            if kind == "user":
+                client.post("/logIn", data={
+                    "email": self.bench_email, "password": BENCH_PASSWORD,
+                })
+            setattr(self._local, kind, client)
+        return client
+
+    def request(self, method, path, client_kind, form_factory):
+        """Send one request; return `(seconds, queries, ok)`.
+
+        Streamed bodies (exports) are read to the end before the clock
+        stops.
+        """
+        client = self._client(client_kind)
+        data = form_factory() if form_factory else None
+        with track_queries() as statements:
+            start = time.perf_counter()
+            try:
+                response = client.open(path, method=method, data=data)
+                response.get_data()
+            except Exception:
+                return time.perf_counter() - start, len(statements), False
+            elapsed = time.perf_counter() - start
+        ok = response.status_code < 500
+        response.close()
+        return elapsed, len(statements), ok
+
+
+def run_scenario(driver, scenario, requests, concurrency, warmup):
+    """Run one scenario sequentially and concurrently."""
+    name, method, path, client_kind, form_factory = scenario
+    args = (method, path, client_kind, form_factory)
+    for _ in range(warmup):
+        driver.request(*args)
+
+    results = []
+    samples = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        samples.append(driver.request(*args))
+    wall_time = time.perf_counter() - start
+    results.append(_summary(name, "sequential", samples, wall_time))
+
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            samples = list(executor.map(
+                lambda _: driver.request(*args), range(requests)
+            ))
+            wall_time = time.perf_counter() - start
+        results.append(_summary(
+            name, f"concurrent_{concurrency}", samples, wall_time
+        ))
+    return results
+
+
+def _summary(name, mode, samples, wall_time):
+    return summarize(
+        name, mode,
+        [elapsed for elapsed, _, _ in samples],
+        [queries for _, queries, _ in samples],
+        sum(1 for _, _, ok in samples if not ok),
+        wall_time,
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print p95 and throughput changes per route and mode."""
+    before = {(r["route"], r["mode"]): r for r in previous["results"]}
+    print(f"{'route':<22} {'mode':<14} {'p95 ms':>18} {'rps':>18}")
+    for result in current["results"]:
+        old = before.get((result["route"], result["mode"]))
+        if old is None:
+            continue
+        print(
+            f"{result['route']:<22} {result['mode']:<14} "
+            f"{old['p95_ms']:>8} -> {result['p95_ms']:<7} "
+            f"{old['throughput_rps']:>8} -> {result['throughput_rps']:<7}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--reseed", action="store_true",
+                        help="drop and recreate all tables first")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="measured requests per route and mode")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="cost factor for seeded users and the app")
+    parser.add_argument("--routes", help="comma-separated route names")
+    parser.add_argument("--output", help="JSON result file (default stdout)")
+    parser.add_argument("--compare", help="previous JSON result file")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    # Every login comes from one address; measure logins, not throttling.
+    os.environ.setdefault("LOGIN_IP_BURST", "1e9")
+    os.environ.setdefault("LOGIN_EMAIL_BURST", "1e9")
+
+    from controller.app import create_app, warm_up
+    from database.db_funcs import encode_cursor, get_engine, init_db
+    from model.dbModels import Base, Order, User
+
+    app = create_app({"WTF_CSRF_ENABLED": False, "TESTING": True})
+    engine = get_engine()
+    if args.reseed:
+        Base.metadata.drop_all(bind=engine)
+    init_db()
+
+    seeded = None
+    with engine.connect() as connection:
+        existing = connection.execute(select(func.count(Order.id))).scalar()
+    if not existing:
+        password_hash = bcrypt.hashpw(
+            BENCH_PASSWORD.encode(), bcrypt.gensalt(args.bcrypt_rounds)
+        ).decode()
+        start = time.perf_counter()
+        seeded = seed(
+            engine, args.orders, users=args.users,
+            password_hash=password_hash,
+            progress=lambda table, rows: print(
+                f"seeded {rows} {table}", file=sys.stderr
+            ),
+        )
+        seeded["seconds"] = round(time.perf_counter() - start, 2)
+    # After seeding, so the autocomplete index sees the benchmark data.
+    warm_up(app)
+
+    with engine.connect() as connection:
+        user_id, order_count = connection.execute(
+            select(Order.userId, func.count(Order.id))
+            .group_by(Order.userId)
+            .order_by(func.count(Order.id).desc())
+            .limit(1)
+        ).one()
+        user = connection.execute(
+            select(User.email, User.fullName, User.company, User.userType)
+            .where(User.id == user_id)
+        ).one()
+        order = connection.execute(
+            select(Order.orderNumber, Order.departureAirport,
+                   Order.departureDate)
+            .where(Order.userId == user_id)
+            .order_by(Order.id)
+            .limit(1)
+        ).one()
+        middle = connection.execute(
+            select(Order.orderDate, Order.id)
+            .where(Order.userId == user_id)
+            .order_by(Order.orderDate.desc(), Order.id.desc())
+            .offset(order_count // 2)
+            .limit(1)
+        ).first()
+    deep_cursor = encode_cursor(*middle) if middle else None
+    first_name, _, last_name = user.fullName.partition(" ")
+    bench = {
+        "email": user.email,
+        "firstName": first_name,
+        "lastName": last_name or first_name,
+        "company": user.company,
+        "userType": user.userType.name,
+        **order._asdict(),
+    }
+
+    driver = Driver(app, bench["email"])
+    scenarios = build_scenarios(bench, deep_cursor)
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        scenarios = [s for s in scenarios if s[0] in wanted]
+
+    results = []
+    for scenario in scenarios:
+        print(f"running {scenario[0]}", file=sys.stderr)
+        results.extend(run_scenario(
+            driver, scenario, args.requests, args.concurrency, args.warmup
+        ))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "orders": seeded["orders"] if seeded else existing,
+            "bench_user_orders": order_count,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "seed": seeded,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as result_file:
+            result_file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            compare(json.load(previous_file), report)
+
+
+if __name__ == "__main__":
+    main()
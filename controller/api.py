@@ -0,0 +1,518 @@
+"""JSON API endpoints.
+
+Defines the `api` blueprint, mounted under `/api`. Endpoints require a
+logged-in session and answer with JSON, including errors.
+
+Main features:
+- `GET /api/orders/search`: filtered order search with field selection,
+  cursor pagination and a per-request time budget
+  (see `database.search`).
+- `GET /api/autocomplete`: city and airport suggestions from the
+  in-memory prefix index (see `services.autocomplete`).
+- `GET /api/orders/nearby`: orders departing within a radius of an
+  airport or a point, ranked by distance and time offset
+  (see `services.geo`).
+- `GET /api/orders/<number>/matches`: ranked empty-leg matches for one
+  of the user's orders (see `services.matching`).
+- `GET /api/feed/orders`: server-sent events with new orders matching
+  route, date and capacity filters (see `services.feed`).
+- `PUT` / `GET /api/contracts/<id>/document`: streamed upload to and
+  download from the content-addressed document store
+  (see `services.documents`), for the contract's parties only.
+"""
+
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+import json
+import math
+from flask import (
+    Blueprint, Response, current_app, jsonify, redirect, request,
+    send_file, session
+)
+from database.db_funcs import get_contract_file, set_contract_file
+from database.order_ingest import CARGO_TYPES, CURRENCIES
+from database.search import (
+    DEFAULT_SEARCH_FIELDS, SEARCH_FIELDS, SEARCH_FILTERS, SEARCH_SORTS,
+    SearchTimeout, search_orders
+)
+from database.rates import rate_table
+from services.autocomplete import AIRPORT, CITY, autocomplete
+from services.feed import FeedFilter, FeedFull, feed_hub
+from services.geo import airport_locator, nearby_orders
+from services.matching import order_matches
+from services.documents import (
+    DocumentTooLarge, InvalidDocument, document_store, parse_uri
+)
+from controller.db import get_db
+from controller.translations import catalog
+
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_BUDGET_MS = 500
+SEARCH_MAX_BUDGET_MS = 2000
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+FEED_FILTERS = (
+    "departureAirport", "arrivalAirport", "departFrom", "departTo",
+    "cargoType", "minWeight", "minVolume",
+)
+FEED_HEARTBEAT_SECONDS = 15
+NEARBY_RADIUS_KM = 100
+NEARBY_MAX_RADIUS_KM = 2000
+NEARBY_WINDOW_HOURS = 72
+NEARBY_MAX_WINDOW_HOURS = 720
+MATCH_LIMIT = 10
+MATCH_MAX_LIMIT = 50
+
+
+def _enum_value(table):
+    def convert(value):
+        member = table.get(value.strip().lower())
+        if member is None:
+            raise ValueError(value)
+        return member
+    return convert
+
+
+def parse_datetime(value):
+    """
+    Parse an ISO 8601 query parameter into a naive UTC datetime.
+
+    Order dates are stored naive, and comparing them with an aware value
+    raises TypeError; values with an offset are converted to UTC.
+
+    Raises:
+        ValueError: If the value is not ISO 8601.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def finite_float(value):
+    """
+    Parse a number query parameter.
+
+    Raises:
+        ValueError: If the value is not a number, or is nan or infinite
+            (those would turn a range filter into nonsense).
+    """
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+# Query parameter conversion per filter; everything else is a string.
+FILTER_CONVERTERS = {
+    "departFrom": parse_datetime,
+    "departTo": parse_datetime,
+    "cargoType": _enum_value(CARGO_TYPES),
+    "currency": _enum_value(CURRENCIES),
+    "minWeight": finite_float,
+    "maxWeight": finite_float,
+    "minVolume": finite_float,
+    "maxVolume": finite_float,
+    "minPrice": finite_float,
+    "maxPrice": finite_float,
+    "minNormalizedPrice": finite_float,
+    "maxNormalizedPrice": finite_float,
+}
+
+
+def json_error(message, status_code):
+    """
+    Build a JSON error response.
+
+    Args:
+        message (str): Error description.
+        status_code (int): HTTP status code.
+
+    Returns:
+        tuple: Response and status code.
+    """
+    return jsonify(error=message), status_code
+
+
+def to_json(value):
+    """Convert enum and datetime column values to JSON-friendly values."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _bounded_int(name, default, maximum):
+    value = request.args.get(name, type=int, default=default)
+    return min(max(value, 1), maximum)
+
+
+@api.route('/orders/search')
+def search_orders_api():
+    """
+    Search orders.
+
+    Query parameters:
+        - Filters: keys of `database.search.SEARCH_FILTERS`, e.g.
+          `departureAirport`, `arrivalAirport`, `departFrom`/`departTo`
+          (ISO 8601), `cargoType`, `minWeight`, `maxPrice`, `currency`,
+          `minNormalizedPrice`/`maxNormalizedPrice` (base currency).
+        - `sort`: `departureDate` (default) or `normalizedPrice`.
+        - `fields`: comma-separated columns to return.
+        - `limit`: page size (at most 100).
+        - `after`: cursor returned with the previous page.
+        - `budgetMs`: query time budget in milliseconds (at most 2000).
+
+    Returns:
+        JSON `{"results": [...], "next": cursor | null, "baseCurrency":
+        code of normalized prices}`; 400 for invalid
+        parameters, 401 when not logged in, 503 when the time budget is
+        exceeded.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+
+    filters = {}
+    for name in SEARCH_FILTERS:
+        value = request.args.get(name, "").strip()
+        if not value:
+            continue
+        try:
+            filters[name] = FILTER_CONVERTERS.get(name, str)(value)
+        except ValueError:
+            return json_error(f"Invalid value for {name}", 400)
+
+    fields = DEFAULT_SEARCH_FIELDS
+    if request.args.get("fields"):
+        fields = [
+            field.strip() for field in request.args["fields"].split(",")
+        ]
+        unknown = [field for field in fields if field not in SEARCH_FIELDS]
+        if unknown:
+            return json_error(f"Unknown fields: {', '.join(unknown)}", 400)
+
+    sort = request.args.get("sort", "departureDate")
+    if sort not in SEARCH_SORTS:
+        return json_error(f"Unknown sort: {sort}", 400)
+
+    try:
+        results, next_cursor = search_orders(
+            get_db(),
+            filters,
+            fields=fields,
+            limit=_bounded_int("limit", SEARCH_PAGE_SIZE,
+                               SEARCH_MAX_PAGE_SIZE),
+            cursor=request.args.get("after"),
+            budget_ms=_bounded_int("budgetMs", SEARCH_BUDGET_MS,
+                                   SEARCH_MAX_BUDGET_MS),
+            sort=sort,
+        )
+    except SearchTimeout:
+        return json_error("Search took too long, narrow the filters", 503)
+
+    return jsonify(
+        results=[
+            {field: to_json(value) for field, value in row.items()}
+            for row in results
+        ],
+        next=next_cursor,
+        baseCurrency=rate_table.base.value,
+    )
+
+
+@api.route('/orders/nearby')
+def nearby_orders_api():
+    """
+    Find orders departing near an airport or a point.
+
+    Query parameters:
+        - `airport`: IATA code of the origin, or `lat` and `lon` in
+          degrees.
+        - `radiusKm`: maximum distance of the departure airport
+          (default 100, at most 2000).
+        - `date`: requested departure time (ISO 8601, default now); an
+          offset such as `+02:00` is converted to UTC.
+        - `windowHours`: accepted offset from `date` (default 72, at
+          most 720).
+        - `limit`: number of results (at most 100).
+
+    Returns:
+        JSON `{"results": [...]}`, best match first; every result has
+        `distanceKm`, `offsetHours` and `score` (`distanceKm` plus
+        10 km per hour of offset). 400 for invalid parameters, 401 when
+        not logged in.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+
+    if request.args.get("airport"):
+        position = airport_locator.position(request.args["airport"])
+        if position is None:
+            return json_error("Unknown airport", 400)
+        lat, lon = position
+    else:
+        lat = request.args.get("lat", type=float)
+        lon = request.args.get("lon", type=float)
+        if lat is None or lon is None or not (
+            -90 <= lat <= 90 and -180 <= lon <= 180
+        ):
+            return json_error("Expected airport or lat and lon", 400)
+
+    try:
+        when = parse_datetime(request.args["date"]) \
+            if request.args.get("date") else datetime.now()
+    except ValueError:
+        return json_error("Invalid value for date", 400)
+
+    results = nearby_orders(
+        get_db(), lat, lon,
+        radius_km=_bounded_int("radiusKm", NEARBY_RADIUS_KM,
+                               NEARBY_MAX_RADIUS_KM),
+        when=when,
+        window=timedelta(hours=_bounded_int(
+            "windowHours", NEARBY_WINDOW_HOURS, NEARBY_MAX_WINDOW_HOURS
+        )),
+        limit=_bounded_int("limit", SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE),
+    )
+    return jsonify(results=[
+        {field: to_json(value) for field, value in row.items()}
+        for row in results
+    ])
+
+
+@api.route('/orders/<int:order_number>/matches')
+def order_matches_api(order_number):
+    """
+    Find orders that can share an empty leg with one of the user's
+    orders.
+
+    Query parameters:
+        - `limit`: number of results (default 10, at most 50).
+
+    Returns:
+        JSON `{"results": [...]}`, best match first; every result has
+        `role` (`filler`: it can fly on the empty return of this order,
+        `emptyLeg`: this order can fly on its empty return), `score` and
+        `gapHours`. Round trips and matched orders have no results.
+        401 when not logged in, 404 when the order is not the user's.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+
+    results = order_matches(
+        get_db(), order_number, session['user_id'],
+        limit=_bounded_int("limit", MATCH_LIMIT, MATCH_MAX_LIMIT),
+    )
+    if results is None:
+        return json_error("Order not found", 404)
+    return jsonify(results=[
+        {field: to_json(value) for field, value in row.items()}
+        for row in results
+    ])
+
+
+def _sse(event, data, event_id=None):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def _feed_stream(client):
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            orders = client.wait(FEED_HEARTBEAT_SECONDS)
+            if client.evicted:
+                yield _sse("evicted", {"reason": "client too slow"})
+                return
+            if not orders:
+                # Comment line: keeps proxies from closing the stream
+                # and detects disconnected clients.
+                yield ": keepalive\n\n"
+            for order in orders:
+                yield _sse(
+                    "order",
+                    {field: to_json(value) for field, value in order.items()},
+                    order["id"],
+                )
+    finally:
+        feed_hub.unsubscribe(client)
+
+
+@api.route('/feed/orders')
+def order_feed():
+    """
+    Stream new orders as server-sent events.
+
+    Query parameters:
+        - `departureAirport`, `arrivalAirport`: route; either may be
+          omitted to match any airport.
+        - `departFrom`, `departTo`: departure window (ISO 8601).
+        - `cargoType`, `minWeight`, `minVolume`: cargo filters.
+
+    Returns:
+        `text/event-stream` with one `order` event per new matching
+        order, keep-alive comments every 15 seconds and a final
+        `evicted` event for clients that fall behind; 400 for invalid
+        parameters, 401 when not logged in, 503 when the feed is full
+        or disabled (`FEED_ENABLED`, single-threaded workers).
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+    if not current_app.config["FEED_ENABLED"]:
+        return json_error("Live feed is not available", 503)
+
+    filters = {}
+    for name in FEED_FILTERS:
+        value = request.args.get(name, "").strip()
+        if not value:
+            continue
+        try:
+            filters[name] = FILTER_CONVERTERS.get(name, str.upper)(value)
+        except ValueError:
+            return json_error(f"Invalid value for {name}", 400)
+
+    try:
+        client = feed_hub.subscribe(session['user_id'], FeedFilter(**filters))
+    except FeedFull:
+        return json_error("Feed is full, try again later", 503)
+
+    response = Response(_feed_stream(client), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api.route('/autocomplete')
+def autocomplete_api():
+    """
+    Suggest cities and airports for a typed prefix.
+
+    Query parameters:
+        - `q`: typed text; matched against IATA codes, city and airport
+          names, ignoring case and accents.
+        - `kind`: `city` or `airport` to restrict the suggestions.
+        - `lang`: label language (default: the session language).
+        - `limit`: number of suggestions (at most 25).
+
+    Returns:
+        JSON `{"suggestions": [{"kind", "value", "label"}]}`, where
+        `value` is what order filters and forms expect; 401 when not
+        logged in.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+
+    if not autocomplete.loaded:
+        autocomplete.load(catalog.languages())
+    if autocomplete.refresh_due():
+        autocomplete.refresh_in_background()
+
+    kind = request.args.get("kind")
+    suggestions = autocomplete.suggest(
+        request.args.get("q", ""),
+        language=request.args.get("lang") or session.get('lang', 'en'),
+        kind=kind if kind in (CITY, AIRPORT) else None,
+        limit=_bounded_int("limit", AUTOCOMPLETE_LIMIT,
+                           AUTOCOMPLETE_MAX_LIMIT),
+    )
+    response = jsonify(
+        suggestions=[suggestion._asdict() for suggestion in suggestions]
+    )
+    response.cache_control.private = True
+    response.cache_control.max_age = 60
+    return response
+
+
+@api.route('/contracts/<int:contract_id>/document', methods=['PUT'])
+def upload_contract_document(contract_id):
+    """
+    Store the PDF document of a contract.
+
+    The request body is the raw PDF (`Content-Type: application/pdf`);
+    it is streamed to disk in chunks and hashed on the way, and a file
+    already stored with the same content is reused.
+
+    Returns:
+        JSON `{"digest", "size", "created"}`; 401 when not logged in,
+        404 when the user is not a party to the contract, 413 for too
+        large and 415 for non-PDF uploads.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+    if request.mimetype != "application/pdf":
+        return json_error("Expected application/pdf", 415)
+    if (request.content_length is not None
+            and request.content_length > document_store.max_bytes):
+        return json_error("Document too large", 413)
+
+    db = get_db()
+    found, _ = get_contract_file(db, contract_id, session['user_id'])
+    if not found:
+        return json_error("Contract not found", 404)
+    # Release the connection while the upload is read.
+    db.rollback()
+
+    try:
+        document = document_store.save(request.stream, prefix=b"%PDF-")
+    except DocumentTooLarge:
+        return json_error("Document too large", 413)
+    except InvalidDocument:
+        return json_error("Not a PDF document", 415)
+
+    if not set_contract_file(db, contract_id, session['user_id'],
+                             document.uri):
+        # The contract went away during the upload: drop the new file.
+        if document.created:
+            document_store.delete(document.digest)
+        return json_error("Contract not found", 404)
+    return jsonify(
+        digest=document.digest, size=document.size, created=document.created
+    )
+
+
+@api.route('/contracts/<int:contract_id>/document')
+def download_contract_document(contract_id):
+    """
+    Send the PDF document of a contract.
+
+    Authorization is one primary-key lookup restricted to the charterer
+    and carrier. The file is sent by the server (sendfile, or
+    `X-Sendfile` with `STATIC_X_SENDFILE=1`) with its digest as a strong
+    ETag, so `Range`, `If-Range`, `If-None-Match` and
+    `If-Modified-Since` are answered without reading it in Python.
+
+    Returns:
+        The document (200, 206 or 304), a redirect for documents stored
+        elsewhere; 401 when not logged in, 404 when the user is not a
+        party or no document is stored.
+    """
+    if 'user_id' not in session:
+        return json_error("Login required", 401)
+
+    found, file_url = get_contract_file(
+        get_db(), contract_id, session['user_id']
+    )
+    if not found or not file_url:
+        return json_error("Document not found", 404)
+    path = document_store.path_for(file_url)
+    if path is None:
+        if file_url.startswith(("http://", "https://")):
+            return redirect(file_url)
+        return json_error("Document not found", 404)
+
+    response = send_file(
+        path,
+        mimetype="application/pdf",
+        download_name=f"contract-{contract_id}.pdf",
+        conditional=True,
+        etag=parse_uri(file_url),
+    )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,129 @@
+"""Flask application factory.
+
+Main features:
+- `create_app` builds and configures a Flask application. Importing this
+  module does not read `.env` or create a database engine; the engine is
+  created lazily on the first query (see `database.db_funcs.get_engine`).
+- `warm_up` preloads translations, exchange rates, the autocomplete,
+  airport and empty-leg matching indexes and compiles every template,
+  so that pre-forked workers share the warm state copy-on-write.
+- Static files are fingerprinted, precompressed and served with
+  immutable caching (see `controller.assets`).
+- Compiled templates are kept in a Jinja bytecode cache on disk, so a
+  restarted server does not have to compile them again.
+- Requests are instrumented (see `controller.instrumentation`).
+- JSON endpoints live in the `api` blueprint under `/api`
+  (see `controller.api`).
+- Maintenance commands are available through the Flask CLI
+  (see `controller.cli`).
+"""
+
+import os
+import tempfile
+from dotenv import load_dotenv
+from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
+from database.db_funcs import get_session
+from database.passwords import hasher, settings_from_env
+from database.rates import refresh_rates
+from controller.api import api
+from controller.assets import build_and_load, init_assets
+from controller.cli import register_commands
+from controller.db import close_db, remember_writes
+from controller.instrumentation import init_instrumentation
+from controller.endpoints import pages
+from controller.status import status
+from controller.translations import catalog
+from services.autocomplete import autocomplete
+from services.geo import airport_locator
+from services.matching import load_open_orders, matcher
+
+
+def create_app(config=None):
+    """
+    Create and configure the Flask application.
+
+    Args:
+        config (dict | None): Extra Flask configuration values.
+
+    Returns:
+        Flask: Configured application (not yet warmed up).
+
+    Environment variables:
+        - `SECRET_KEY`: Flask session secret.
+        - `JINJA_CACHE_DIR`: directory for compiled template bytecode.
+        - `ASSETS_DIR`: directory for built static files.
+        - `TRUSTED_PROXIES`: number of reverse proxies in front of the
+          app whose `X-Forwarded-For`/`-Proto`/`-Host` headers are
+          trusted (default 0). Client IPs, e.g. for login throttling,
+          come from these headers when set.
+        - `FEED_ENABLED`: serve the live order feed (default 1); also
+          switched off by `controller.server` for single-threaded
+          workers.
+    """
+    load_dotenv()
+    hasher.configure(**settings_from_env())
+
+    app = Flask(
+        __name__,
+        template_folder="../templates",
+        static_folder="../static"
+    )
+    app.secret_key = os.getenv("SECRET_KEY", "some_secret_key")
+    app.config["FEED_ENABLED"] = os.getenv("FEED_ENABLED", "1") == "1"
+    app.config.update(config or {})
+
+    trusted_proxies = int(os.getenv("TRUSTED_PROXIES", 0))
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=trusted_proxies, x_proto=trusted_proxies,
+            x_host=trusted_proxies,
+        )
+
+    cache_dir = os.getenv(
+        "JINJA_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "emptyleg-jinja-cache")
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    init_assets(app)
+    init_instrumentation(app)
+    app.register_blueprint(pages)
+    app.register_blueprint(status)
+    app.register_blueprint(api)
+    app.after_request(remember_writes)
+    app.teardown_appcontext(close_db)
+    register_commands(app)
+    return app
+
+
+def warm_up(app):
+    """
+    Preload translations, exchange rates, the autocomplete, airport and
+    empty-leg matching indexes and compiled templates.
+
+    Called once before workers are forked (or at startup of a single
+    process). Marks the application as ready for `/ready`.
+
+    Args:
+        app (Flask): Application returned by `create_app`.
+
+    Returns:
+        Flask: The same application.
+    """
+    catalog.reload()
+    autocomplete.load(catalog.languages())
+    with get_session() as db:
+        # Store the rates and normalize every price, so a fresh database
+        # never keeps NULL normalized prices.
+        refresh_rates(db, full=True)
+        autocomplete.refresh(db)
+        load_open_orders(matcher, db)
+    airport_locator.load()
+    build_and_load(app)
+    for name in app.jinja_env.list_templates(extensions=("html",)):
+        app.jinja_env.get_template(name)
+    app.extensions['warm'] = True
+    return app
@@ -0,0 +1,274 @@
+"""Static asset pipeline.
+
+Files under `static/` are built once into a content-addressed output
+directory and served from there with far-future caching.
+
+Main features:
+- Fingerprinting: `images/logo.png` is published as
+  `images/logo.<hash>.png`; `url_for('static', filename=...)` returns the
+  fingerprinted URL as soon as the manifest is loaded.
+- Text assets (CSS, JS, SVG, ...) are precompressed with gzip and, when
+  the `brotli` package is installed, brotli. The best encoding accepted
+  by the client is served.
+- Raster images wider than the smallest responsive width get
+  downscaled variants (Pillow required); `asset_srcset(filename)` in
+  templates returns the matching `srcset` value.
+- Fingerprinted files are sent with
+  `Cache-Control: public, max-age=31536000, immutable` through
+  `send_file`, which uses the server's sendfile support (or
+  `X-Sendfile` with `STATIC_X_SENDFILE=1` behind a proxy).
+- Building is idempotent: unchanged files are not written again. Run it
+  at deploy time with `flask --app controller.app:create_app
+  build-assets`; `warm_up` builds missing outputs otherwise.
+
+Environment variables:
+- `ASSETS_DIR`: output directory (default: a temporary directory).
+- `STATIC_X_SENDFILE`: delegate file transfer to the front proxy.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+from flask import current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # precompression falls back to gzip only
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # no responsive image variants
+    Image = None
+
+MANIFEST_NAME = "manifest.json"
+COMPRESSIBLE = frozenset({
+    ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".html",
+    ".xml", ".ico", ".webmanifest",
+})
+RESIZABLE = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+IMAGE_WIDTHS = (160, 320, 640)
+IMMUTABLE_MAX_AGE = 31536000
+# (encoding, file suffix), in order of preference.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(65536), b""):
+            sha.update(block)
+    return sha.hexdigest()[:12]
+
+
+def _fingerprinted(filename, digest, suffix=""):
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}.{digest}{suffix}{extension}"
+
+
+def _write_compressed(path):
+    with open(path, "rb") as source:
+        data = source.read()
+    if not os.path.exists(path + ".gz"):
+        with open(path + ".gz", "wb") as target:
+            target.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None and not os.path.exists(path + ".br"):
+        with open(path + ".br", "wb") as target:
+            target.write(brotli.compress(data, quality=11))
+
+
+def _write_variants(source_path, output_dir, filename, digest):
+    variants = {}
+    with Image.open(source_path) as image:
+        for width in IMAGE_WIDTHS:
+            if width >= image.width:
+                break
+            name = _fingerprinted(filename, digest, f".w{width}")
+            target = os.path.join(output_dir, name)
+            if not os.path.exists(target):
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.LANCZOS)
+                resized.save(target, optimize=True, quality=85)
+            variants[str(width)] = name
+    return variants
+
+
+def build_assets(static_dir, output_dir):
+    """
+    Fingerprint, precompress and resize static files.
+
+    Args:
+        static_dir (str): Source directory (the app's `static/`).
+        output_dir (str): Directory receiving the built files and
+            `manifest.json`.
+
+    Returns:
+        dict: Manifest mapping each source filename (relative, with
+              forward slashes) to `{"path": fingerprinted filename,
+              "encodings": precompressed encodings,
+              "variants": {width: filename}}`.
+    """
+    manifest = {}
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            filename = os.path.relpath(source_path, static_dir).replace(
+                os.sep, "/"
+            )
+            digest = _digest(source_path)
+            built = _fingerprinted(filename, digest)
+            target = os.path.join(output_dir, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                shutil.copyfile(source_path, target)
+
+            extension = os.path.splitext(name)[1].lower()
+            encodings = []
+            if extension in COMPRESSIBLE:
+                _write_compressed(target)
+                encodings = [
+                    encoding for encoding, suffix in ENCODINGS
+                    if os.path.exists(target + suffix)
+                ]
+            variants = {}
+            if extension in RESIZABLE and Image is not None:
+                variants = _write_variants(
+                    source_path, output_dir, filename, digest
+                )
+            manifest[filename] = {
+                "path": built,
+                "encodings": encodings,
+                "variants": variants,
+            }
+
+    temporary = os.path.join(output_dir, MANIFEST_NAME + ".tmp")
+    with open(temporary, "w", encoding="utf-8") as target:
+        json.dump(manifest, target, indent=1, sort_keys=True)
+    os.replace(temporary, os.path.join(output_dir, MANIFEST_NAME))
+    return manifest
+
+
+def assets_dir():
+    """Return the configured asset output directory."""
+    return os.getenv(
+        "ASSETS_DIR",
+        os.path.join(tempfile.gettempdir(), "emptyleg-assets")
+    )
+
+
+def load_manifest(app, manifest):
+    """
+    Publish a manifest to the application.
+
+    Args:
+        app (Flask): Application set up with `init_assets`.
+        manifest (dict): Result of `build_assets`.
+    """
+    state = app.extensions["assets"]
+    files = {}
+    for entry in manifest.values():
+        files[entry["path"]] = tuple(entry["encodings"])
+        files.update((variant, ()) for variant in entry["variants"].values())
+    state["files"] = files
+    state["manifest"] = manifest
+
+
+def build_and_load(app):
+    """Build the static files of `app` and load the manifest."""
+    output_dir = app.extensions["assets"]["dir"]
+    os.makedirs(output_dir, exist_ok=True)
+    load_manifest(app, build_assets(app.static_folder, output_dir))
+
+
+def _fingerprint_url(endpoint, values):
+    if endpoint != "static" or "filename" not in values:
+        return
+    entry = current_app.extensions["assets"]["manifest"].get(
+        values["filename"]
+    )
+    if entry is not None:
+        values["filename"] = entry["path"]
+
+
+def asset_srcset(filename):
+    """
+    Return a `srcset` attribute value with the variants of an image.
+
+    Args:
+        filename (str): Source filename relative to `static/`.
+
+    Returns:
+        str: e.g. `"/static/a.<hash>.w160.jpg 160w, ..."`, or an empty
+             string when the image has no variants.
+    """
+    entry = current_app.extensions["assets"]["manifest"].get(filename)
+    if not entry:
+        return ""
+    return ", ".join(
+        f"{url_for('static', filename=name)} {width}w"
+        for width, name in sorted(
+            entry["variants"].items(), key=lambda item: int(item[0])
+        )
+    )
+
+
+def serve_static(filename):
+    """
+    Serve a static file.
+
+    Fingerprinted files come from the asset directory, precompressed when
+    possible, with immutable caching; other names fall back to Flask's
+    default static handler.
+    """
+    state = current_app.extensions["assets"]
+    encodings = state["files"].get(filename)
+    if encodings is None:
+        return current_app.send_static_file(filename)
+
+    path = os.path.join(state["dir"], filename)
+    mimetype = None
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if name in encodings and request.accept_encodings[name]:
+            encoding = name
+            mimetype = (mimetypes.guess_type(filename)[0]
+                        or "application/octet-stream")
+            path += suffix
+            break
+
+    response = send_file(
+        path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, conditional=True
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_assets(app):
+    """
+    Wire the asset pipeline into an application.
+
+    Replaces the `static` view, rewrites `url_for('static', ...)` to
+    fingerprinted names and adds `asset_srcset` to templates. Nothing is
+    built here; see `build_and_load`.
+
+    Args:
+        app (Flask): Application to configure.
+    """
+    app.extensions["assets"] = {
+        "dir": assets_dir(),
+        "manifest": {},
+        "files": {},
+    }
+    app.config["USE_X_SENDFILE"] = os.getenv("STATIC_X_SENDFILE") == "1"
+    app.view_functions["static"] = serve_static
+    app.url_defaults(_fingerprint_url)
+    app.jinja_env.globals["asset_srcset"] = asset_srcset
@@ -0,0 +1,173 @@
+"""Flask CLI commands.
+
+Registered on the application by `create_app`; run them with
+`flask --app controller.app:create_app <command>`.
+"""
+
+import os
+import sys
+import time
+import click
+from flask import Flask, current_app
+from controller.assets import build_and_load
+from database.db_funcs import get_engine, get_session
+from database.order_ingest import ingest_orders
+from database.passwords import hasher
+from database.rates import refresh_rates
+from database.schema import upgrade_schema
+from database.summaries import check_summaries, rebuild_summaries
+from database.user_import import csv_report, import_users, read_users
+
+
+@click.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--report", "report_path", type=click.Path(dir_okay=False),
+              help="Per-row result CSV (default: stdout).")
+@click.option("--workers", type=int, help="Hashing processes.")
+@click.option("--chunk-size", type=int, default=500, show_default=True)
+@click.option("--rounds", type=int,
+              help="bcrypt cost factor (default: BCRYPT_ROUNDS).")
+def import_users_command(path, report_path, workers, chunk_size, rounds):
+    """Import users from a CSV or JSONL file."""
+    output = open(report_path, "w", encoding="utf-8", newline="") \
+        if report_path else sys.stdout
+    start = time.perf_counter()
+    try:
+        with get_session() as db:
+            totals = import_users(
+                db, read_users(path), rounds or hasher.rounds,
+                workers=workers, chunk_size=chunk_size,
+                report=csv_report(output),
+            )
+    finally:
+        if report_path:
+            output.close()
+    elapsed = time.perf_counter() - start
+    click.echo(
+        ", ".join(f"{count} {status}" for status, count in totals.items())
+        + f" in {elapsed:.1f}s",
+        err=True,
+    )
+
+
+@click.command("ingest-orders")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=5000, show_default=True)
+@click.option("--commit-every", type=int, default=4, show_default=True,
+              help="Chunks per transaction.")
+@click.option("--copy/--no-copy", default=True, show_default=True,
+              help="Use COPY on Postgres.")
+@click.option("--checkpoint", "checkpoint_path",
+              type=click.Path(dir_okay=False),
+              help="Checkpoint file (default: PATH.checkpoint).")
+@click.option("--restart", is_flag=True,
+              help="Ignore an existing checkpoint.")
+def ingest_orders_command(path, chunk_size, commit_every, copy,
+                          checkpoint_path, restart):
+    """Stream orders from a CSV or JSONL feed into the database."""
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    def on_reject(index, record, error):
+        click.echo(f"record {index}: {error}", err=True)
+
+    def progress(stats):
+        click.echo(
+            f"{stats['total_records']} records, {stats['rows']} rows, "
+            f"{stats['rows_per_sec']} rows/s",
+            err=True,
+        )
+
+    stats = ingest_orders(
+        get_engine(), path, chunk_size=chunk_size,
+        commit_every=commit_every, copy=copy,
+        checkpoint_path=checkpoint_path, on_reject=on_reject,
+        progress=progress,
+    )
+    click.echo(
+        f"{stats['rows']} rows written, {stats['rejected']} rejected in "
+        f"{stats['seconds']}s ({stats['rows_per_sec']} rows/s)",
+        err=True,
+    )
+
+
+@click.command("build-assets")
+def build_assets_command():
+    """Fingerprint, precompress and resize the static files."""
+    start = time.perf_counter()
+    build_and_load(current_app)
+    state = current_app.extensions["assets"]
+    click.echo(
+        f"{len(state['manifest'])} files built into {state['dir']} "
+        f"in {time.perf_counter() - start:.2f}s", err=True
+    )
+
+
+@click.command("refresh-rates")
+@click.option("--full", is_flag=True,
+              help="Recompute the normalized price of every order.")
+def refresh_rates_command(full):
+    """Reload exchange rates and renormalize affected order prices."""
+    start = time.perf_counter()
+    with get_session() as db:
+        result = refresh_rates(db, full=full)
+    click.echo(
+        f"base {result['base']}, changed "
+        f"{', '.join(result['changed']) or 'none'}: {result['orders']} "
+        f"orders updated in {time.perf_counter() - start:.2f}s", err=True
+    )
+
+
+@click.command("rebuild-summaries")
+@click.option("--check", is_flag=True,
+              help="Only report summary rows that differ from the orders.")
+def rebuild_summaries_command(check):
+    """Recompute the per-user order summaries from the orders table."""
+    start = time.perf_counter()
+    with get_session() as db:
+        if check:
+            mismatches = check_summaries(db)
+            for key, stored, expected in sorted(mismatches, key=str):
+                click.echo(f"{key}: stored {stored}, expected {expected}")
+            click.echo(f"{len(mismatches)} mismatching rows", err=True)
+            if mismatches:
+                sys.exit(1)
+            return
+        written = rebuild_summaries(db)
+    click.echo(
+        f"{written} summary rows written in "
+        f"{time.perf_counter() - start:.2f}s", err=True
+    )
+
+
+@click.command("upgrade-db")
+def upgrade_db_command():
+    """Add missing tables, columns and indexes; backfill derived data."""
+    start = time.perf_counter()
+    created = upgrade_schema(get_engine())
+    for kind in ("tables", "columns", "indexes"):
+        click.echo(f"{kind}: {', '.join(created[kind]) or 'none'}",
+                   err=True)
+    for name in created["skipped"]:
+        click.echo(f"{name}: NOT NULL column, migrate manually", err=True)
+    with get_session() as db:
+        result = refresh_rates(db, full=True)
+        if "order_summaries" in created["tables"]:
+            rebuild_summaries(db)
+    click.echo(
+        f"{result['orders']} order prices normalized in "
+        f"{time.perf_counter() - start:.2f}s", err=True
+    )
+    if created["skipped"]:
+        sys.exit(1)
+
+
+def register_commands(app: Flask):
+    """Attach all CLI commands to an application."""
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(refresh_rates_command)
+    app.cli.add_command(rebuild_summaries_command)
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(ingest_orders_command)
+    app.cli.add_command(upgrade_db_command)
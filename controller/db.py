@@ -0,0 +1,63 @@
+"""Request-scoped database session helpers.
+
+One SQLAlchemy session is created lazily per request and closed when the
+application context is torn down.
+
+With read replicas configured (see `database.routing`), request sessions
+read from a replica. A request that wrote pins its client to the
+primary for `REPLICA_STICKY_SECONDS` (default 5) through the Flask
+session, so the client reads its own writes even before the replicas
+have caught up, in any worker process.
+"""
+
+import os
+import time
+from flask import g, session
+from database.db_funcs import get_session
+from database.routing import WROTE, replica_set
+
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+
+def get_db():
+    """
+    Return the database session of the current request.
+
+    The session is created lazily on first use, so requests that never
+    touch the database never check out a connection.
+
+    Returns:
+        Session: SQLAlchemy session bound to the current request.
+    """
+    if 'db' not in g:
+        pinned = session.get('primary_until', 0) > time.time()
+        g.db = get_session(replica_reads=not pinned)
+    return g.db
+
+
+def remember_writes(response):
+    """
+    Pin the client to the primary after a request that wrote.
+
+    Args:
+        response (Response): Outgoing response.
+
+    Returns:
+        Response: The same response.
+    """
+    db = g.get('db')
+    if replica_set.enabled and db is not None and db.info.get(WROTE):
+        session['primary_until'] = time.time() + REPLICA_STICKY_SECONDS
+    return response
+
+
+def close_db(exception=None):
+    """
+    Close the request's database session, if one was opened.
+
+    Args:
+        exception (Exception | None): Unhandled exception, if any.
+    """
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
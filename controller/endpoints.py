@@ -1,29 +1,54 @@
 """Flask application endpoints and helpers.
 
-This module initializes the Flask app, configures language handling,
-and defines routes for public pages and authenticated user pages.
+This module defines the `pages` blueprint: language handling and routes
+for public pages and authenticated user pages. The application itself
+is built by `controller.app.create_app`.
 
 Main features:
-- Multi-language support via JSON dictionaries in `languages/`.
-- User registration and authentication with SQLAlchemy sessions.
+- Multi-language support via JSON dictionaries in `languages/`, served
+  from an in-memory catalog (see `controller.translations`).
+- User registration and authentication with one lazily created
+  SQLAlchemy session per request (`get_db`).
 - Session-based user state management and logout.
 - Routes for home, about, features, contacts, profile, orders, and
-  settings pages.
+  settings pages. Public pages are served from a rendered-page cache
+  (see `controller.page_cache`).
+- Streaming CSV/XLSX export of the full order history, with enum and
+  currency values in the session language.
 """
 
-import json
-from flask import Flask, render_template, request, session, redirect, url_for
+import enum
+import os
+from datetime import date
+from sqlalchemy.exc import IntegrityError
+from flask import (
+    Blueprint, Response, abort, render_template, request, session,
+    redirect, stream_with_context, url_for
+)
 from database.db_funcs import register_user, logIn_success, get_from_db
-from database.db_funcs import SessionLocal
-from model.forms import LoginForm, RegistrationForm
+from database.db_funcs import ORDER_HISTORY_SORTS, get_orders_page
+from database.db_funcs import get_order_detail
+from database.db_funcs import update_db
+from database.export import ORDER_EXPORT_COLUMNS, iter_order_export
+from database.rates import rate_table
+from database.summaries import build_dashboard, get_order_summary
+from database.passwords import PasswordPoolBusy
+from model.forms import LoginForm, ProfileForm, RegistrationForm
+from controller.db import get_db
+from controller.page_cache import cached_page
+from controller.throttle import login_wait
+from controller.translations import catalog, enum_label
+from monitoring.metrics import timed
+from services.ratelimit import retry_after
+from services.spreadsheet import (
+    CSV_MIMETYPE, XLSX_MIMETYPE, csv_chunks, xlsx_chunks
+)
 
 
-app = Flask(
-    __name__,
-    template_folder="../templates",
-    static_folder="../static"
-)
-app.secret_key = "some_secret_key"
+pages = Blueprint("pages", __name__)
+
+SERVER_BUSY_MESSAGE = 'Server is busy, please try again in a moment'
+TOO_MANY_ATTEMPTS_MESSAGE = 'Too many login attempts, please try again later'
 
 
 def load_translation(language: str):
@@ -34,20 +59,18 @@ def load_translation(language: str):
         language (str): Language code (e.g., "en", "de", "fr").
 
     Returns:
-        dict: Dictionary with translations loaded from JSON file.
+        dict: Dictionary with translations from the in-memory catalog.
 
     Notes:
-        - Falls back to English (`languages/en.json`) if the file is not found.
+        - Falls back to English if the language is unknown.
+        - Missing keys are filled in from English.
+        - No file I/O happens here unless a language file changed on disk.
     """
-    try:
-        with open(f"languages/{language}.json", encoding="utf-8") as dictfile:
-            return json.load(dictfile)
-    except FileNotFoundError:
-        with open("languages/en.json", encoding="utf-8") as dictfile:
-            return json.load(dictfile)
+    with timed("translations"):
+        return catalog.get(language)
 
 
-@app.before_request
+@pages.before_app_request
 def set_language():
     """
     Set the current language for the session.
@@ -55,14 +78,18 @@ def set_language():
     Behavior:
         - Reads 'lang' parameter from query string if provided.
         - Defaults to English ('en') if no language is set in session.
+        - Skipped for static files, so their responses do not vary on
+          the session cookie.
     """
+    if request.endpoint == 'static':
+        return
     lang = request.args.get('lang')
     if lang:
         session['lang'] = lang
     session.setdefault('lang', 'en')
 
 
-@app.context_processor
+@pages.app_context_processor
 def inject_translations():
     """
     Inject translations into Jinja2 templates.
@@ -74,7 +101,8 @@ def inject_translations():
     return {'l': load_translation(lang)}
 
 
-@app.route("/")
+@pages.route("/")
+@cached_page
 def home_page():
     """
     Render the home page.
@@ -91,7 +119,8 @@ def home_page():
         return render_template("homepage.html")
 
 
-@app.route("/about")
+@pages.route("/about")
+@cached_page
 def about_page():
     """
     Render the "About" page.
@@ -108,7 +137,8 @@ def about_page():
         return render_template("about.html")
 
 
-@app.route("/features")
+@pages.route("/features")
+@cached_page
 def features_page():
     """
     Render the "Features" page.
@@ -125,7 +155,7 @@ def features_page():
         return render_template("features.html")
 
 
-@app.route("/signUp", methods=["GET", "POST"])
+@pages.route("/signUp", methods=["GET", "POST"])
 def signUp_page():
     """
     Handle user registration.
@@ -134,6 +164,7 @@ def signUp_page():
         - Display registration form.
         - On POST: validate input, register user via database functions.
         - Redirect to login page on success.
+        - Respond with 503 if the password hashing pool is saturated.
 
     Returns:
         Rendered signup template (with possible messages) or redirect.
@@ -148,18 +179,22 @@ def signUp_page():
         userType = form.userType.data
         password = form.password.data
 
-        with SessionLocal() as db:
+        try:
             message = register_user(
-                db, email, fullName, company, userType, password
+                get_db(), email, fullName, company, userType, password
             )
+        except PasswordPoolBusy:
+            return render_template(
+                "signUp.html", form=form, message=SERVER_BUSY_MESSAGE
+            ), 503
 
         if message == 'Registration successful':
-            return redirect(url_for('logIn_page'))
+            return redirect(url_for('.logIn_page'))
 
     return render_template("signUp.html", form=form, message=message)
 
 
-@app.route("/logIn", methods=["GET", "POST"])
+@pages.route("/logIn", methods=["GET", "POST"])
 def logIn_page():
     """
     Handle user login.
@@ -167,26 +202,40 @@ def logIn_page():
     Workflow:
         - Display login form.
         - On POST: validate input, authenticate via database.
+        - Respond with 429 before touching the database when the
+          client IP or the email address ran out of attempts
+          (see `controller.throttle`).
         - On success: save user info in session and redirect to profile.
         - On failure: re-render login page with error message.
+        - Respond with 503 if the password hashing pool is saturated.
 
     Returns:
         Rendered login template or redirect to profile.
     """
     if 'user_id' in session:
-        return redirect(url_for('profile_page'))
+        return redirect(url_for('.profile_page'))
 
     form = LoginForm()
     if form.validate_on_submit():
         login = form.email.data
         password = form.password.data
 
-        with SessionLocal() as db:
-            user_id, user_name = logIn_success(db, login, password)
+        wait = login_wait(login)
+        if wait:
+            return render_template(
+                'logIn.html', form=form, message=TOO_MANY_ATTEMPTS_MESSAGE
+            ), 429, {'Retry-After': retry_after(wait)}
+
+        try:
+            user_id, user_name = logIn_success(get_db(), login, password)
+        except PasswordPoolBusy:
+            return render_template(
+                'logIn.html', form=form, message=SERVER_BUSY_MESSAGE
+            ), 503
         if user_id:
             session['user_id'] = user_id
             session['user_name'] = user_name
-            return redirect(url_for('profile_page'))
+            return redirect(url_for('.profile_page'))
         else:
             return render_template(
                 'logIn.html',
@@ -196,7 +245,8 @@ def logIn_page():
     return render_template('logIn.html', form=form)
 
 
-@app.route("/contacts")
+@pages.route("/contacts")
+@cached_page
 def contacts_page():
     """
     Render the "Contacts" page.
@@ -213,69 +263,242 @@ def contacts_page():
         return render_template("contacts.html")
 
 
-@app.route("/profile")
+@pages.route("/profile")
 def profile_page():
     """
     Display the logged-in user's profile.
 
     Workflow:
         - Fetch user data (name, email, company) from database.
-        - Render profile template with user details.
+        - Read the precomputed order summary (a few rows per user,
+          independent of the number of orders).
+        - Render profile template with user details and dashboard.
 
     Returns:
         Rendered profile template.
     """
-    with SessionLocal() as db:
-        name, email, company = get_from_db(
-            db, session['user_id'], 'fullName', 'email', 'company'
-        )
+    db = get_db()
+    name, email, company = get_from_db(
+        db, session['user_id'], 'fullName', 'email', 'company'
+    )
+    dashboard = build_dashboard(
+        get_order_summary(db, session['user_id']), rate_table.convert
+    )
     return render_template(
         'profile.html',
         user_name=name,
         user_email=email,
-        user_company=company
+        user_company=company,
+        dashboard=dashboard,
+        base_currency=rate_table.base.value
     )
 
 
-@app.route("/profile/orders")
+ROWS_PER_PAGE_CHOICES = (5, 10, 20)
+
+
+@pages.route("/profile/orders")
 def orders_page():
     """
-    Display the user's orders page.
+    Display the user's order history.
+
+    Workflow:
+        - Read page size (`rows`), sort order (`sort`: `date` or
+          `price`) and keyset cursor (`after`) from the query string.
+        - Fetch one page of orders, newest or priciest first; prices
+          are compared in the base currency.
+
+    Returns:
+        Rendered orders template or redirect to login page.
+    """
+    if 'user_id' not in session:
+        return redirect(url_for('.logIn_page'))
+
+    rows_per_page = request.args.get('rows', 10, type=int)
+    if rows_per_page not in ROWS_PER_PAGE_CHOICES:
+        rows_per_page = 10
+    sort = request.args.get('sort', 'date')
+    if sort not in ORDER_HISTORY_SORTS:
+        sort = 'date'
+    cursor = request.args.get('after')
+
+    orders, next_cursor = get_orders_page(
+        get_db(), session['user_id'], rows_per_page, cursor, sort
+    )
+    return render_template(
+        'orders.html',
+        orders=orders,
+        rows_per_page=rows_per_page,
+        sort=sort,
+        base_currency=rate_table.base.value,
+        next_cursor=next_cursor,
+        is_first_page=not cursor
+    )
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, CSV_MIMETYPE),
+    'xlsx': (xlsx_chunks, XLSX_MIMETYPE),
+}
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+
+@pages.route("/profile/orders/export")
+def export_orders():
+    """
+    Download the user's complete order history.
+
+    Workflow:
+        - Read the file format (`format`: `csv` or `xlsx`) from the
+          query string.
+        - Stream the rows from the database in batches of
+          `EXPORT_BATCH_SIZE` and encode each batch as it arrives; the
+          response has no `Content-Length` and is sent chunked.
+        - Column titles, enum values and currencies use the session
+          language.
+
+    Returns:
+        Streamed attachment or redirect to login page.
+    """
+    if 'user_id' not in session:
+        return redirect(url_for('.logIn_page'))
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    encode, mimetype = EXPORT_FORMATS[export_format]
+
+    translations = load_translation(session.get('lang', 'en'))
+    base_currency = rate_table.base.value
+    header = [
+        translations.get(name, name).format(currency=base_currency)
+        for name, _ in ORDER_EXPORT_COLUMNS
+    ]
+
+    def translate(row):
+        return [
+            enum_label(translations, value)
+            if isinstance(value, enum.Enum) else value
+            for value in row
+        ]
+
+    batches = iter_order_export(
+        get_db(), session['user_id'], EXPORT_BATCH_SIZE
+    )
+    response = Response(
+        stream_with_context(encode(header, batches, translate)),
+        mimetype=mimetype,
+    )
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="orders-{date.today():%Y-%m-%d}'
+        f'.{export_format}"'
+    )
+    response.headers['Cache-Control'] = 'private, no-store'
+    # Ask a buffering reverse proxy to pass chunks through as they come.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@pages.route("/profile/orders/<int:order_number>")
+def order_detail_page(order_number):
+    """
+    Display one order of the user.
+
+    Workflow:
+        - Load the order with both parties and its contract in one
+          query (`ORDER_DETAIL_OPTIONS`); the user must be its owner or
+          its partner.
 
     Returns:
-        Rendered orders template.
+        Rendered order template, 404 for unknown orders and orders of
+        other users, or redirect to login page.
     """
-    return render_template('orders.html')
+    if 'user_id' not in session:
+        return redirect(url_for('.logIn_page'))
+
+    order = get_order_detail(get_db(), session['user_id'], order_number)
+    if order is None:
+        abort(404)
+    return render_template(
+        'order.html',
+        order=order,
+        base_currency=rate_table.base.value,
+    )
 
 
-@app.route("/profile/newOrder")
+@pages.route("/profile/newOrder")
 def new_order_page():
     pass
 
 
-@app.route("/profile/settings")
+@pages.route("/profile/settings")
 def settings_page():
     """
     Display the user's settings page.
 
+    Workflow:
+        - Prefill the profile form with the current user fields (served
+          from the profile cache).
+        - The form posts to `/updateProfile`.
+
     Returns:
-        Rendered settings template.
+        Rendered settings template, or redirect to login.
     """
-    return render_template('settings.html')
-
+    if 'user_id' not in session:
+        return redirect(url_for('.logIn_page'))
 
-@app.route("/updateProfile")
+    full_name, company, email, user_type = get_from_db(
+        get_db(), session['user_id'],
+        'fullName', 'company', 'email', 'userType'
+    )
+    first_name, _, last_name = (full_name or '').partition(' ')
+    profile_form = ProfileForm(data={
+        'firstName': first_name,
+        'lastName': last_name,
+        'company': company,
+        'email': email,
+        'userType': getattr(user_type, 'name', user_type),
+    })
+    return render_template('settings.html', profile_form=profile_form)
+
+
+@pages.route("/updateProfile", methods=["POST"])
 def update_profile():
     """
-    Placeholder for profile update functionality.
+    Handle profile updates submitted from the settings page.
+
+    Workflow:
+        - Validate the profile form.
+        - Write all fields with a single UPDATE via `update_db`.
+        - Refresh the user name kept in the session.
 
-    TODO:
-        - Implement form handling for updating user profile details.
+    Returns:
+        Redirect to profile page on success, to settings page otherwise.
     """
-    pass
+    if 'user_id' not in session:
+        return redirect(url_for('.logIn_page'))
 
+    form = ProfileForm()
+    if not form.validate_on_submit():
+        return redirect(url_for('.settings_page'))
+
+    fullName = f'{form.firstName.data} {form.lastName.data}'
+    try:
+        update_db(get_db(), session['user_id'], {
+            'fullName': fullName,
+            'company': form.company.data,
+            'email': form.email.data,
+            'userType': form.userType.data,
+        })
+    except IntegrityError:
+        get_db().rollback()
+        return redirect(url_for('.settings_page'))
 
-@app.route('/logout')
+    session['user_name'] = fullName
+    return redirect(url_for('.profile_page'))
+
+
+@pages.route('/logout')
 def logout():
     """
     Log out the current user.
@@ -289,4 +512,5 @@ def logout():
     """
     session.pop('user_id', None)
     session.pop('user_name', None)
-    return redirect(url_for('home_page'))
+    return redirect(url_for('.home_page'))
+
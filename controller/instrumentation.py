@@ -0,0 +1,218 @@
+"""Request instrumentation for the Flask application.
+
+Main features:
+- Per-endpoint latency histograms recorded in `before_request` /
+  `after_request` hooks.
+- Template rendering time via Flask's template signals.
+- A `Server-Timing` header on every response with the time spent in the
+  whole request, SQL, bcrypt, template rendering and translations.
+- Opt-in `/metrics` endpoint (`METRICS_ENABLED=1`) in Prometheus text
+  format; metrics are per worker process.
+- A sampling profiler enabled per request with the `X-Profile: 1`
+  header, only in debug/testing mode or with `PROFILING_ENABLED=1`.
+  Collapsed stacks are written to `PROFILE_DIR`.
+- An N+1 guard: with a query limit configured (`SQL_QUERY_LIMIT`,
+  default 20 in testing mode, off otherwise), a request issuing more SQL
+  statements fails with `QueryLimitExceeded`. `SQL_QUERY_LIMITS` maps
+  endpoints to their own limits.
+"""
+
+import os
+import tempfile
+import time
+from flask import (
+    Response, abort, before_render_template, current_app, g, request,
+    template_rendered
+)
+from database.cache import profile_cache
+from database.db_funcs import get_engine
+from database.passwords import hasher
+from database.pool import pool_stats
+from monitoring.metrics import (
+    end_request, format_labels, install_sql_hooks, record, registry,
+    start_request
+)
+from monitoring.profiler import SamplingProfiler
+from monitoring.querycount import (
+    check_query_limit, start_tracking, stop_tracking
+)
+from controller.page_cache import page_cache
+from controller.throttle import throttle_stats
+from controller.translations import catalog
+
+SERVER_TIMING_COMPONENTS = ("sql", "bcrypt", "render", "translations")
+DEFAULT_TEST_QUERY_LIMIT = 20
+
+
+def init_instrumentation(app):
+    """
+    Register instrumentation hooks and the `/metrics` endpoint on an app.
+
+    Args:
+        app (Flask): Application to instrument.
+    """
+    app.config.setdefault(
+        "METRICS_ENABLED", os.getenv("METRICS_ENABLED", "0") == "1"
+    )
+    app.config.setdefault(
+        "PROFILING_ENABLED", os.getenv("PROFILING_ENABLED", "0") == "1"
+    )
+    app.config.setdefault(
+        "PROFILE_DIR",
+        os.getenv("PROFILE_DIR", os.path.join(
+            tempfile.gettempdir(), "emptyleg-profiles"
+        ))
+    )
+
+    limit = os.getenv("SQL_QUERY_LIMIT")
+    app.config.setdefault(
+        "SQL_QUERY_LIMIT",
+        int(limit) if limit else
+        DEFAULT_TEST_QUERY_LIMIT if app.testing else None
+    )
+    app.config.setdefault("SQL_QUERY_LIMITS", {})
+
+    install_sql_hooks()
+    app.before_request(_start_timing)
+    app.after_request(_finish_timing)
+    app.teardown_request(_stop_profiler)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_finished, app)
+    app.add_url_rule("/metrics", "metrics", metrics)
+
+
+def _profiling_allowed():
+    app = current_app
+    return app.debug or app.testing or app.config["PROFILING_ENABLED"]
+
+
+def _query_limit():
+    limits = current_app.config["SQL_QUERY_LIMITS"]
+    if request.endpoint in limits:
+        return limits[request.endpoint]
+    return current_app.config["SQL_QUERY_LIMIT"]
+
+
+def _start_timing():
+    g.request_started = time.perf_counter()
+    start_request()
+    if _query_limit() is not None:
+        g.sql_statements = start_tracking()
+    if request.headers.get("X-Profile") == "1" and _profiling_allowed():
+        g.profiler = SamplingProfiler().start()
+
+
+def _finish_timing(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    timings = end_request()
+
+    if g.pop("sql_statements", None) is not None:
+        check_query_limit(
+            stop_tracking(), _query_limit(),
+            f"{request.method} {request.path}",
+        )
+
+    registry.observe(
+        "http_request_duration_seconds", elapsed,
+        "Request latency per endpoint",
+        endpoint=request.endpoint or "unknown",
+        method=request.method,
+    )
+    registry.inc(
+        "http_requests_total", 1, "Requests per endpoint and status",
+        endpoint=request.endpoint or "unknown",
+        status=response.status_code,
+    )
+
+    parts = [f"app;dur={elapsed * 1000:.2f}"]
+    for component in SERVER_TIMING_COMPONENTS:
+        if component in timings:
+            seconds, calls = timings[component]
+            parts.append(
+                f'{component};dur={seconds * 1000:.2f};desc="{calls} calls"'
+            )
+    response.headers["Server-Timing"] = ", ".join(parts)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        path = profiler.write(
+            current_app.config["PROFILE_DIR"], request.endpoint or "request"
+        )
+        response.headers["X-Profile-Output"] = path
+    return response
+
+
+def _stop_profiler(exception=None):
+    # Requests that raised never reach after_request.
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+    end_request()
+    if g.pop("sql_statements", None) is not None:
+        stop_tracking()
+
+
+def _render_started(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+
+def _render_finished(sender, template, context, **extra):
+    started = g.pop("render_started", None)
+    if started is not None:
+        record("render", time.perf_counter() - started)
+
+
+def _gauge_lines(name, help_text, values, **labels):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            sample_labels = format_labels(
+                tuple(sorted({**labels, "stat": key}.items()))
+            )
+            lines.append(f"{name}{sample_labels} {value}")
+    return lines
+
+
+def metrics():
+    """
+    Expose process metrics in Prometheus text format.
+
+    Returns:
+        Plain-text metrics, or 404 unless `METRICS_ENABLED` is set.
+    """
+    if not current_app.config["METRICS_ENABLED"]:
+        abort(404)
+    lines = [registry.render().rstrip("\n")]
+    lines += _gauge_lines(
+        "db_pool", "Database connection pool statistics",
+        pool_stats(get_engine()),
+    )
+    lines += _gauge_lines(
+        "profile_cache", "User field cache statistics", profile_cache.stats()
+    )
+    lines += _gauge_lines(
+        "page_cache", "Rendered page cache statistics", page_cache.stats()
+    )
+    lines += _gauge_lines(
+        "translation_catalog", "Translation catalog statistics",
+        catalog.stats(),
+    )
+    lines += _gauge_lines(
+        "password_pool", "Password hashing pool statistics", hasher.stats()
+    )
+    throttle = throttle_stats()
+    lines += _gauge_lines(
+        "login_throttle", "Login attempt limiter statistics",
+        throttle["ip"], limiter="ip",
+    )
+    lines += _gauge_lines(
+        "login_throttle", "", throttle["email"], limiter="email"
+    )[2:]
+    return Response(
+        "\n".join(lines) + "\n",
+        mimetype="text/plain; version=0.0.4; charset=utf-8",
+    )
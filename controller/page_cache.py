@@ -0,0 +1,198 @@
+"""Rendered-page cache for public pages.
+
+The home, about, features and contacts pages depend only on the session
+language and the logged-in user's name, so their rendered HTML is kept
+in memory and re-rendered only when a template or translation changes.
+
+Main features:
+- `cached_page` view decorator keyed by `(endpoint, language,
+  user_name)`.
+- LRU eviction bounded by the total size of the cached bodies.
+- Strong ETags (hash of the body) and `304 Not Modified` answers, also
+  for pages served from the cache.
+- `Cache-Control`: anonymous pages are `public` with a short `max-age`
+  and a longer `s-maxage` for shared caches; pages of logged-in users
+  are `private, no-cache` and revalidate with the ETag.
+- Invalidation: the cache is cleared when the translation catalog
+  version changes or any file in `templates/` is modified; both checks
+  are throttled to once per `check_interval` seconds.
+
+Notes:
+- The cache is per process, like the translation catalog.
+- Responses vary on the session cookie, which carries the language and
+  user name.
+
+Environment variables:
+- `PAGE_CACHE_BYTES`: maximum total size of cached pages (default 16 MiB).
+- `PAGE_CACHE_MAX_AGE`: browser `max-age` of anonymous pages (default 60).
+- `PAGE_CACHE_SHARED_MAX_AGE`: `s-maxage` of anonymous pages
+  (default 300).
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, request, session
+from controller.translations import catalog
+
+TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "templates"
+)
+
+
+class PageCache:
+    """Size-bounded LRU cache of rendered pages."""
+
+    def __init__(self, max_bytes=16 * 1024 * 1024,
+                 templates_dir=TEMPLATES_DIR, check_interval=2.0):
+        """
+        Args:
+            max_bytes (int): Maximum total size of cached bodies.
+            templates_dir (str): Directory whose files invalidate the
+                cache when modified.
+            check_interval (float): Minimum number of seconds between two
+                checks of templates and translations.
+        """
+        self.max_bytes = max_bytes
+        self.templates_dir = templates_dir
+        self.check_interval = check_interval
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._version = None
+        self._next_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _templates_signature(self):
+        return tuple(sorted(
+            (os.path.join(root, name),
+             os.stat(os.path.join(root, name)).st_mtime_ns)
+            for root, _, files in os.walk(self.templates_dir)
+            for name in files
+        ))
+
+    def check(self):
+        """Clear the cache if templates or translations changed."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        version = (catalog.current_version(), self._templates_signature())
+        with self._lock:
+            self._next_check = now + self.check_interval
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._version = version
+                self._pages.clear()
+                self._size = 0
+
+    def get(self, key):
+        """Return `(body, etag)` for a key, or None."""
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, body):
+        """
+        Store a rendered body.
+
+        Args:
+            key (tuple): Cache key.
+            body (bytes): Rendered page.
+
+        Returns:
+            tuple: `(body, etag)`.
+        """
+        entry = (body, hashlib.sha256(body).hexdigest()[:32])
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._pages.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._pages[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._pages.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+        return entry
+
+    def clear(self):
+        """Drop all pages."""
+        with self._lock:
+            self._pages.clear()
+            self._size = 0
+
+    def stats(self):
+        """Return size and hit/miss/eviction/invalidation counters."""
+        return {
+            "pages": len(self._pages),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+page_cache = PageCache(
+    max_bytes=int(os.getenv("PAGE_CACHE_BYTES", 16 * 1024 * 1024))
+)
+
+
+def _page_response(body, etag, user_name):
+    response = Response(body, mimetype="text/html")
+    response.set_etag(etag)
+    if user_name is None:
+        response.cache_control.public = True
+        response.cache_control.max_age = int(
+            os.getenv("PAGE_CACHE_MAX_AGE", 60)
+        )
+        response.cache_control.s_maxage = int(
+            os.getenv("PAGE_CACHE_SHARED_MAX_AGE", 300)
+        )
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response.make_conditional(request)
+
+
+def cached_page(view):
+    """
+    Serve a GET view from the page cache.
+
+    The view's output must depend only on the session language and
+    `user_name`. Non-200 responses are passed through uncached.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(*args, **kwargs)
+
+        user_name = session.get('user_name')
+        key = (request.endpoint, session.get('lang', 'en'), user_name)
+        page_cache.check()
+        entry = page_cache.get(key)
+        if entry is None:
+            response = view(*args, **kwargs)
+            if isinstance(response, str):
+                response = Response(response, mimetype="text/html")
+            if response.status_code != 200:
+                return response
+            entry = page_cache.set(key, response.get_data())
+        return _page_response(*entry, user_name)
+    return wrapper
@@ -0,0 +1,81 @@
+"""Production server entry point.
+
+Runs the application under gunicorn with pre-forked workers. The app is
+created, the schema initialized and templates and translations warmed
+up once in the master process; workers are then forked from that state
+and share it copy-on-write.
+
+Environment variables:
+- `BIND`: address to listen on (default "0.0.0.0:5000").
+- `WEB_CONCURRENCY`: number of worker processes (default: 2 per CPU + 1).
+- `WEB_THREADS`: threads per worker (default 8 with the live order feed
+  enabled, else 1). With more than one thread workers use gunicorn's
+  `gthread` worker class.
+- `WEB_TIMEOUT`: worker timeout in seconds (default 30).
+- `FEED_ENABLED`: serve `/api/feed/orders` (default 1).
+
+Every live feed connection holds a worker thread, so feed clients are
+limited to `WEB_THREADS - 1` per worker, and the feed is switched off
+with a single thread: a sync worker would be pinned by one stream and
+killed after `WEB_TIMEOUT`.
+"""
+
+import gc
+import logging
+import os
+from database.db_funcs import dispose_engine, init_db
+from controller.app import create_app, warm_up
+from services.feed import feed_hub
+
+logger = logging.getLogger(__name__)
+
+
+def _post_fork(server, worker):
+    # Never share pooled connections inherited from the master.
+    dispose_engine(close=False)
+
+
+def serve():
+    """Build, warm up and serve the application with gunicorn."""
+    from gunicorn.app.base import BaseApplication
+
+    app = create_app()
+    init_db()
+    dispose_engine()
+    warm_up(app)
+    # Keep warm objects out of the GC's reach so collections in the
+    # workers do not touch (and copy) the shared pages.
+    gc.freeze()
+
+    threads = int(
+        os.getenv("WEB_THREADS", 8 if app.config["FEED_ENABLED"] else 1)
+    )
+    if app.config["FEED_ENABLED"]:
+        if threads > 1:
+            # Keep a thread for ordinary requests.
+            feed_hub.max_clients = min(feed_hub.max_clients, threads - 1)
+        else:
+            logger.warning("live order feed disabled: WEB_THREADS is 1")
+            app.config["FEED_ENABLED"] = False
+
+    options = {
+        "bind": os.getenv("BIND", "0.0.0.0:5000"),
+        "workers": int(
+            os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1)
+        ),
+        "worker_class": "gthread" if threads > 1 else "sync",
+        "threads": threads,
+        "timeout": int(os.getenv("WEB_TIMEOUT", 30)),
+        "preload_app": True,
+        "post_fork": _post_fork,
+    }
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
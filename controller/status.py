@@ -0,0 +1,105 @@
+"""Operational status endpoints.
+
+Defines the `status` blueprint with a readiness check for load balancers
+and process managers, database connection pool statistics and in-process
+cache statistics, the health of read replicas and the order feed.
+
+Only `/ready` is public. The `/status/*` endpoints expose internals
+(replica URLs, pool and cache sizes) and, like `/metrics`, answer 404
+unless `METRICS_ENABLED` is set.
+"""
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from database.cache import profile_cache
+from database.db_funcs import get_engine
+from database.pool import pool_stats
+from database.rates import rate_table
+from database.routing import replica_set
+from services.autocomplete import autocomplete
+from services.feed import feed_hub
+from services.geo import airport_locator
+from services.matching import matcher
+from controller.page_cache import page_cache
+from controller.translations import catalog
+
+
+status = Blueprint("status", __name__)
+
+
+@status.before_request
+def _require_metrics_enabled():
+    if request.endpoint != "status.readiness" \
+            and not current_app.config["METRICS_ENABLED"]:
+        abort(404)
+
+
+@status.route('/ready')
+def readiness():
+    """
+    Report whether this worker has finished warming up.
+
+    Returns:
+        JSON `{"ready": bool}` with status 200 when templates and
+        translations are preloaded, 503 otherwise.
+    """
+    ready = current_app.extensions.get('warm', False)
+    return jsonify(ready=ready), 200 if ready else 503
+
+
+@status.route('/status/db-pool')
+def db_pool_status():
+    """
+    Report database connection pool statistics.
+
+    Returns:
+        JSON with checked out connections, overflow and checkout wait
+        times of this worker process.
+    """
+    return jsonify(pool_stats(get_engine()))
+
+
+@status.route('/status/replicas')
+def replica_status():
+    """
+    Report read replica health.
+
+    Returns:
+        JSON `{"replicas": [...]}` with the URL (without password),
+        health, last error and selection count of every replica, as
+        seen by this worker process.
+    """
+    get_engine()
+    return jsonify(replicas=replica_set.stats())
+
+
+@status.route('/status/feed')
+def feed_status():
+    """
+    Report the order feed of this worker process.
+
+    Returns:
+        JSON with connected clients, subscribed routes and
+        dispatch/delivery/eviction counters.
+    """
+    return jsonify(feed=feed_hub.stats())
+
+
+@status.route('/status/caches')
+def cache_status():
+    """
+    Report hit/miss counters of the in-process caches.
+
+    Returns:
+        JSON with profile field cache, page cache, translation catalog,
+        autocomplete index, airport index, exchange rate and matching
+        engine statistics of this worker process.
+    """
+    return jsonify(
+        profile=profile_cache.stats(),
+        pages=page_cache.stats(),
+        translations=catalog.stats(),
+        autocomplete=autocomplete.stats(),
+        airports=airport_locator.stats(),
+        rates=rate_table.stats(),
+        matching=matcher.stats(),
+    )
@@ -0,0 +1,74 @@
+"""Login throttling.
+
+Every login attempt costs a database lookup and a bcrypt check, so
+attempts are counted per client IP and per email address with token
+buckets (see `services.ratelimit`) and rejected before any of that work
+once a bucket is empty.
+
+Environment variables (read on the first login attempt, after
+`create_app` has loaded `.env`):
+- `LOGIN_IP_BURST` / `LOGIN_IP_PER_MINUTE`: attempts per client IP
+  (default burst 20, then 10 per minute).
+- `LOGIN_EMAIL_BURST` / `LOGIN_EMAIL_PER_MINUTE`: attempts per email
+  address (default burst 5, then 2 per minute).
+- `RATE_LIMIT_REDIS_URL`: share the buckets between worker processes.
+- `TRUSTED_PROXIES`: see `controller.app.create_app`; without it, all
+  clients behind a reverse proxy share the proxy's IP bucket.
+"""
+
+import os
+import threading
+from flask import request
+from services.ratelimit import make_limiter
+
+_limiters = None
+_limiters_lock = threading.Lock()
+
+
+def _get_limiters():
+    global _limiters
+    if _limiters is None:
+        with _limiters_lock:
+            if _limiters is None:
+                _limiters = {
+                    "ip": make_limiter(
+                        float(os.getenv("LOGIN_IP_BURST", 20)),
+                        float(os.getenv("LOGIN_IP_PER_MINUTE", 10)),
+                        "login-ip",
+                    ),
+                    "email": make_limiter(
+                        float(os.getenv("LOGIN_EMAIL_BURST", 5)),
+                        float(os.getenv("LOGIN_EMAIL_PER_MINUTE", 2)),
+                        "login-email",
+                    ),
+                }
+    return _limiters
+
+
+def login_wait(email):
+    """
+    Count a login attempt of the current request.
+
+    The IP bucket is checked first, so a rejected client does not drain
+    the bucket of the email address it tries.
+
+    Args:
+        email (str): Submitted email address.
+
+    Returns:
+        float: 0 if the attempt may proceed, otherwise seconds to wait.
+    """
+    limiters = _get_limiters()
+    wait = limiters["ip"].acquire(request.remote_addr or "unknown")
+    if wait:
+        return wait
+    return limiters["email"].acquire(email.strip().casefold())
+
+
+def throttle_stats():
+    """Return the statistics of both login limiters."""
+    limiters = _get_limiters()
+    return {
+        "ip": limiters["ip"].stats(),
+        "email": limiters["email"].stats(),
+    }
@@ -0,0 +1,162 @@
+"""In-memory translation catalog.
+
+This module keeps every `languages/*.json` dictionary parsed in memory
+so that rendering a page does not touch the filesystem.
+
+Main features:
+- All language files are loaded once, on first use.
+- Missing keys are filled in from the English dictionary.
+- Files are reloaded only when their modification time changes; the
+  mtime check itself is throttled to once per `check_interval` seconds.
+- Load and hit counters are exposed via `TranslationCatalog.stats()`.
+- `enum_label` renders model enum members (currencies, statuses, cargo
+  types) with keys such as `paymentStatusPartiallyPaid`.
+"""
+
+import json
+import os
+import threading
+import time
+
+LANGUAGES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "languages"
+)
+DEFAULT_LANGUAGE = "en"
+
+
+class TranslationCatalog:
+    """Thread-safe cache of translation dictionaries keyed by language."""
+
+    def __init__(self, directory=LANGUAGES_DIR, check_interval=2.0):
+        """
+        Args:
+            directory (str): Directory with `<lang>.json` files.
+            check_interval (float): Minimum number of seconds between two
+                mtime checks of the language files. `0` checks on every
+                lookup, a negative value disables reloading.
+        """
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._raw = {}
+        self._mtimes = {}
+        self._merged = {}
+        self._next_check = 0.0
+        self.version = 0
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, language: str):
+        """
+        Return the translation dictionary for the given language.
+
+        Args:
+            language (str): Language code (e.g., "en", "de", "ru").
+
+        Returns:
+            dict: Translations with missing keys filled in from English.
+                  Unknown languages get the English dictionary.
+        """
+        self._maybe_refresh()
+        merged = self._merged.get(language)
+        if merged is None:
+            self.misses += 1
+            return self._merged.get(DEFAULT_LANGUAGE, {})
+        self.hits += 1
+        return merged
+
+    def languages(self):
+        """Return the sorted list of available language codes."""
+        self._maybe_refresh()
+        return sorted(self._merged)
+
+    def stats(self):
+        """Return load, hit and miss counters of the catalog."""
+        return {
+            "languages": len(self._merged),
+            "version": self.version,
+            "loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def current_version(self):
+        """Return the catalog version, after checking for changed files."""
+        self._maybe_refresh()
+        return self.version
+
+    def reload(self):
+        """Force a re-scan of the language directory."""
+        with self._lock:
+            self._next_check = 0.0
+            self._refresh_locked(time.monotonic())
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._merged and (self.check_interval < 0 or now < self._next_check):
+            return
+        with self._lock:
+            if self._merged and now < self._next_check:
+                return
+            self._refresh_locked(now)
+
+    def _refresh_locked(self, now):
+        self._next_check = now + max(self.check_interval, 0)
+        seen = {}
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                path = os.path.join(self.directory, filename)
+                seen[filename[:-5]] = (path, os.stat(path).st_mtime_ns)
+
+        changed = set(self._raw) - set(seen)
+        for language, (path, mtime) in seen.items():
+            if self._mtimes.get(language) == mtime:
+                continue
+            with open(path, encoding="utf-8") as dictfile:
+                self._raw[language] = json.load(dictfile)
+            self._mtimes[language] = mtime
+            self.loads += 1
+            changed.add(language)
+
+        if not changed:
+            return
+
+        for language in set(self._raw) - set(seen):
+            del self._raw[language]
+            del self._mtimes[language]
+
+        fallback = self._raw.get(DEFAULT_LANGUAGE, {})
+        self._merged = {
+            language: {**fallback, **translations}
+            for language, translations in self._raw.items()
+        }
+        self.version += 1
+
+
+catalog = TranslationCatalog()
+
+
+def enum_label(translations, member):
+    """
+    Translate a model enum member.
+
+    The key is the enum class name without the `Enum` suffix followed by
+    the member name in camel case, e.g. `PaymentStatusEnum.partially_paid`
+    becomes `paymentStatusPartiallyPaid`.
+
+    Args:
+        translations (dict): Dictionary returned by `catalog.get`.
+        member (enum.Enum | None): Member to render.
+
+    Returns:
+        str: Translated label, the member value if the key is missing,
+             or an empty string for None.
+    """
+    if member is None:
+        return ""
+    prefix = type(member).__name__.removesuffix("Enum")
+    key = prefix[:1].lower() + prefix[1:] + "".join(
+        part.capitalize() for part in member.name.split("_")
+    )
+    return translations.get(key, member.value)
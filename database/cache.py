@@ -0,0 +1,111 @@
+"""
+Cache Module
+
+This module provides a bounded, TTL-based LRU cache for user field
+lookups made through `get_from_db`.
+
+Features:
+- Entries are grouped per user id, so a write can invalidate every
+  cached field set of that user in O(1).
+- Least recently used users are evicted once `maxsize` is reached.
+- Hit, miss, eviction and invalidation counters via `stats()`.
+
+Notes:
+- The cache is per process. Writes invalidate the local cache only;
+  other worker processes see the change at the latest after `ttl`
+  seconds.
+
+Environment variables:
+- `PROFILE_CACHE_SIZE`: maximum number of cached users (default 10000).
+- `PROFILE_CACHE_TTL`: seconds an entry stays valid (default 300).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class UserFieldCache:
+    """LRU cache of `(user_id, fields) -> value` entries with a TTL."""
+
+    def __init__(self, maxsize=10000, ttl=300.0):
+        """
+        Args:
+            maxsize (int): Maximum number of users kept in the cache.
+            ttl (float): Seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id, fields):
+        """
+        Return a cached value, or `MISSING` if absent or expired.
+
+        Args:
+            user_id (int): User's ID.
+            fields (tuple): Requested field names.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is not None:
+                value, expires = entries.get(fields, (MISSING, 0.0))
+                if expires > now:
+                    self._users.move_to_end(user_id)
+                    self.hits += 1
+                    return value
+                entries.pop(fields, None)
+            self.misses += 1
+            return MISSING
+
+    def set(self, user_id, fields, value):
+        """Store a value for the user's field set."""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is None:
+                entries = self._users[user_id] = {}
+                while len(self._users) > self.maxsize:
+                    self._users.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._users.move_to_end(user_id)
+            entries[fields] = (value, expires)
+
+    def invalidate(self, user_id):
+        """Drop every cached field set of a user."""
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._users.clear()
+
+    def stats(self):
+        """Return size and hit/miss/eviction/invalidation counters."""
+        return {
+            "users": len(self._users),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+profile_cache = UserFieldCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", 300)),
+)
@@ -5,24 +5,97 @@ This module provides database initialization, user management,
 and helper functions for working with SQLAlchemy ORM models.
 
 Features:
-- Database connection setup with environment-based configuration.
-- User registration and authentication with password hashing.
-- Generic utility to fetch user fields from the database.
+- Lazy database connection setup with environment-based configuration,
+  including connection pool tuning (see `database.pool`) and read
+  replicas (see `database.routing`).
+- User registration and authentication with password hashing on a
+  bounded worker pool (see `database.passwords`).
+- Generic utility to fetch user fields from the database, with field
+  lookups cached per user (see `database.cache`).
+- Column-whitelisted single and batched user updates.
+- Keyset (seek) pagination of a user's order history.
+- Contract document references, authorized by contract party.
 """
 
-from sqlalchemy import create_engine
+from datetime import datetime
+import os
+import threading
+from sqlalchemy import bindparam, create_engine, select, tuple_, update
 from sqlalchemy.orm import sessionmaker, Session
-from model.dbModels import Base, User
+from model.dbModels import Base, Contract, User, Order
+from database.cache import MISSING, profile_cache
+from database.loaders import ORDER_DETAIL_OPTIONS, ORDER_HISTORY_OPTIONS
+from database.passwords import PasswordPoolBusy, hasher
+from database.pool import engine_options
+from database.routing import (
+    REPLICA_READS, RoutingSession, replica_set, use_primary
+)
 from dotenv import load_dotenv
-import os
-import bcrypt
 
-load_dotenv()
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False
+)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Return the process-wide SQLAlchemy engine, creating it on first use.
+
+    The `.env` file and `DATABASE_URL` are only read at that point, so
+    importing this module stays cheap and no connection pool exists
+    before worker processes are forked.
 
-SQLALCHEMY_DATABASE_URL = os.getenv('DATABASE_URL')
+    Replica engines from `DATABASE_REPLICA_URLS` are registered at the
+    same time and created on first use.
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Returns:
+        Engine: SQLAlchemy engine of the primary, bound to `SessionLocal`.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                load_dotenv()
+                url = os.getenv('DATABASE_URL')
+                replica_set.configure(
+                    os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+                )
+                _engine = create_engine(url, **engine_options(url))
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_session(replica_reads=False):
+    """
+    Open a new session bound to the lazily created engine.
+
+    Args:
+        replica_reads (bool): Send SELECTs to a read replica until the
+            session writes (see `database.routing`). Off by default, so
+            jobs and scripts read what they are about to change from the
+            primary.
+
+    Returns:
+        Session: SQLAlchemy session instance.
+    """
+    get_engine()
+    return SessionLocal(info={REPLICA_READS: replica_reads})
+
+
+def dispose_engine(close=True):
+    """
+    Drop pooled connections of the engine, if it was created.
+
+    Args:
+        close (bool): Close the connections. Pass False in a freshly
+            forked child so the parent's connections are left alone.
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+    replica_set.dispose(close=close)
 
 
 def init_db():
@@ -30,11 +103,13 @@ def init_db():
     Initialize the database schema.
 
     Creates all tables defined in SQLAlchemy models (if not already existing).
+    Existing tables are not altered; run the `upgrade-db` command (see
+    `database.schema`) after upgrading an existing database.
 
     Returns:
         None
     """
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 
 def hash_password(password):
@@ -46,10 +121,11 @@ def hash_password(password):
 
     Returns:
         str: Securely hashed password.
+
+    Raises:
+        PasswordPoolBusy: If the hashing pool is saturated.
     """
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode(), salt)
-    return hashed_password.decode()
+    return hasher.hash(password)
 
 
 def register_user(db: Session, email, fullName, company, userType, password):
@@ -68,7 +144,11 @@ def register_user(db: Session, email, fullName, company, userType, password):
         str: Status message:
              - "This email is already registered" if duplicate.
              - "Registration successful" if new user created.
+
+    Notes:
+        - Reads from the primary: a replica may not have the user yet.
     """
+    use_primary(db)
     existing_user = db.query(User).filter(User.email == email).first()
 
     if existing_user:
@@ -100,9 +180,26 @@ def logIn_success(db: Session, login, password):
         tuple:
             - (int, str): User ID and full name if authentication succeeds.
             - (None, None): If authentication fails.
+
+    Raises:
+        PasswordPoolBusy: If the hashing pool is saturated while checking
+            the password.
+
+    Notes:
+        - Hashes made with a different bcrypt cost factor than the
+          configured one are transparently rehashed on success. If the
+          pool is busy by then, the rehash is skipped until a later
+          login; the login itself succeeds.
     """
     user = db.query(User).filter(User.email == login).first()
-    if user and bcrypt.checkpw(password.encode(), user.password.encode()):
+    if user and hasher.check(password, user.password):
+        if hasher.needs_rehash(user.password):
+            try:
+                user.password = hasher.hash(password)
+            except PasswordPoolBusy:
+                pass
+            else:
+                db.commit()
         return user.id, user.fullName
     else:
         return None, None
@@ -123,6 +220,10 @@ def get_from_db(db: Session, user_id, *fields):
         - Single field value if one field requested.
         - Tuple of values if multiple fields requested.
         - None if user not found.
+
+    Notes:
+        - Field lookups are served from `profile_cache` when possible;
+          full User objects are never cached.
     """
     if not fields:
         user = db.query(User).filter(User.id == user_id).first()
@@ -135,6 +236,11 @@ def get_from_db(db: Session, user_id, *fields):
         user = db.query(User).filter(User.id == user_id).first()
         return user
 
+    cache_key = tuple(selected_fields)
+    cached = profile_cache.get(user_id, cache_key)
+    if cached is not MISSING:
+        return cached
+
     columns = [getattr(User, f) for f in selected_fields]
     result = db.query(*columns).filter(User.id == user_id).first()
 
@@ -142,22 +248,283 @@ def get_from_db(db: Session, user_id, *fields):
         return result
 
     if len(selected_fields) == 1:
-        return result[0]
+        value = result[0]
     else:
-        return tuple(result)
+        value = tuple(result)
+    profile_cache.set(user_id, cache_key, value)
+    return value
+
+
+# Columns that `update_db` and `bulk_update_db` are allowed to write.
+UPDATABLE_USER_FIELDS = frozenset(
+    {'email', 'fullName', 'company', 'userType', 'userRep'}
+)
+
+
+def _user_changes(data_dict):
+    return {
+        field: value for field, value in data_dict.items()
+        if field in UPDATABLE_USER_FIELDS
+    }
 
 
 def update_db(db: Session, user_id, data_dict):
     """
-    Update fields of a user in the database. (Currently unimplemented)
+    Update fields of a user in the database.
+
+    All changed fields are written with a single
+    `UPDATE users SET ... WHERE id = :id` statement; the User object is
+    not loaded first.
 
     Args:
         db (Session): SQLAlchemy session instance.
         user_id (int): User's ID.
-        data_dict (dict): Key-value pairs of fields to update.
+        data_dict (dict): Key-value pairs of fields to update. Fields
+                          outside `UPDATABLE_USER_FIELDS` are ignored.
+
+    Returns:
+        int: Number of updated rows (0 if nothing to update or the user
+             does not exist).
+
+    Notes:
+        - Commits the session.
+        - Invalidates the user's entries in `profile_cache`.
+    """
+    changes = _user_changes(data_dict)
+    if not changes:
+        return 0
+
+    result = db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(**changes)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    profile_cache.invalidate(user_id)
+    return result.rowcount
+
+
+def bulk_update_db(db: Session, entries):
+    """
+    Update many users in one transaction.
+
+    Entries are grouped by the set of changed columns and each group is
+    sent as one executemany of `UPDATE users SET ... WHERE id = :id`, so
+    a batch costs one round trip per column set instead of one per user.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        entries (Iterable[tuple[int, dict]]): `(user_id, changes)` pairs.
+                  Fields outside `UPDATABLE_USER_FIELDS` are ignored.
+
+    Returns:
+        int: Number of entries that had fields to update.
+
+    Notes:
+        - Commits the session once; rolls back if any statement fails.
+        - Invalidates the updated users' entries in `profile_cache`.
+    """
+    groups = {}
+    for user_id, data_dict in entries:
+        changes = _user_changes(data_dict)
+        if changes:
+            params = {f'v_{field}': value for field, value in changes.items()}
+            params['b_id'] = user_id
+            groups.setdefault(frozenset(changes), []).append(params)
+
+    table = User.__table__
+    try:
+        for fields, params in groups.items():
+            statement = (
+                table.update()
+                .where(table.c.id == bindparam('b_id'))
+                .values({field: bindparam(f'v_{field}') for field in fields})
+            )
+            db.execute(statement, params)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    updated = 0
+    for params in groups.values():
+        for entry in params:
+            profile_cache.invalidate(entry['b_id'])
+        updated += len(params)
+    return updated
+
+
+# Sort orders of the order history: name -> (column, cursor value parser).
+ORDER_HISTORY_SORTS = {
+    "date": (Order.orderDate, datetime.fromisoformat),
+    "price": (Order.normalizedPrice, float),
+}
+
+
+def encode_cursor(value, order_id):
+    """
+    Encode a keyset pagination cursor.
+
+    Args:
+        value (datetime | float): Sort key of the last row on a page.
+        order_id (int): `id` of the last row on a page.
+
+    Returns:
+        str: Opaque cursor usable in a query string.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return f"{value}_{order_id}"
+
+
+def decode_cursor(cursor, parse=datetime.fromisoformat):
+    """
+    Decode a cursor produced by `encode_cursor`.
 
-    TODO:
-        - Implement actual field updates.
+    Args:
+        cursor (str | None): Cursor from the query string.
+        parse (callable): Parser of the sort key (datetime by default).
+
+    Returns:
+        tuple | None: `(sort key, id)` or None if missing or malformed.
     """
-    for data in data_dict:
-        pass
+    if not cursor:
+        return None
+    try:
+        value, order_id = cursor.rsplit("_", 1)
+        return parse(value), int(order_id)
+    except ValueError:
+        return None
+
+
+def get_orders_page(db: Session, user_id, limit, cursor=None, sort="date"):
+    """
+    Fetch one page of a user's order history, newest or priciest first.
+
+    Uses keyset pagination on `(orderDate, id)` or `(normalizedPrice,
+    id)`, backed by the `ix_orders_user_date_id` and
+    `ix_orders_user_normalized_price_id` indexes, so every page costs the
+    same as the first one. Only the columns shown in the orders table
+    are loaded; partner and contract come from the same query
+    (`ORDER_HISTORY_OPTIONS`).
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        user_id (int): Owner of the orders.
+        limit (int): Page size.
+        cursor (str | None): Cursor of the previous page's last row.
+        sort (str): Key of `ORDER_HISTORY_SORTS`. Sorting by price skips
+            orders without a normalized price.
+
+    Returns:
+        tuple:
+            - list[Order]: Orders with `partner` and `contract` loaded.
+            - str | None: Cursor of the next page, None on the last page.
+    """
+    column, parse = ORDER_HISTORY_SORTS[sort]
+    query = (
+        db.query(Order)
+        .options(*ORDER_HISTORY_OPTIONS)
+        .filter(Order.userId == user_id)
+    )
+    if sort == "price":
+        query = query.filter(Order.normalizedPrice.is_not(None))
+
+    position = decode_cursor(cursor, parse)
+    if position is not None:
+        query = query.filter(tuple_(column, Order.id) < tuple_(*position))
+
+    rows = (
+        query.order_by(column.desc(), Order.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(getattr(last, column.key), last.id)
+    return rows, None
+
+
+def get_order_detail(db: Session, user_id, order_number):
+    """
+    Fetch one order of a user with both parties and its contract.
+
+    One query: parties and contract are joined (`ORDER_DETAIL_OPTIONS`).
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        user_id (int): Owner or partner of the order.
+        order_number (int): Order number.
+
+    Returns:
+        Order | None: The order, or None if it does not exist or the
+        user is neither its owner nor its partner.
+    """
+    return (
+        db.query(Order)
+        .options(*ORDER_DETAIL_OPTIONS)
+        .filter(
+            Order.orderNumber == order_number,
+            (Order.userId == user_id) | (Order.partnerUser == user_id),
+        )
+        .one_or_none()
+    )
+
+
+def _party_of(contract_id, user_id):
+    return (
+        (Contract.id == contract_id)
+        & ((Contract.chartererId == user_id) | (Contract.carrierId == user_id))
+    )
+
+
+def get_contract_file(db: Session, contract_id, user_id):
+    """
+    Return the document reference of a contract the user is party to.
+
+    Authorization and lookup are one primary-key query: contracts of
+    other users are indistinguishable from missing ones.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        contract_id (int): Contract's ID.
+        user_id (int): Charterer or carrier of the contract.
+
+    Returns:
+        tuple | None: `(found, contractFileUrl)`, where `found` is False
+        if the contract does not exist or the user is not a party.
+    """
+    row = db.execute(
+        select(Contract.contractFileUrl).where(_party_of(contract_id, user_id))
+    ).first()
+    return (False, None) if row is None else (True, row[0])
+
+
+def set_contract_file(db: Session, contract_id, user_id, file_url):
+    """
+    Point a contract at a stored document.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        contract_id (int): Contract's ID.
+        user_id (int): Charterer or carrier of the contract.
+        file_url (str): New `contractFileUrl`.
+
+    Returns:
+        bool: False if the contract does not exist or the user is not a
+              party.
+    """
+    try:
+        result = db.execute(
+            update(Contract)
+            .where(_party_of(contract_id, user_id))
+            .values(contractFileUrl=file_url)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result.rowcount == 1
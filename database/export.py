@@ -0,0 +1,68 @@
+"""
+Order Export Module
+
+This module reads a user's complete order history for download, in
+batches, so exporting hundreds of thousands of orders does not build
+them all in memory.
+
+Features:
+- One SELECT with the partner and contract joined in; rows are plain
+  tuples, never ORM objects, so the session's identity map stays empty.
+- `yield_per` streams the result: on PostgreSQL a server-side cursor
+  fetches `batch_size` rows at a time instead of the whole result.
+- Newest orders first, in `ix_orders_user_date_id` order.
+"""
+
+from sqlalchemy import select
+from model.dbModels import Contract, Order, User
+
+# (column name, selected expression) in export order.
+ORDER_EXPORT_COLUMNS = (
+    ("orderNumber", Order.orderNumber),
+    ("orderDate", Order.orderDate),
+    ("flightNumber", Order.flightNumber),
+    ("aircraft", Order.aircraftType),
+    ("departureDate", Order.departureDate),
+    ("departureCity", Order.departureCity),
+    ("departureAirport", Order.departureAirport),
+    ("arrivalCity", Order.arrivalCity),
+    ("arrivalAirport", Order.arrivalAirport),
+    ("cargoType", Order.departureCargoType),
+    ("cargoWeight", Order.departureCargoWeight),
+    ("cargoVolume", Order.departureCargoVolume),
+    ("partner", User.fullName),
+    ("company", User.company),
+    ("contractStatus", Contract.contractStatus),
+    ("paymentStatus", Order.paymentStatus),
+    ("price", Order.orderPrice),
+    ("currency", Order.orderCurrency),
+    ("priceInBase", Order.normalizedPrice),
+)
+
+
+def iter_order_export(db, user_id, batch_size=1000):
+    """
+    Yield the order history of a user in batches.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        user_id (int): Owner of the orders.
+        batch_size (int): Rows fetched from the database at a time.
+
+    Yields:
+        list[Row]: Up to `batch_size` rows with the values of
+        `ORDER_EXPORT_COLUMNS`, newest order first.
+    """
+    statement = (
+        select(*(column for _, column in ORDER_EXPORT_COLUMNS))
+        .join(User, User.id == Order.partnerUser)
+        .outerjoin(Contract, Contract.id == Order.contractOrder)
+        .where(Order.userId == user_id)
+        .order_by(Order.orderDate.desc(), Order.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    result = db.execute(statement)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
@@ -0,0 +1,55 @@
+"""
+Loader Options Module
+
+This module declares, per view, which columns and relationships are
+loaded together with the main entity, so that rendering a list never
+triggers one lazy load per row.
+
+Conventions:
+- Many-to-one relationships (`Order.partner`, `Order.user`,
+  `Order.contract`, `Contract.charterer`, `Contract.carrier`) are loaded
+  with `joinedload`: one LEFT OUTER JOIN, no extra round trip.
+- One-to-many collections (`User.orders`, `Contract.orders`, ...) are
+  loaded with `selectinload`: one extra `IN (...)` query per collection,
+  independent of the number of parent rows.
+- `load_only` restricts every entity to the columns the view renders;
+  list views use `raiseload=True`, so touching another column raises.
+- Each option set ends with `raiseload("*")`, so a relationship the view
+  did not plan for raises instead of silently issuing a query per row.
+"""
+
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from model.dbModels import Contract, Order, User
+
+# Order history table: order columns, partner name and contract status.
+ORDER_HISTORY_OPTIONS = (
+    load_only(
+        Order.id, Order.orderNumber, Order.orderDate, Order.aircraftType,
+        Order.departureCity, Order.arrivalCity, Order.paymentStatus,
+        Order.orderPrice, Order.orderCurrency, Order.normalizedPrice,
+        raiseload=True,
+    ),
+    joinedload(Order.partner).load_only(
+        User.fullName, User.company, raiseload=True
+    ),
+    joinedload(Order.contract).load_only(
+        Contract.contractStatus, raiseload=True
+    ),
+    raiseload("*"),
+)
+
+# Order detail page: every order column, both parties and the contract.
+ORDER_DETAIL_OPTIONS = (
+    joinedload(Order.user).load_only(
+        User.fullName, User.company, User.email, raiseload=True
+    ),
+    joinedload(Order.partner).load_only(
+        User.fullName, User.company, User.email, raiseload=True
+    ),
+    joinedload(Order.contract).load_only(
+        Contract.contractStatus, Contract.effectiveFrom,
+        Contract.effectiveTo, Contract.contractFileUrl,
+        Contract.termsSummary, raiseload=True,
+    ),
+    raiseload("*"),
+)
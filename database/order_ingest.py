@@ -0,0 +1,396 @@
+"""
+Order Ingestion Module
+
+This module loads large carrier schedule feeds (CSV or JSONL) into the
+`orders` table.
+
+Features:
+- Streaming: records are read, coerced and written chunk by chunk, so
+  memory stays bounded regardless of feed size.
+- `CargoTypeEnum`, `CurrencyEnum` and `PaymentStatusEnum` values are
+  resolved through lookup tables built once at import (enum names and
+  values, case-insensitive).
+- Chunks are written with `COPY ... FROM STDIN` on Postgres and with
+  Core executemany inserts elsewhere, committed every `commit_every`
+  chunks.
+- Resumable: after each commit the number of consumed input records is
+  written to a checkpoint file; a rerun skips them.
+- Progress and the final result report rows per second.
+- `normalizedPrice` of the new rows is filled in SQL and the per-user
+  order summaries are updated before every commit (see `database.rates`
+  and `database.summaries`).
+- Open orders inserted by a process that has the empty-leg matching
+  engine loaded are added to it after each commit; rows written with
+  `COPY` have no ids, so the engine is reloaded instead (see
+  `services.matching`).
+
+Notes:
+- The Core insert path skips rows whose `orderNumber` already exists, so
+  reprocessing a chunk after a crash between commit and checkpoint is
+  harmless. `COPY` has no conflict handling; use `copy=False` if that
+  window matters.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from database.rates import ensure_rates, normalize_prices
+from database.summaries import apply_deltas, order_deltas
+from model.dbModels import (
+    CargoTypeEnum, CurrencyEnum, Order, PaymentStatusEnum
+)
+from services.matching import Leg, matcher
+
+
+def _enum_lookup(enum_class):
+    table = {}
+    for member in enum_class:
+        table[member.name.lower()] = member
+        table[member.value.lower()] = member
+    return table
+
+
+CARGO_TYPES = _enum_lookup(CargoTypeEnum)
+CURRENCIES = _enum_lookup(CurrencyEnum)
+PAYMENT_STATUSES = _enum_lookup(PaymentStatusEnum)
+
+_TRUE = frozenset({"1", "true", "t", "yes", "y"})
+_FALSE = frozenset({"0", "false", "f", "no", "n"})
+
+
+def _lookup(table, name):
+    def convert(value):
+        member = table.get(str(value).strip().lower())
+        if member is None:
+            raise ValueError(f"invalid {name}: {value!r}")
+        return member
+    return convert
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"invalid boolean: {value!r}")
+
+
+def _datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _text(value):
+    text = str(value).strip()
+    if not text:
+        raise ValueError("empty value")
+    return text
+
+
+def _integer(value):
+    # `int()` would truncate 12.9 and accept True; only whole numbers
+    # written as such are ids.
+    if isinstance(value, bool):
+        raise ValueError(f"invalid integer: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        text = value.strip()
+        if text.isascii() and text.isdigit():
+            return int(text)
+    raise ValueError(f"invalid integer: {value!r}")
+
+
+def _optional_int(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return _integer(value)
+
+
+# Converters per input field, in `orders` column order (without `id`).
+CONVERTERS = {
+    "userId": _integer,
+    "orderNumber": _integer,
+    "orderDate": _datetime,
+    "partnerUser": _integer,
+    "aircraftType": _text,
+    "flightNumber": _text,
+    "departureDate": _datetime,
+    "departureCity": _text,
+    "departureAirport": _text,
+    "departureCargoType": _lookup(CARGO_TYPES, "cargo type"),
+    "departureCargoWeight": float,
+    "departureCargoVolume": float,
+    "arrivalDate": _datetime,
+    "arrivalCity": _text,
+    "arrivalAirport": _text,
+    "arrivalCargoType": _lookup(CARGO_TYPES, "cargo type"),
+    "arrivalCargoWeight": float,
+    "arrivalCargoVolume": float,
+    "roundTrip": _boolean,
+    "orderPrice": float,
+    "orderCurrency": _lookup(CURRENCIES, "currency"),
+    "paymentStatus": _lookup(PAYMENT_STATUSES, "payment status"),
+    "contractOrder": _optional_int,
+    "orderStatus": _text,
+    "isEmptyLegMatch": _boolean,
+}
+OPTIONAL_FIELDS = frozenset({"contractOrder"})
+
+
+def read_records(path, skip=0):
+    """
+    Stream records from a CSV (with header) or JSONL file.
+
+    Args:
+        path (str): Feed path; `.jsonl`/`.ndjson` are read as JSON lines.
+        skip (int): Number of leading records to skip (for resuming).
+
+    Yields:
+        dict | str: One raw record per input row; JSON lines are yielded
+                    undecoded and parsed by `coerce_order`, so a
+                    malformed line is rejected like any invalid record.
+    """
+    with open(path, encoding="utf-8", newline="") as source:
+        if path.endswith((".jsonl", ".ndjson")):
+            records = (line for line in source if line.strip())
+        else:
+            records = csv.DictReader(source)
+        for index, record in enumerate(records):
+            if index >= skip:
+                yield record
+
+
+def coerce_order(record):
+    """
+    Validate and convert one raw record into `orders` column values.
+
+    Args:
+        record (dict | str): Raw record, or an undecoded JSON line.
+
+    Returns:
+        dict: Column values keyed by column name.
+
+    Raises:
+        ValueError: If the record is not a JSON object, or a field is
+            missing or cannot be converted.
+    """
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"invalid JSON: {error}") from None
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    row = {}
+    for field, convert in CONVERTERS.items():
+        value = record.get(field)
+        if value is None or value == "":
+            if field in OPTIONAL_FIELDS:
+                row[field] = None
+                continue
+            raise ValueError(f"missing {field}")
+        try:
+            row[field] = convert(value)
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"{field}: {error}") from None
+    return row
+
+
+def _copy_chunk(connection, rows):
+    # Returns the written rows (all of them; COPY has no conflict
+    # handling). Enum columns are stored by member name, booleans as t/f and NULL
+    # as an unquoted empty field in COPY's CSV format.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            "" if value is None
+            else value.name if hasattr(value, "name")
+            else ("t" if value else "f") if isinstance(value, bool)
+            else value.isoformat() if isinstance(value, datetime)
+            else value
+            for value in (row[field] for field in CONVERTERS)
+        ])
+    buffer.seek(0)
+    columns = ", ".join(f'"{field}"' for field in CONVERTERS)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Order.__tablename__} ({columns}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+    return rows
+
+
+def _insert_chunk(connection, rows):
+    # Returns the rows that were actually inserted, with their `id` where
+    # the database reports it.
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        table = Order.__table__
+        statement = module.insert(table).on_conflict_do_nothing(
+            index_elements=["orderNumber"]
+        ).returning(table.c.orderNumber, table.c.id)
+        inserted = dict(connection.execute(statement, rows).all())
+        written = []
+        for row in rows:
+            if row["orderNumber"] in inserted:
+                row["id"] = inserted[row["orderNumber"]]
+                written.append(row)
+        return written
+    connection.execute(insert(Order.__table__), rows)
+    return rows
+
+
+def _open_legs(rows):
+    # Matching engine entries for the written rows that are still open.
+    return [
+        Leg.from_row(row) for row in rows
+        if not row["roundTrip"] and not row["isEmptyLegMatch"]
+    ]
+
+
+def _read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as checkpoint:
+            return json.load(checkpoint)
+    return {"records": 0, "rows": 0, "rejected": 0}
+
+
+def _write_checkpoint(path, state):
+    if not path:
+        return
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(temporary, path)
+
+
+def ingest_orders(engine, path, chunk_size=5000, commit_every=4,
+                  copy=True, checkpoint_path=None, on_reject=None,
+                  progress=None):
+    """
+    Stream a feed into the `orders` table.
+
+    Args:
+        engine (Engine): Target database engine.
+        path (str): CSV or JSONL feed.
+        chunk_size (int): Rows per COPY / executemany.
+        commit_every (int): Chunks per transaction.
+        copy (bool): Use `COPY` when the database is Postgres.
+        checkpoint_path (str | None): Checkpoint file for resuming; a
+            rerun with the same file continues after the last commit.
+        on_reject (callable | None): Called with `(record_index, record,
+            error)` for invalid records.
+        progress (callable | None): Called with the stats dict after
+            every commit.
+
+    Returns:
+        dict: `records` consumed, `rows` written, `rejected`, `seconds`
+              and `rows_per_sec` for this run.
+    """
+    state = _read_checkpoint(checkpoint_path)
+    use_copy = copy and engine.dialect.name == "postgresql"
+    write = _copy_chunk if use_copy else _insert_chunk
+    start = time.perf_counter()
+    run = {"records": 0, "rows": 0, "rejected": 0}
+
+    def stats():
+        elapsed = time.perf_counter() - start
+        return {
+            **run,
+            "total_records": state["records"],
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(run["rows"] / elapsed, 1)
+            if elapsed else 0.0,
+        }
+
+    chunk = []
+    pending = {"records": 0, "rows": 0, "rejected": 0}
+    deltas = None
+    legs = []
+    without_ids = False
+    chunks_in_transaction = 0
+    connection = engine.connect()
+    transaction = connection.begin()
+    ensure_rates(connection)
+
+    def commit():
+        nonlocal transaction, chunks_in_transaction, deltas, legs
+        normalize_prices(connection, currencies=())
+        if deltas:
+            apply_deltas(connection, deltas)
+        deltas = None
+        transaction.commit()
+        if matcher.loaded:
+            for leg in legs:
+                matcher.add(leg)
+        legs = []
+        for key, value in pending.items():
+            state[key] += value
+            run[key] += value
+            pending[key] = 0
+        _write_checkpoint(checkpoint_path, state)
+        chunks_in_transaction = 0
+        transaction = connection.begin()
+        if progress:
+            progress(stats())
+
+    def track(written):
+        # Returns True if the rows have no ids to index them by.
+        if written and "id" not in written[0]:
+            return True
+        legs.extend(_open_legs(written))
+        return False
+
+    skip = state["records"]
+    try:
+        for offset, record in enumerate(read_records(path, skip=skip)):
+            pending["records"] += 1
+            try:
+                chunk.append(coerce_order(record))
+            except ValueError as error:
+                pending["rejected"] += 1
+                if on_reject:
+                    on_reject(skip + offset, record, str(error))
+                continue
+            if len(chunk) >= chunk_size:
+                written = write(connection, chunk)
+                pending["rows"] += len(written)
+                deltas = order_deltas(written, deltas=deltas)
+                without_ids = track(written) or without_ids
+                chunk = []
+                chunks_in_transaction += 1
+                if chunks_in_transaction >= commit_every:
+                    commit()
+        if chunk:
+            written = write(connection, chunk)
+            pending["rows"] += len(written)
+            deltas = order_deltas(written, deltas=deltas)
+            without_ids = track(written) or without_ids
+        commit()
+    except BaseException:
+        transaction.rollback()
+        raise
+    finally:
+        transaction.close()
+        connection.close()
+
+    if without_ids and matcher.loaded:
+        matcher.reload_in_background()
+
+    return stats()
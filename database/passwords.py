@@ -0,0 +1,162 @@
+"""
+Password Hashing Module
+
+This module runs bcrypt hashing and verification on a dedicated, bounded
+thread pool so that bursts of logins or signups cannot occupy every
+request worker. bcrypt releases the GIL while hashing, so threads give
+real parallelism here without the cost of a process pool.
+
+Features:
+- Bounded worker pool with a queue-depth limit.
+- Fast rejection (`PasswordPoolBusy`) when the pool is saturated.
+- Configurable bcrypt cost factor and detection of hashes that need
+  to be rehashed after the cost factor changes.
+
+Environment variables:
+- `BCRYPT_ROUNDS`: bcrypt cost factor (default 12).
+- `PASSWORD_POOL_WORKERS`: number of hashing threads (default: CPUs).
+- `PASSWORD_POOL_QUEUE`: jobs allowed to wait for a thread (default
+  4 per thread).
+- `PASSWORD_POOL_TIMEOUT`: seconds to wait for a queue slot before
+  rejecting (default 0.05).
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from monitoring.metrics import timed
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when the hashing pool and its queue are full."""
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded thread pool."""
+
+    def __init__(self, rounds=12, workers=2, max_pending=8,
+                 acquire_timeout=0.05):
+        """
+        Args:
+            rounds (int): bcrypt cost factor for new hashes.
+            workers (int): Number of hashing threads.
+            max_pending (int): Jobs allowed to wait for a free thread.
+            acquire_timeout (float): Seconds to wait for a free slot
+                before raising `PasswordPoolBusy`.
+        """
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+    def configure(self, rounds, workers, max_pending, acquire_timeout):
+        """
+        Apply new settings; the thread pool is rebuilt on next use.
+
+        Must be called before the pool is in use (e.g. at app start).
+        """
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor_pid = None
+
+    def hash(self, password: str):
+        """
+        Hash a plaintext password with the configured cost factor.
+
+        Raises:
+            PasswordPoolBusy: If the pool is saturated.
+        """
+        return self._run(self._hash, password)
+
+    def check(self, password: str, hashed: str):
+        """
+        Verify a plaintext password against a stored bcrypt hash.
+
+        Raises:
+            PasswordPoolBusy: If the pool is saturated.
+        """
+        return self._run(self._check, password, hashed)
+
+    def needs_rehash(self, hashed: str):
+        """Return True if the hash was made with a different cost factor."""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        """Return pool configuration and counters."""
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def _hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode(), salt).decode()
+
+    @staticmethod
+    def _check(password, hashed):
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+
+    def _run(self, func, *args):
+        with timed("bcrypt"):
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                self.rejected += 1
+                raise PasswordPoolBusy("Password hashing pool is saturated")
+            try:
+                future = self._get_executor().submit(func, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(self._release)
+            return future.result()
+
+    def _release(self, future):
+        self.completed += 1
+        self._slots.release()
+
+    def _get_executor(self):
+        # Threads do not survive fork(): create the pool lazily per process.
+        pid = os.getpid()
+        if self._executor_pid != pid:
+            with self._lock:
+                if self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="bcrypt",
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+
+def settings_from_env():
+    """
+    Read hashing pool settings from the environment.
+
+    Returns:
+        dict: Keyword arguments for `PasswordHasher`.
+    """
+    workers = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 2))
+    return {
+        "rounds": int(os.getenv("BCRYPT_ROUNDS", 12)),
+        "workers": workers,
+        "max_pending": int(os.getenv("PASSWORD_POOL_QUEUE", workers * 4)),
+        "acquire_timeout": float(os.getenv("PASSWORD_POOL_TIMEOUT", 0.05)),
+    }
+
+
+hasher = PasswordHasher(**settings_from_env())
@@ -0,0 +1,115 @@
+"""
+Connection Pool Module
+
+This module builds SQLAlchemy engine options from environment variables
+and keeps statistics about the connection pool, so the Postgres
+connection budget can be sized across many workers.
+
+Environment variables:
+- `DB_POOL_SIZE`: connections kept open per process (default 5).
+- `DB_MAX_OVERFLOW`: extra connections allowed under load (default 10).
+- `DB_POOL_TIMEOUT`: seconds to wait for a connection (default 30).
+- `DB_POOL_RECYCLE`: seconds after which a connection is replaced
+  (default 1800, `-1` disables).
+- `DB_POOL_PRE_PING`: "1" to test connections on checkout (default 1).
+- `DB_STATEMENT_TIMEOUT_MS`: Postgres `statement_timeout` for every
+  connection (default: server setting).
+"""
+
+import os
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """`QueuePool` that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+def engine_options(database_url):
+    """
+    Build `create_engine` keyword arguments from the environment.
+
+    Args:
+        database_url (str): SQLAlchemy database URL.
+
+    Returns:
+        dict: Keyword arguments for `sqlalchemy.create_engine`.
+
+    Notes:
+        - Pool sizing only applies to server databases; SQLite keeps
+          SQLAlchemy's default pool for its driver.
+    """
+    url = make_url(database_url)
+    options = {"pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "1")}
+
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        )
+
+    statement_timeout = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+    if statement_timeout and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={int(statement_timeout)}"
+        }
+    return options
+
+
+def pool_stats(engine):
+    """
+    Return connection pool statistics of an engine.
+
+    Args:
+        engine (Engine): SQLAlchemy engine.
+
+    Returns:
+        dict: Pool size, checked in/out connections, overflow and, for
+              `TimedQueuePool`, checkout count and wait times in seconds.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                wait_total=pool.wait_total,
+                wait_max=pool.wait_max,
+                wait_avg=pool.wait_total / pool.checkouts
+                if pool.checkouts else 0.0,
+            )
+    return stats
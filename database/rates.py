@@ -0,0 +1,357 @@
+"""
+Exchange Rate Module
+
+This module normalizes order prices into one base currency, so orders
+can be sorted and filtered by price regardless of `orderCurrency`.
+
+Features:
+- Rates are read from a JSON document, a local file or an HTTP(S)
+  endpoint: `{"base": "EUR", "rates": {"USD": 0.855, ...}}`, where each
+  rate is the amount of base currency per unit.
+- `RateTable` keeps the loaded rates in memory. `controller.app.warm_up`
+  runs a full `refresh_rates`, so `exchange_rates` and every
+  `normalizedPrice` match the in-memory table from the start. After
+  `ttl` seconds a background thread runs `refresh_rates` again (store,
+  renormalize the changed currencies, commit) while requests keep using
+  the current rates; the in-memory table only changes once the database
+  has committed, and a failed refresh keeps the last good rates and is
+  retried later.
+- Rates are persisted in `exchange_rates`; `Order.normalizedPrice` is
+  computed in SQL (`orderPrice * rate`), never per object in Python.
+- Incremental: a refresh recomputes only orders whose currency rate
+  changed, plus orders without a normalized price yet. Orders written
+  through the ORM get their normalized price in the INSERT/UPDATE
+  statement itself.
+
+Environment variables:
+- `RATES_SOURCE`: file path or URL of the rates (default: the bundled
+  `data/rates.json`).
+- `RATES_TTL`: seconds the loaded rates are cached (default 3600).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from sqlalchemy import event, inspect, literal, or_, select, update
+from model.dbModels import CurrencyEnum, ExchangeRate, Order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATES_SOURCE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "rates.json"
+)
+
+
+def load_rates(source):
+    """
+    Read rates from a file or an HTTP(S) URL.
+
+    Args:
+        source (str): File path or URL.
+
+    Returns:
+        tuple:
+            - CurrencyEnum: Base currency.
+            - dict[CurrencyEnum, float]: Base units per currency unit;
+              currencies unknown to `CurrencyEnum` are ignored.
+
+    Raises:
+        ValueError: If the document is malformed.
+    """
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=10) as response:
+            document = json.load(response)
+    else:
+        with open(source, encoding="utf-8") as rates_file:
+            document = json.load(rates_file)
+
+    currencies = {member.value: member for member in CurrencyEnum}
+    try:
+        base = currencies[document["base"].upper()]
+        rates = {
+            currencies[code.upper()]: float(rate)
+            for code, rate in document["rates"].items()
+            if code.upper() in currencies
+        }
+    except (KeyError, AttributeError, TypeError) as error:
+        raise ValueError(f"malformed rates document: {error}") from None
+    rates[base] = 1.0
+    return base, rates
+
+
+class RateTable:
+    """In-memory copy of the current exchange rates."""
+
+    def __init__(self, source=DEFAULT_RATES_SOURCE, ttl=3600.0,
+                 retry_interval=60.0, session_factory=None):
+        """
+        Args:
+            source (str): File path or URL passed to `load_rates`.
+            ttl (float): Seconds before the source is read again.
+            retry_interval (float): Seconds before a failed background
+                refresh is retried.
+            session_factory (callable | None): Returns a new SQLAlchemy
+                session for background refreshes (default:
+                `database.db_funcs.get_session`).
+        """
+        self.source = source
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._table = None
+        self._expires = 0.0
+        self._refreshing = False
+        self.loads = 0
+        self.failures = 0
+        self.last_error = None
+
+    def _current(self):
+        table = self._table
+        if table is None:
+            # Not warmed up (CLI commands, scripts): load inline once.
+            return self.reload()
+        if time.monotonic() >= self._expires:
+            self._refresh_in_background()
+        return table
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._refresh, name="rate-refresh", daemon=True
+        ).start()
+
+    def _refresh(self):
+        if self.session_factory is None:
+            from database.db_funcs import get_session
+            self.session_factory = get_session
+        try:
+            with self.session_factory() as db:
+                refresh_rates(db, table=self)
+        except Exception as error:
+            # Keep serving the last good rates.
+            self.failures += 1
+            self.last_error = str(error)
+            self._expires = time.monotonic() + self.retry_interval
+            logger.exception("reading rates from %s failed", self.source)
+        finally:
+            self._refreshing = False
+
+    def reload(self):
+        """
+        Read the source now.
+
+        Returns:
+            tuple: Base currency and rates, as returned by `load_rates`.
+
+        Raises:
+            OSError, ValueError: If the source cannot be read; the
+                current rates are kept.
+        """
+        return self.install(*load_rates(self.source))
+
+    def install(self, base, rates):
+        """
+        Replace the in-memory rates, e.g. after they were stored.
+
+        Args:
+            base (CurrencyEnum): Base currency.
+            rates (dict[CurrencyEnum, float]): Base units per unit.
+
+        Returns:
+            tuple: `(base, rates)`.
+        """
+        table = (base, rates)
+        self._table = table
+        self._expires = time.monotonic() + self.ttl
+        self.loads += 1
+        self.last_error = None
+        return table
+
+    @property
+    def base(self):
+        """Base currency of the normalized prices."""
+        return self._current()[0]
+
+    def rates(self):
+        """Return a copy of the rates keyed by `CurrencyEnum`."""
+        return dict(self._current()[1])
+
+    def convert(self, amount, currency):
+        """
+        Convert an amount into the base currency.
+
+        Args:
+            amount (float): Price in `currency`.
+            currency (CurrencyEnum): Currency of the amount.
+
+        Returns:
+            float | None: Amount in the base currency, or None if the
+            currency has no rate.
+        """
+        rate = self._current()[1].get(currency)
+        return None if rate is None else amount * rate
+
+    def stats(self):
+        """Return known currencies, load/failure counts, last error."""
+        return {
+            "currencies": len(self._table[1]) if self._table else 0,
+            "loads": self.loads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+rate_table = RateTable(
+    source=os.getenv("RATES_SOURCE", DEFAULT_RATES_SOURCE),
+    ttl=float(os.getenv("RATES_TTL", 3600)),
+)
+
+
+def _rate_of(currency):
+    """Scalar subquery with the stored rate of a currency expression."""
+    return (
+        select(ExchangeRate.rate)
+        .where(ExchangeRate.currency == currency)
+        .scalar_subquery()
+    )
+
+
+def store_rates(db, rates):
+    """
+    Persist rates in `exchange_rates`.
+
+    Args:
+        db (Session | Connection): Database session or connection.
+        rates (dict[CurrencyEnum, float]): Rates to store.
+
+    Returns:
+        set[CurrencyEnum]: Currencies whose stored rate changed.
+    """
+    stored = dict(
+        db.execute(select(ExchangeRate.currency, ExchangeRate.rate)).all()
+    )
+    now = datetime.now()
+    table = ExchangeRate.__table__
+    changed = set()
+    for currency, rate in rates.items():
+        if stored.get(currency) == rate:
+            continue
+        if currency in stored:
+            db.execute(
+                update(table)
+                .where(table.c.currency == currency)
+                .values(rate=rate, updatedAt=now)
+            )
+        else:
+            db.execute(
+                table.insert().values(
+                    currency=currency, rate=rate, updatedAt=now
+                )
+            )
+        changed.add(currency)
+    return changed
+
+
+def ensure_rates(db, table=rate_table):
+    """
+    Store rates for currencies that have none in `exchange_rates` yet.
+
+    Existing rates are left alone, so prices normalized with them stay
+    consistent; bulk writers call this before `normalize_prices`, so a
+    fresh database does not end up with NULL normalized prices.
+
+    Args:
+        db (Session | Connection): Database session or connection.
+        table (RateTable): Rate source.
+
+    Returns:
+        set[CurrencyEnum]: Currencies that were added.
+    """
+    stored = set(db.execute(select(ExchangeRate.currency)).scalars())
+    missing = {
+        currency: rate for currency, rate in table.rates().items()
+        if currency not in stored
+    }
+    return store_rates(db, missing) if missing else set()
+
+
+def normalize_prices(db, currencies=None):
+    """
+    Recompute `Order.normalizedPrice` in a single UPDATE.
+
+    Args:
+        db (Session | Connection): Database session or connection.
+        currencies (Iterable[CurrencyEnum] | None): Recompute orders in
+            these currencies. Orders without a normalized price are
+            always included; None recomputes every order.
+
+    Returns:
+        int: Number of updated orders.
+    """
+    orders = Order.__table__
+    statement = update(orders).values(
+        normalizedPrice=orders.c.orderPrice * _rate_of(orders.c.orderCurrency)
+    )
+    if currencies is not None:
+        statement = statement.where(or_(
+            orders.c.normalizedPrice.is_(None),
+            orders.c.orderCurrency.in_(list(currencies)),
+        ))
+    return db.execute(statement).rowcount
+
+
+def refresh_rates(db, table=rate_table, full=False):
+    """
+    Reload rates, store them and renormalize the affected orders.
+
+    The in-memory rates of `table` are replaced only after the commit,
+    so converted amounts never disagree with the stored prices.
+
+    Args:
+        db (Session): SQLAlchemy session instance; committed on success.
+        table (RateTable): Rate source.
+        full (bool): Recompute every order, e.g. at startup or after a
+            restore.
+
+    Returns:
+        dict: Base currency, changed currencies and updated orders.
+    """
+    base, rates = load_rates(table.source)
+    try:
+        changed = store_rates(db, rates)
+        updated = normalize_prices(db, None if full else changed)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    table.install(base, rates)
+    return {
+        "base": base.value,
+        "changed": sorted(currency.value for currency in changed),
+        "orders": updated,
+    }
+
+
+@event.listens_for(Order, "before_insert")
+@event.listens_for(Order, "before_update")
+def _normalize_on_write(mapper, connection, target):
+    # The price is converted by the INSERT/UPDATE statement itself.
+    state = inspect(target)
+    if state.persistent and not (
+        state.attrs.orderPrice.history.has_changes()
+        or state.attrs.orderCurrency.history.has_changes()
+    ):
+        return
+    target.normalizedPrice = (
+        literal(target.orderPrice) * _rate_of(literal(
+            target.orderCurrency, type_=Order.orderCurrency.type
+        ))
+    )
@@ -0,0 +1,242 @@
+"""
+Replica Routing Module
+
+This module sends read-only statements to read replicas and everything
+else to the primary database.
+
+Features:
+- `RoutingSession`: a `Session` whose `get_bind` picks the engine per
+  statement. Sessions opened with `replica_reads=True` run SELECTs on a
+  replica; flushes, INSERT/UPDATE/DELETE, `SELECT ... FOR UPDATE` and
+  textual SQL go to the primary. After the first write, the session
+  reads from the primary too, so it sees its own writes.
+- One replica is chosen per session and kept for its lifetime, so the
+  reads of a request see one consistent snapshot.
+- `ReplicaSet`: round-robin selection over healthy replicas. Health is
+  re-checked at most every `check_interval` seconds, by one thread at a
+  time; a replica whose connections drop is marked down immediately.
+  On PostgreSQL, replicas lagging more than `max_lag` seconds are
+  skipped. Without a healthy replica, reads fall back to the primary.
+- Sessions without `replica_reads` (CLI commands, ingestion, scripts)
+  use the primary only.
+
+Environment variables:
+- `DATABASE_REPLICA_URLS`: comma-separated replica URLs (default: none,
+  all statements go to the primary).
+- `REPLICA_CHECK_INTERVAL`: seconds between health checks (default 5).
+- `REPLICA_MAX_LAG`: maximum replication lag in seconds (PostgreSQL
+  only, default: not checked).
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from database.pool import engine_options
+
+# Session.info keys.
+REPLICA_READS = "replica_reads"
+REPLICA = "replica"
+WROTE = "wrote"
+
+
+class _Replica:
+    """One replica engine and its health state."""
+
+    def __init__(self, url):
+        self.url = url
+        self.engine = None
+        self.healthy = True
+        self.next_check = 0.0
+        self.last_error = None
+        self.selected = 0
+        self.lock = threading.RLock()
+
+
+class ReplicaSet:
+    """Replica engines with health checks and round-robin selection."""
+
+    def __init__(self, check_interval=5.0, max_lag=None):
+        """
+        Args:
+            check_interval (float): Seconds between two health checks of
+                a replica.
+            max_lag (float | None): Maximum replication lag in seconds
+                (PostgreSQL only).
+        """
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._replicas = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Whether any replica is configured."""
+        return bool(self._replicas)
+
+    def configure(self, urls):
+        """
+        Set the replica URLs; engines are created on first use.
+
+        Args:
+            urls (Iterable[str]): Replica database URLs.
+        """
+        self.dispose()
+        self._replicas = [_Replica(url) for url in urls if url]
+
+    def _engine(self, replica):
+        if replica.engine is None:
+            with replica.lock:
+                if replica.engine is None:
+                    engine = create_engine(
+                        replica.url, **engine_options(replica.url)
+                    )
+                    event.listen(
+                        engine, "handle_error",
+                        lambda context: self._on_error(replica, context),
+                    )
+                    replica.engine = engine
+        return replica.engine
+
+    def _on_error(self, replica, context):
+        if context.is_disconnect:
+            replica.healthy = False
+            replica.next_check = time.monotonic() + self.check_interval
+            replica.last_error = str(context.original_exception)
+
+    def check(self, replica):
+        """
+        Run the health check of a replica now.
+
+        Returns:
+            bool: Whether the replica answered (and is not lagging).
+        """
+        try:
+            engine = self._engine(replica)
+            with engine.connect() as connection:
+                if (self.max_lag is not None
+                        and engine.dialect.name == "postgresql"):
+                    lag = connection.execute(text(
+                        "SELECT EXTRACT(EPOCH FROM now() - "
+                        "pg_last_xact_replay_timestamp())"
+                    )).scalar()
+                    if lag is not None and lag > self.max_lag:
+                        raise RuntimeError(f"replication lag {lag:.1f} s")
+                else:
+                    connection.execute(select(1))
+            replica.healthy = True
+            replica.last_error = None
+        except Exception as error:
+            replica.healthy = False
+            replica.last_error = str(error)
+        replica.next_check = time.monotonic() + self.check_interval
+        return replica.healthy
+
+    def _is_healthy(self, replica, now):
+        # One thread re-checks a due replica; others use the last result.
+        if now >= replica.next_check and replica.lock.acquire(False):
+            try:
+                if now >= replica.next_check:
+                    self.check(replica)
+            finally:
+                replica.lock.release()
+        return replica.healthy
+
+    def choose(self):
+        """
+        Pick the next healthy replica.
+
+        Returns:
+            Engine | None: Replica engine, or None if no replica is
+            configured or healthy.
+        """
+        replicas = self._replicas
+        if not replicas:
+            return None
+        with self._lock:
+            start = self._next
+            self._next = (start + 1) % len(replicas)
+        now = time.monotonic()
+        for offset in range(len(replicas)):
+            replica = replicas[(start + offset) % len(replicas)]
+            if self._is_healthy(replica, now):
+                replica.selected += 1
+                return self._engine(replica)
+        return None
+
+    def dispose(self, close=True):
+        """
+        Drop pooled connections of the replica engines.
+
+        Args:
+            close (bool): Close the connections; see
+                `database.db_funcs.dispose_engine`.
+        """
+        for replica in self._replicas:
+            if replica.engine is not None:
+                replica.engine.dispose(close=close)
+
+    def stats(self):
+        """Return URL (without password), health and selection count."""
+        return [
+            {
+                "url": make_url(replica.url).render_as_string(
+                    hide_password=True
+                ),
+                "healthy": replica.healthy,
+                "selected": replica.selected,
+                "last_error": replica.last_error,
+            }
+            for replica in self._replicas
+        ]
+
+
+replica_set = ReplicaSet(
+    check_interval=float(os.getenv("REPLICA_CHECK_INTERVAL", 5)),
+    max_lag=float(os.getenv("REPLICA_MAX_LAG"))
+    if os.getenv("REPLICA_MAX_LAG") else None,
+)
+
+
+def _is_read(clause):
+    # `clause` is None for `Session.connection()`, e.g. to set up a
+    # statement timeout before the reads of a search.
+    if clause is None:
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when allowed."""
+
+    replicas = replica_set
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        info = self.info
+        if self._flushing or (clause is not None and clause.is_dml):
+            info[WROTE] = True
+        elif (info.get(REPLICA_READS) and not info.get(WROTE)
+              and _is_read(clause)):
+            if REPLICA not in info:
+                info[REPLICA] = self.replicas.choose()
+            replica = info[REPLICA]
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def use_primary(db):
+    """
+    Send all further statements of a session to the primary.
+
+    For code that reads before it writes and must not act on a stale
+    replica, e.g. checking for a duplicate email before an INSERT.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+    """
+    db.info[REPLICA_READS] = False
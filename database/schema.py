@@ -0,0 +1,80 @@
+"""
+Schema Upgrade Module
+
+`init_db` uses `create_all`, which creates missing tables but never
+alters existing ones. Databases created before a release that added
+columns or indexes to an existing table (e.g. `orders.normalizedPrice`
+and the search indexes) are brought up to date here.
+
+Features:
+- Missing tables are created with their indexes (e.g. `exchange_rates`,
+  `order_summaries`).
+- Missing nullable columns of existing tables are added with
+  `ALTER TABLE ... ADD COLUMN`; a missing NOT NULL column cannot be
+  added without a default and is reported instead.
+- Missing indexes of existing tables are created.
+- Nothing is dropped or changed.
+
+Run `flask --app controller.app:create_app upgrade-db` once after
+deploying a release that changes the models; it also rebuilds the
+order summaries when their table was just created and renormalizes
+every order price.
+"""
+
+from sqlalchemy import inspect, text
+from model.dbModels import Base
+
+
+def _add_column(connection, table, column):
+    preparer = connection.dialect.identifier_preparer
+    connection.execute(text(
+        f"ALTER TABLE {preparer.format_table(table)} "
+        f"ADD COLUMN {preparer.format_column(column)} "
+        f"{column.type.compile(dialect=connection.dialect)}"
+    ))
+
+
+def upgrade_schema(engine):
+    """
+    Create missing tables, nullable columns and indexes.
+
+    Args:
+        engine (Engine): Target database engine.
+
+    Returns:
+        dict: `tables`, `columns` (`table.column`) and `indexes` that
+              were created, and `skipped` columns that need a manual
+              migration.
+    """
+    existing = set(inspect(engine).get_table_names())
+    created = {"tables": [], "columns": [], "indexes": [], "skipped": []}
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                table.create(connection)
+                created["tables"].append(table.name)
+                continue
+
+            inspector = inspect(connection)
+            columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                name = f"{table.name}.{column.name}"
+                if not column.nullable and column.server_default is None:
+                    created["skipped"].append(name)
+                    continue
+                _add_column(connection, table, column)
+                created["columns"].append(name)
+
+            indexes = {
+                index["name"] for index in inspector.get_indexes(table.name)
+            }
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    created["indexes"].append(index.name)
+    return created
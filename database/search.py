@@ -0,0 +1,168 @@
+"""
+Order Search Module
+
+This module implements filtered order search for the JSON search API.
+
+Features:
+- Filters on departure/arrival airport or city, departure date range,
+  cargo type, cargo weight/volume, price and normalized price (in the
+  base currency, see `database.rates`).
+- Sorting by departure date or normalized price, with cursor pagination
+  on `(departureDate, id)` / `(normalizedPrice, id)`, matching the
+  trailing columns of the composite indexes on `orders`.
+- Only the requested columns are selected.
+- A per-query time budget: `statement_timeout` on Postgres, a progress
+  handler on SQLite. Exceeding it raises `SearchTimeout`.
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.exc import OperationalError
+from model.dbModels import Order
+from database.db_funcs import decode_cursor, encode_cursor
+
+# Columns a client may request, and the default selection.
+SEARCH_FIELDS = {
+    column.name: column for column in Order.__table__.columns
+    if column.name not in ("userId", "partnerUser", "contractOrder")
+}
+DEFAULT_SEARCH_FIELDS = (
+    "orderNumber", "departureAirport", "arrivalAirport", "departureDate",
+    "arrivalDate", "departureCargoType", "departureCargoWeight",
+    "departureCargoVolume", "orderPrice", "orderCurrency",
+)
+
+# filter name -> (column, comparison)
+SEARCH_FILTERS = {
+    "departureAirport": (Order.departureAirport, "eq"),
+    "departureCity": (Order.departureCity, "eq"),
+    "arrivalAirport": (Order.arrivalAirport, "eq"),
+    "arrivalCity": (Order.arrivalCity, "eq"),
+    "departFrom": (Order.departureDate, "ge"),
+    "departTo": (Order.departureDate, "le"),
+    "cargoType": (Order.departureCargoType, "eq"),
+    "minWeight": (Order.departureCargoWeight, "ge"),
+    "maxWeight": (Order.departureCargoWeight, "le"),
+    "minVolume": (Order.departureCargoVolume, "ge"),
+    "maxVolume": (Order.departureCargoVolume, "le"),
+    "minPrice": (Order.orderPrice, "ge"),
+    "maxPrice": (Order.orderPrice, "le"),
+    "currency": (Order.orderCurrency, "eq"),
+    "minNormalizedPrice": (Order.normalizedPrice, "ge"),
+    "maxNormalizedPrice": (Order.normalizedPrice, "le"),
+}
+
+# sort name -> (column, cursor value parser); always ascending.
+SEARCH_SORTS = {
+    "departureDate": (Order.departureDate, datetime.fromisoformat),
+    "normalizedPrice": (Order.normalizedPrice, float),
+}
+
+
+class SearchTimeout(Exception):
+    """Raised when a search exceeds its time budget."""
+
+
+@contextmanager
+def time_budget(db, milliseconds):
+    """
+    Abort statements of the session that run longer than a budget.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        milliseconds (int): Time budget for statements inside the block.
+
+    Raises:
+        SearchTimeout: If a statement was cancelled.
+    """
+    connection = db.connection()
+    dialect = connection.dialect.name
+    handler_set = False
+
+    if dialect == "postgresql":
+        # SET LOCAL ends with the transaction of this request.
+        connection.execute(
+            text(f"SET LOCAL statement_timeout = {int(milliseconds)}")
+        )
+    elif dialect == "sqlite":
+        deadline = time.monotonic() + milliseconds / 1000
+        raw = connection.connection.dbapi_connection
+        raw.set_progress_handler(
+            lambda: int(time.monotonic() > deadline), 10000
+        )
+        handler_set = True
+
+    try:
+        yield
+    except OperationalError as error:
+        message = str(error.orig).lower()
+        if "statement timeout" in message or "interrupted" in message:
+            raise SearchTimeout(
+                f"Search exceeded {milliseconds} ms"
+            ) from error
+        raise
+    finally:
+        if handler_set:
+            raw.set_progress_handler(None, 0)
+
+
+def search_orders(db, filters, fields=DEFAULT_SEARCH_FIELDS, limit=20,
+                  cursor=None, budget_ms=500, sort="departureDate"):
+    """
+    Search orders, ordered by departure date or normalized price.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        filters (dict): Already converted values keyed by
+            `SEARCH_FILTERS` names; unknown keys are ignored.
+        fields (Iterable[str]): Names from `SEARCH_FIELDS` to return.
+        limit (int): Page size.
+        cursor (str | None): Cursor returned with the previous page.
+        budget_ms (int): Time budget of the query.
+        sort (str): Key of `SEARCH_SORTS`. Sorting by normalized price
+            skips orders without one.
+
+    Returns:
+        tuple:
+            - list[dict]: One dict per order with the requested fields.
+            - str | None: Cursor of the next page, None on the last page.
+
+    Raises:
+        SearchTimeout: If the query exceeds its time budget.
+    """
+    sort_column, parse = SEARCH_SORTS[sort]
+    fields = [field for field in fields if field in SEARCH_FIELDS]
+    columns = [SEARCH_FIELDS[field] for field in fields]
+    statement = select(*columns, sort_column.label("_key"),
+                       Order.id.label("_id"))
+    if sort == "normalizedPrice":
+        statement = statement.where(Order.normalizedPrice.is_not(None))
+
+    for name, value in filters.items():
+        if name not in SEARCH_FILTERS or value is None:
+            continue
+        column, comparison = SEARCH_FILTERS[name]
+        if comparison == "eq":
+            statement = statement.where(column == value)
+        elif comparison == "ge":
+            statement = statement.where(column >= value)
+        else:
+            statement = statement.where(column <= value)
+
+    position = decode_cursor(cursor, parse)
+    if position is not None:
+        statement = statement.where(
+            tuple_(sort_column, Order.id) > tuple_(*position)
+        )
+    statement = statement.order_by(sort_column, Order.id).limit(limit + 1)
+
+    with time_budget(db, budget_ms):
+        rows = db.execute(statement).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._key, rows[-1]._id)
+    return [dict(zip(fields, row)) for row in rows], next_cursor
@@ -0,0 +1,358 @@
+"""
+Order Summary Module
+
+This module maintains `order_summaries`, per-user order counts and price
+totals for the profile dashboard, so the dashboard does not run GROUP BY
+queries over a user's orders.
+
+Features:
+- One row per `(userId, role, dimension, bucket, currency)`: `role` is
+  `owner` (`User.orders`) or `partner` (`User.joined_orders`),
+  `dimension` is `status` (payment status name) or `month` (`YYYY-MM`
+  of `orderDate`). Totals stay in the order currency, so rate changes do
+  not invalidate them; the dashboard converts them when reading.
+- Incremental maintenance: inserted, updated and deleted orders are
+  turned into +/- deltas that are upserted in the same transaction.
+  ORM writes are handled by mapper/session events; bulk writers call
+  `order_deltas` and `apply_deltas` themselves (see
+  `database.order_ingest`).
+- `rebuild_summaries` recomputes everything with GROUP BY, and
+  `check_summaries` reports rows that differ from a fresh computation.
+"""
+
+from collections import defaultdict
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+from model.dbModels import Order, OrderSummary
+
+OWNER = "owner"
+PARTNER = "partner"
+STATUS = "status"
+MONTH = "month"
+
+_KEY_COLUMNS = ("userId", "role", "dimension", "bucket", "currency")
+_ORDER_FIELDS = (
+    "userId", "partnerUser", "paymentStatus", "orderDate", "orderCurrency",
+    "orderPrice",
+)
+
+
+def order_deltas(orders, sign=1, deltas=None):
+    """
+    Accumulate the summary contributions of orders.
+
+    Args:
+        orders (Iterable[Mapping]): Order values with at least the
+            `userId`, `partnerUser`, `paymentStatus`, `orderDate`,
+            `orderCurrency` and `orderPrice` keys.
+        sign (int): 1 for added orders, -1 for removed ones.
+        deltas (dict | None): Accumulator to extend.
+
+    Returns:
+        dict: `{(userId, role, dimension, bucket, currency):
+              [count, total]}`.
+    """
+    if deltas is None:
+        deltas = defaultdict(lambda: [0, 0.0])
+    for order in orders:
+        currency = order["orderCurrency"]
+        price = sign * order["orderPrice"]
+        buckets = (
+            (STATUS, order["paymentStatus"].name),
+            (MONTH, order["orderDate"].strftime("%Y-%m")),
+        )
+        for role, user_id in ((OWNER, order["userId"]),
+                              (PARTNER, order["partnerUser"])):
+            for dimension, bucket in buckets:
+                entry = deltas[(user_id, role, dimension, bucket, currency)]
+                entry[0] += sign
+                entry[1] += price
+    return deltas
+
+
+def apply_deltas(db, deltas):
+    """
+    Upsert accumulated deltas into `order_summaries`.
+
+    Args:
+        db (Session | Connection): Database session or connection; the
+            caller commits.
+        deltas (dict): Result of `order_deltas`.
+    """
+    rows = [
+        {**dict(zip(_KEY_COLUMNS, key)),
+         "orderCount": count, "priceTotal": total}
+        for key, (count, total) in deltas.items() if count or total
+    ]
+    if not rows:
+        return
+    table = OrderSummary.__table__
+    dialect = db.get_bind().dialect.name if isinstance(db, Session) \
+        else db.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        statement = module.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={
+                "orderCount":
+                    table.c.orderCount + statement.excluded.orderCount,
+                "priceTotal":
+                    table.c.priceTotal + statement.excluded.priceTotal,
+            },
+        )
+        db.execute(statement, rows)
+        return
+
+    # Other databases: update, insert where nothing was updated.
+    for row in rows:
+        matches = [table.c[name] == row[name] for name in _KEY_COLUMNS]
+        result = db.execute(
+            update(table).where(*matches).values(
+                orderCount=table.c.orderCount + row["orderCount"],
+                priceTotal=table.c.priceTotal + row["priceTotal"],
+            )
+        )
+        if not result.rowcount:
+            db.execute(table.insert().values(**row))
+
+
+def _month(column, dialect):
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def _aggregates(db):
+    """Yield summary rows computed from `orders` with GROUP BY."""
+    dialect = db.get_bind().dialect.name
+    dimensions = (
+        (STATUS, Order.paymentStatus),
+        (MONTH, _month(Order.orderDate, dialect)),
+    )
+    for role, user_column in ((OWNER, Order.userId),
+                              (PARTNER, Order.partnerUser)):
+        for dimension, bucket in dimensions:
+            statement = select(
+                user_column, bucket, Order.orderCurrency,
+                func.count(), func.sum(Order.orderPrice),
+            ).group_by(user_column, bucket, Order.orderCurrency)
+            for user_id, value, currency, count, total in db.execute(
+                statement
+            ):
+                yield {
+                    "userId": user_id,
+                    "role": role,
+                    "dimension": dimension,
+                    "bucket": getattr(value, "name", value),
+                    "currency": currency,
+                    "orderCount": count,
+                    "priceTotal": total,
+                }
+
+
+def rebuild_summaries(db):
+    """
+    Recompute `order_summaries` from scratch.
+
+    Args:
+        db (Session): SQLAlchemy session instance; committed on success.
+
+    Returns:
+        int: Number of summary rows written.
+    """
+    try:
+        db.execute(delete(OrderSummary))
+        rows = list(_aggregates(db))
+        if rows:
+            db.execute(OrderSummary.__table__.insert(), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def check_summaries(db, tolerance=0.01):
+    """
+    Compare `order_summaries` with a fresh GROUP BY computation.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        tolerance (float): Allowed difference of price totals.
+
+    Returns:
+        list[tuple]: `(key, stored, expected)` for every mismatching row,
+                     where stored/expected are `(count, total)` or None.
+    """
+    expected = {
+        tuple(row[name] for name in _KEY_COLUMNS):
+            (row["orderCount"], row["priceTotal"])
+        for row in _aggregates(db)
+    }
+    stored = {
+        tuple(row[:5]): (row[5], row[6])
+        for row in db.execute(select(
+            *(OrderSummary.__table__.c[name] for name in _KEY_COLUMNS),
+            OrderSummary.orderCount, OrderSummary.priceTotal,
+        ))
+        if row[5]
+    }
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        have, want = stored.get(key), expected.get(key)
+        if (have is None or want is None or have[0] != want[0]
+                or abs(have[1] - want[1]) > tolerance):
+            mismatches.append((key, have, want))
+    return mismatches
+
+
+def get_order_summary(db, user_id):
+    """
+    Read the dashboard summary of a user.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        user_id (int): User's ID.
+
+    Returns:
+        dict: `{role: {dimension: {bucket: {currency: (count, total)}}}}`
+              for the `owner` and `partner` roles; reads only the
+              summary rows of the user.
+    """
+    summary = {OWNER: {STATUS: {}, MONTH: {}},
+               PARTNER: {STATUS: {}, MONTH: {}}}
+    rows = db.execute(
+        select(
+            OrderSummary.role, OrderSummary.dimension, OrderSummary.bucket,
+            OrderSummary.currency, OrderSummary.orderCount,
+            OrderSummary.priceTotal,
+        ).where(OrderSummary.userId == user_id, OrderSummary.orderCount > 0)
+    )
+    for role, dimension, bucket, currency, count, total in rows:
+        summary[role][dimension].setdefault(bucket, {})[currency] = (
+            count, total
+        )
+    return summary
+
+
+def _values(target, committed=False):
+    state = inspect(target)
+    values = {}
+    for field in _ORDER_FIELDS:
+        if committed:
+            history = state.attrs[field].history
+            if history.deleted:
+                values[field] = history.deleted[0]
+                continue
+        values[field] = getattr(target, field)
+    return values
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Without active history, assigning to an attribute that was expired by
+# a commit records no old value, and the old bucket would be lost.
+for _field in _ORDER_FIELDS:
+    event.listen(getattr(Order, _field), "set", _keep_old_value,
+                 active_history=True)
+
+
+def _pending(target):
+    # Kept on the session, not on the connection: a pooled connection
+    # outlives the session and would carry deltas of a failed flush.
+    session = object_session(target)
+    return session.info.setdefault("order_summary_deltas", [])
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target):
+    _pending(target).append((1, _values(target)))
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(
+        state.attrs[field].history.has_changes() for field in _ORDER_FIELDS
+    ):
+        return
+    _pending(target).append((-1, _values(target, committed=True)))
+    _pending(target).append((1, _values(target)))
+
+
+@event.listens_for(Order, "before_delete")
+def _order_deleted(mapper, connection, target):
+    # Before the DELETE, so expired attributes can still be loaded.
+    _pending(target).append((-1, _values(target, committed=True)))
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_pending(session, flush_context):
+    pending = session.info.pop("order_summary_deltas", None)
+    if not pending:
+        return
+    deltas = None
+    for sign, values in pending:
+        deltas = order_deltas([values], sign, deltas)
+    apply_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("order_summary_deltas", None)
+
+
+def build_dashboard(summary, convert, months=12):
+    """
+    Turn a user summary into dashboard tables.
+
+    Args:
+        summary (dict): Result of `get_order_summary`.
+        convert (callable): `(amount, currency) -> base amount | None`,
+            e.g. `database.rates.rate_table.convert`.
+        months (int): Number of most recent months to show.
+
+    Returns:
+        dict: Per role, `status` and `month` lists of
+              `(bucket, count, base total)` and a `currency` list of
+              `(currency code, count, total in that currency)`.
+    """
+    def base_total(per_currency):
+        return sum(
+            convert(total, currency) or 0.0
+            for currency, (_, total) in per_currency.items()
+        )
+
+    tables = {}
+    for role, dimensions in summary.items():
+        currencies = defaultdict(lambda: [0, 0.0])
+        for per_currency in dimensions[STATUS].values():
+            for currency, (count, total) in per_currency.items():
+                currencies[currency][0] += count
+                currencies[currency][1] += total
+        tables[role] = {
+            STATUS: [
+                (bucket, sum(c for c, _ in per_currency.values()),
+                 base_total(per_currency))
+                for bucket, per_currency in sorted(dimensions[STATUS].items())
+            ],
+            MONTH: [
+                (bucket, sum(c for c, _ in per_currency.values()),
+                 base_total(per_currency))
+                for bucket, per_currency in sorted(
+                    dimensions[MONTH].items(), reverse=True
+                )[:months]
+            ],
+            "currency": [
+                (currency.value, count, total)
+                for currency, (count, total) in sorted(
+                    currencies.items(), key=lambda item: item[0].value
+                )
+            ],
+        }
+    return tables
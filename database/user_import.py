@@ -0,0 +1,270 @@
+"""
+User Import Module
+
+This module imports user accounts in bulk, e.g. when onboarding a
+carrier or broker network.
+
+Features:
+- Streams users from CSV or JSONL files without loading them into
+  memory.
+- Hashes passwords across a process pool.
+- Inserts users in chunked multi-row `INSERT ... ON CONFLICT DO NOTHING
+  RETURNING email` statements (Postgres, SQLite); duplicate emails are
+  detected from the conflict instead of a SELECT per row.
+- Writes a per-row result report (`line,email,status,detail`).
+
+Input columns / keys:
+- `email`, `company`, `userType` (enum name or value), `password`.
+- `fullName`, or `firstName` and `lastName`.
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from model.dbModels import User, UserTypeEnum
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+_USER_TYPES = {
+    **{e.name.lower(): e for e in UserTypeEnum},
+    **{e.value.lower(): e for e in UserTypeEnum},
+}
+
+
+def read_users(path):
+    """
+    Stream user records from a CSV or JSONL file.
+
+    Args:
+        path (str): File path; `.jsonl`/`.ndjson` files are read as JSON
+            lines, everything else as CSV with a header row.
+
+    Yields:
+        tuple: `(line_number, record)`; the record is a dict, or for
+               JSON lines the undecoded line, which `validate_user`
+               parses so that a malformed line is reported as invalid.
+    """
+    with open(path, encoding="utf-8", newline="") as source:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_number, line in enumerate(source, start=1):
+                if line.strip():
+                    yield line_number, line
+        else:
+            for line_number, record in enumerate(
+                csv.DictReader(source), start=2
+            ):
+                yield line_number, record
+
+
+def _string(record, field):
+    value = record.get(field)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+def _decode_record(record):
+    """
+    Decode a JSON line from `read_users`; dicts are returned unchanged.
+
+    Raises:
+        ValueError: If the line is not valid JSON or not an object.
+    """
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"invalid JSON: {error}") from None
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    return record
+
+
+def validate_user(record):
+    """
+    Normalize one input record into `User` column values.
+
+    Args:
+        record (dict | str): Raw record from `read_users`.
+
+    Returns:
+        dict: Column values with the plaintext password under `password`.
+
+    Raises:
+        ValueError: If the record is malformed, or a required field is
+            missing or invalid.
+    """
+    record = _decode_record(record)
+    email = _string(record, "email").strip()
+    if "@" not in email:
+        raise ValueError("invalid email")
+
+    full_name = _string(record, "fullName").strip() or " ".join(
+        part for part in (
+            _string(record, "firstName").strip(),
+            _string(record, "lastName").strip(),
+        ) if part
+    )
+    if not full_name:
+        raise ValueError("missing name")
+
+    company = _string(record, "company").strip()
+    if not company:
+        raise ValueError("missing company")
+
+    user_type = _USER_TYPES.get(_string(record, "userType").strip().lower())
+    if user_type is None:
+        raise ValueError("invalid userType")
+
+    password = _string(record, "password")
+    if len(password) < 8:
+        raise ValueError("password must be at least 8 symbols")
+
+    return {
+        "email": email,
+        "fullName": full_name,
+        "company": company,
+        "userType": user_type,
+        "userRep": 50.00,
+        "password": password,
+    }
+
+
+def _hash(args):
+    password, rounds = args
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def _insert_returning(db, rows):
+    """Insert rows, skipping conflicting emails; return inserted emails."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        module = postgresql if dialect == "postgresql" else sqlite
+        statement = (
+            module.insert(User)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User.email)
+        )
+        return set(db.execute(statement).scalars())
+
+    # Other databases: one savepoint per row, still without pre-queries.
+    inserted = set()
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(User).values(row))
+            inserted.add(row["email"])
+        except IntegrityError:
+            pass
+    return inserted
+
+
+def import_users(db, records, rounds, workers=None, chunk_size=500,
+                 report=None):
+    """
+    Import users in chunks.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        records (Iterable[tuple[int, dict]]): Output of `read_users`.
+        rounds (int): bcrypt cost factor.
+        workers (int | None): Hashing processes (default: CPU count).
+        chunk_size (int): Users per INSERT statement and commit.
+        report (callable | None): Called with
+            `(line_number, email, status, detail)` for every record.
+
+    Returns:
+        dict: Number of records per status.
+    """
+    totals = {CREATED: 0, DUPLICATE: 0, INVALID: 0}
+    workers = workers or os.cpu_count() or 1
+
+    def emit(line_number, email, status, detail=""):
+        totals[status] += 1
+        if report:
+            report(line_number, email, status, detail)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk = []
+        for line_number, record in records:
+            try:
+                chunk.append((line_number, validate_user(record)))
+            except ValueError as error:
+                emit(line_number, _reported_email(record), INVALID,
+                     str(error))
+                continue
+            if len(chunk) >= chunk_size:
+                _import_chunk(db, executor, workers, chunk, rounds, emit)
+                chunk = []
+        if chunk:
+            _import_chunk(db, executor, workers, chunk, rounds, emit)
+    return totals
+
+
+def _reported_email(record):
+    try:
+        return str(_decode_record(record).get("email") or "")
+    except ValueError:
+        return ""
+
+
+def _import_chunk(db, executor, workers, chunk, rounds, emit):
+    # Repeated emails inside one chunk would be silently skipped by
+    # ON CONFLICT; keep the first and report the rest here.
+    unique = {}
+    for line_number, row in chunk:
+        if row["email"] in unique:
+            emit(line_number, row["email"], DUPLICATE, "repeated in input")
+        else:
+            unique[row["email"]] = (line_number, row)
+
+    entries = list(unique.values())
+    hashes = executor.map(
+        _hash,
+        [(row["password"], rounds) for _, row in entries],
+        chunksize=max(1, len(entries) // (workers * 4)),
+    )
+    rows = []
+    for (_, row), hashed in zip(entries, hashes):
+        rows.append({**row, "password": hashed})
+
+    try:
+        inserted = _insert_returning(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for line_number, row in entries:
+        if row["email"] in inserted:
+            emit(line_number, row["email"], CREATED)
+        else:
+            emit(line_number, row["email"], DUPLICATE, "already registered")
+
+
+def csv_report(output):
+    """
+    Build a `report` callback writing CSV rows to an open file.
+
+    Args:
+        output: Writable text file.
+
+    Returns:
+        callable: Report callback for `import_users`.
+    """
+    writer = csv.writer(output)
+    writer.writerow(["line", "email", "status", "detail"])
+
+    def report(line_number, email, status, detail):
+        writer.writerow([line_number, email, status, detail])
+    return report
@@ -1,10 +1,17 @@
-from controller.endpoints import app
+from controller.app import create_app, warm_up
 from database.db_funcs import init_db
 import os
+import sys
 
 debug_mode = os.getenv("FLASK_DEBUG", "0") == "1"
 
 
 if __name__ == "__main__":
-    init_db()
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    if sys.argv[1:2] == ["serve"]:
+        from controller.server import serve
+        serve()
+    else:
+        app = create_app()
+        init_db()
+        warm_up(app)
+        app.run(host="0.0.0.0", port=5000, debug=debug_mode)
@@ -5,16 +5,19 @@ This module defines:
 - Enumerations for user types, cargo types, currencies,
   contract and payment statuses.
 - ORM models: `User`, `Order`, and `Contract` with relationships
-  between them.
+  between them, `ExchangeRate` for price normalization and
+  `OrderSummary` for the profile dashboard.
 
 Notes:
 - Relationships are declared bi-directionally using
   `back_populates`.
 - `foreign_keys` are specified where multiple FKs point to the
   same target table.
+- Composite indexes are declared in `__table_args__` next to the
+  queries they serve.
 """
 from sqlalchemy import (
-    Column, ForeignKey, Integer, String, DateTime, Boolean, Float, Text
+    Column, ForeignKey, Integer, String, DateTime, Boolean, Float, Text, Index
 )
 from sqlalchemy.types import Enum as SQLEnum
 from sqlalchemy.orm import declarative_base, relationship
@@ -148,6 +151,8 @@ class Order(Base):
     contractOrder = Column(ForeignKey("contracts.id"))
     orderStatus = Column(String, nullable=False)
     isEmptyLegMatch = Column(Boolean, nullable=False)
+    # `orderPrice` in the base currency, maintained by `database.rates`.
+    normalizedPrice = Column(Float)
 
     user = relationship(
         "User",
@@ -161,6 +166,52 @@ class Order(Base):
     )
     contract = relationship("Contract", back_populates="orders")
 
+    __table_args__ = (
+        # Keyset pagination of a user's order history on (orderDate, id).
+        Index("ix_orders_user_date_id", "userId", "orderDate", "id"),
+        # Order search (database.search): equality filters first, then
+        # (departureDate, id) for range filters and cursor pagination.
+        # The INCLUDE columns let Postgres evaluate the remaining
+        # filters from the index alone.
+        Index(
+            "ix_orders_route_departure",
+            "departureAirport", "arrivalAirport", "departureDate", "id",
+            postgresql_include=[
+                "departureCargoType", "departureCargoWeight",
+                "departureCargoVolume", "orderPrice", "orderCurrency",
+            ],
+        ),
+        Index(
+            "ix_orders_city_route_departure",
+            "departureCity", "arrivalCity", "departureDate", "id",
+        ),
+        Index(
+            "ix_orders_arrival_departure",
+            "arrivalAirport", "departureDate", "id",
+        ),
+        Index(
+            "ix_orders_arrival_city_departure",
+            "arrivalCity", "departureDate", "id",
+        ),
+        Index(
+            "ix_orders_cargo_departure",
+            "departureCargoType", "departureDate", "id",
+        ),
+        Index("ix_orders_departure_id", "departureDate", "id"),
+        # Proximity search (services.geo): departure airports near a
+        # point, within a date window.
+        Index(
+            "ix_orders_departure_airport_date",
+            "departureAirport", "departureDate",
+        ),
+        # Sorting by normalized price: search and the order history.
+        Index("ix_orders_normalized_price_id", "normalizedPrice", "id"),
+        Index(
+            "ix_orders_user_normalized_price_id",
+            "userId", "normalizedPrice", "id",
+        ),
+    )
+
 
 class Contract(Base):
     """Contract agreed between a charterer and a carrier.
@@ -194,3 +245,36 @@ class Contract(Base):
         back_populates="carrierContracts",
         foreign_keys=[carrierId],
     )
+
+
+class ExchangeRate(Base):
+    """Conversion rate of a currency into the base currency.
+
+    `rate` is the amount of base currency per unit of `currency`;
+    `Order.normalizedPrice` is `orderPrice * rate`.
+    """
+    __tablename__ = "exchange_rates"
+
+    currency = Column(SQLEnum(CurrencyEnum), primary_key=True)
+    rate = Column(Float, nullable=False)
+    updatedAt = Column(DateTime, nullable=False)
+
+
+class OrderSummary(Base):
+    """Order count and price total of one user per dashboard bucket.
+
+    Maintained incrementally by `database.summaries`.
+
+    - `role`: "owner" (`User.orders`) or "partner" (`User.joined_orders`).
+    - `dimension`: "status" (payment status name) or "month" (YYYY-MM).
+    - `priceTotal`: sum of `orderPrice` in `currency`.
+    """
+    __tablename__ = "order_summaries"
+
+    userId = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    role = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    currency = Column(SQLEnum(CurrencyEnum), primary_key=True)
+    orderCount = Column(Integer, nullable=False, default=0)
+    priceTotal = Column(Float, nullable=False, default=0.0)
@@ -64,3 +64,29 @@ class RegistrationForm(FlaskForm):
     )
 
     submit = SubmitField('Register')
+
+
+class ProfileForm(FlaskForm):
+    """Form for updating the user's profile details."""
+    firstName = StringField('First name', validators=[
+        DataRequired(message='First name')
+    ])
+    lastName = StringField('Last name', validators=[
+        DataRequired(message='Last name')
+    ])
+    company = StringField('Company name', validators=[
+        DataRequired(message='Company name')
+    ])
+    email = StringField(
+        'Email', validators=[
+            DataRequired(message='email requred'),
+            Email(message='Input correct email')
+        ]
+    )
+    userType = SelectField(
+        'Account Type',
+        choices=[(e.name, e.value) for e in UserTypeEnum],
+        validators=[DataRequired()]
+    )
+
+    submit = SubmitField('Save Changes')
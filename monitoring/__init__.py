@@ -0,0 +1,6 @@
+"""Monitoring package.
+
+Process-wide metrics (histograms, counters), per-request timing of hot
+paths and a sampling profiler. Has no Flask dependency so that the
+database layer can record timings too.
+"""
@@ -0,0 +1,212 @@
+"""Metrics registry and per-request timing.
+
+Main features:
+- `Histogram` and counters kept in a process-wide `registry`, rendered
+  in the Prometheus text exposition format.
+- `timed(component)` measures a hot path (SQL, bcrypt, template
+  rendering, translation loading) and adds the time both to the
+  component histogram and to the timings of the current request.
+- `install_sql_hooks()` counts and times every SQL statement through
+  SQLAlchemy engine events.
+
+Per-request timings live in a context variable, so they work with
+threaded servers without passing state around.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+    5.0, 10.0,
+)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one observation (in seconds)."""
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        """Yield `(upper_bound, cumulative_count)` pairs, ending in +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+        yield float("inf"), self.count
+
+
+class Registry:
+    """Thread-safe store of histograms and counters keyed by labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def observe(self, name, value, help_text="", **labels):
+        """Add an observation to the histogram `name` with `labels`."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, help_text="", **labels):
+        """Increase the counter `name` with `labels`."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._help.setdefault(name, help_text)
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text, one sample per line.
+        """
+        with self._lock:
+            histograms = {
+                key: (
+                    list(histogram.cumulative()), histogram.sum,
+                    histogram.count,
+                )
+                for key, histogram in self._histograms.items()
+            }
+            counters = dict(self._counters)
+            help_texts = dict(self._help)
+
+        lines = []
+        for name in sorted({key[0] for key in counters}):
+            lines.append(f"# HELP {name} {help_texts.get(name, '')}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+
+        for name in sorted({key[0] for key in histograms}):
+            lines.append(f"# HELP {name} {help_texts.get(name, '')}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (buckets, total, count) in sorted(
+                histograms.items()
+            ):
+                if metric != name:
+                    continue
+                for bound, cumulative in buckets:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = format_labels(labels + (("le", le),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    """Format `((key, value), ...)` as a Prometheus label set."""
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+registry = Registry()
+
+
+def start_request():
+    """
+    Start collecting component timings for the current request.
+
+    Returns:
+        dict: `{component: [seconds, calls]}`, filled by `record`.
+    """
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def end_request():
+    """Stop collecting timings and return what was collected."""
+    timings = _request_timings.get()
+    _request_timings.set(None)
+    return timings or {}
+
+
+def record(component, seconds):
+    """
+    Record time spent in a component.
+
+    Args:
+        component (str): e.g. "sql", "bcrypt", "render", "translations".
+        seconds (float): Elapsed time.
+    """
+    registry.observe(
+        "component_duration_seconds", seconds,
+        "Time spent in hot-path components", component=component,
+    )
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(component, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def timed(component):
+    """Context manager recording the time spent in its body."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, time.perf_counter() - start)
+
+
+_sql_started = threading.local()
+_sql_hooks_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    _sql_started.value = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(_sql_started, "value", None)
+    if start is not None:
+        record("sql", time.perf_counter() - start)
+        _sql_started.value = None
+
+
+def install_sql_hooks():
+    """Count and time SQL statements of every SQLAlchemy engine."""
+    global _sql_hooks_installed
+    if not _sql_hooks_installed:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _sql_hooks_installed = True
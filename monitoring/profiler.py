@@ -0,0 +1,80 @@
+"""Sampling profiler for single requests.
+
+A background thread periodically captures the stack of the profiled
+thread with `sys._current_frames()`. The result is written in the
+"collapsed stacks" format understood by flamegraph tools
+(`frame;frame;frame count` per line).
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id=None, interval=0.005):
+        """
+        Args:
+            thread_id (int | None): Thread to sample (default: caller).
+            interval (float): Seconds between two samples.
+        """
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{os.path.basename(code.co_filename)}:"
+                    f"{code.co_name}:{frame.f_lineno}"
+                )
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples in collapsed-stack format."""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def write(self, directory, name):
+        """
+        Write the collapsed stacks to `<directory>/<name>-<time>.folded`.
+
+        Returns:
+            str: Path of the written file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-"
+            f"{os.getpid()}-{self.thread_id}.folded"
+        )
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(self.collapsed())
+        return path
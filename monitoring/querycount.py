@@ -0,0 +1,129 @@
+"""SQL statement tracking and query limits.
+
+Catches N+1 query patterns in tests: the statements issued while
+tracking is active are recorded, and exceeding a limit raises
+`QueryLimitExceeded` with the most repeated statements, which usually
+point at the relationship that is lazily loaded per row.
+
+Main features:
+- `max_queries(limit)` context manager for data-access code.
+- `track_queries()` context manager that only records, e.g. for the
+  per-route query counts of `benchmarks.run`.
+- Per-request tracking used by `controller.instrumentation` when a
+  query limit is configured (test mode).
+
+Tracking lives in a context variable, so concurrent requests in a
+threaded server are counted separately; statements are only recorded
+while tracking is active. Tracking nests: a statement is recorded in
+every active list, so a request tracked inside `track_queries` is
+counted by both.
+"""
+
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Active statement lists, innermost last.
+_statements = contextvars.ContextVar("tracked_statements", default=())
+_hooks_installed = False
+
+
+class QueryLimitExceeded(AssertionError):
+    """Raised when more statements than allowed were issued."""
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    for statements in _statements.get():
+        statements.append(statement)
+
+
+def install_statement_hooks():
+    """Record statements of every SQLAlchemy engine while tracking."""
+    global _hooks_installed
+    if not _hooks_installed:
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _hooks_installed = True
+
+
+def start_tracking():
+    """
+    Start recording statements in the current context.
+
+    Returns:
+        list[str]: The list statements are appended to.
+    """
+    install_statement_hooks()
+    statements = []
+    _statements.set(_statements.get() + (statements,))
+    return statements
+
+
+def stop_tracking():
+    """Stop the innermost recording and return its statements."""
+    active = _statements.get()
+    if not active:
+        return []
+    _statements.set(active[:-1])
+    return active[-1]
+
+
+@contextmanager
+def track_queries():
+    """
+    Record the SQL statements issued by the body.
+
+    Yields:
+        list[str]: Statements recorded so far.
+    """
+    statements = []
+    install_statement_hooks()
+    token = _statements.set(_statements.get() + (statements,))
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
+
+
+def check_query_limit(statements, limit, context="block"):
+    """
+    Raise if more than `limit` statements were recorded.
+
+    Args:
+        statements (list[str]): Recorded statements.
+        limit (int): Maximum number of statements.
+        context (str): Name of the checked request or block, for the
+            error message.
+
+    Raises:
+        QueryLimitExceeded: With the three most repeated statements.
+    """
+    if len(statements) <= limit:
+        return
+    repeated = "\n".join(
+        f"  {count}x {' '.join(statement.split())[:200]}"
+        for statement, count in Counter(statements).most_common(3)
+    )
+    raise QueryLimitExceeded(
+        f"{context} issued {len(statements)} SQL statements "
+        f"(limit {limit}); most repeated:\n{repeated}"
+    )
+
+
+@contextmanager
+def max_queries(limit, context="block"):
+    """
+    Fail if the body issues more than `limit` SQL statements.
+
+    Args:
+        limit (int): Maximum number of statements.
+        context (str): Name used in the error message.
+
+    Yields:
+        list[str]: Statements recorded so far.
+    """
+    with track_queries() as statements:
+        yield statements
+        check_query_limit(statements, limit, context)
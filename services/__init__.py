@@ -0,0 +1,5 @@
+"""Services package.
+
+This package groups in-memory domain services (matching, indexes,
+caches) that sit between the database layer and the Flask endpoints.
+"""
@@ -0,0 +1,331 @@
+"""Airport and city autocomplete.
+
+Suggestions are answered from an in-memory prefix index instead of
+`LIKE 'abc%'` queries against `orders`.
+
+Main features:
+- One sorted array of `(key, suggestion)` pairs per language, searched
+  with `bisect`; a lookup costs O(log n + k).
+- Built from the bundled `data/airports.json` (IATA code, city and
+  airport name per language) and from the distinct cities and airports
+  found in `orders`.
+- Keys are case- and accent-insensitive ("kol" finds "Köln").
+- Lookups take no lock: new entries are merged into a copy of the
+  array, which then replaces the old one.
+- Incremental refresh: only orders with an `id` above the last seen one
+  are read, at most once per `refresh_interval` seconds. The first
+  (full) read runs in `controller.app.warm_up`; later ones run in a
+  background thread, never in the request.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+
+from model.dbModels import Order
+
+logger = logging.getLogger(__name__)
+AIRPORTS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "data", "airports.json"
+)
+
+DEFAULT_LANGUAGE = "en"
+
+CITY = "city"
+AIRPORT = "airport"
+
+
+class Suggestion(NamedTuple):
+    """One autocomplete result.
+
+    `value` is what is stored in `orders` (English city name or IATA
+    code), `label` is the text shown to the user.
+    """
+    kind: str
+    value: str
+    label: str
+
+
+def normalize(text):
+    """Return the search key of a text: casefolded, without accents."""
+    decomposed = unicodedata.normalize("NFKD", text.strip().casefold())
+    return "".join(
+        char for char in decomposed if not unicodedata.combining(char)
+    )
+
+
+def load_airports(path=AIRPORTS_PATH):
+    """
+    Load the bundled airport dataset.
+
+    Args:
+        path (str): JSON file with a list of `{"iata", "lat", "lon",
+            "city": {lang: name}, "name": {lang: name}}`.
+
+    Returns:
+        list[dict]: Airport records.
+    """
+    with open(path, encoding="utf-8") as source:
+        return json.load(source)
+
+
+class PrefixIndex:
+    """Sorted array of `(key, Suggestion)` pairs searched by prefix.
+
+    The array is never changed in place; writers build a new one and
+    swap the reference, so `search` needs no lock. Writers must be
+    serialized by the caller.
+    """
+
+    def __init__(self, items=()):
+        """
+        Args:
+            items (Iterable[tuple[str, Suggestion]]): Initial
+                `(text, suggestion)` pairs.
+        """
+        self._entries = sorted({
+            (normalize(text), suggestion) for text, suggestion in items
+        })
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, text, suggestion):
+        """Index `suggestion` under `text`; duplicates are ignored."""
+        self.add_many([(text, suggestion)])
+
+    def add_many(self, items):
+        """Index `(text, suggestion)` pairs with one copy of the array."""
+        entries = list(self._entries)
+        for text, suggestion in items:
+            entry = (normalize(text), suggestion)
+            position = bisect.bisect_left(entries, entry)
+            if position == len(entries) or entries[position] != entry:
+                entries.insert(position, entry)
+        self._entries = entries
+
+    def search(self, prefix, limit=10, kind=None):
+        """
+        Return up to `limit` suggestions whose key starts with `prefix`.
+
+        Args:
+            prefix (str): Text typed by the user.
+            limit (int): Maximum number of suggestions.
+            kind (str | None): Only `CITY` or `AIRPORT` suggestions.
+
+        Returns:
+            list[Suggestion]: Suggestions in key order, without repeats.
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        entries = self._entries
+        position = bisect.bisect_left(entries, (key,))
+        results = []
+        seen = set()
+        while position < len(entries) and len(results) < limit:
+            entry_key, suggestion = entries[position]
+            if not entry_key.startswith(key):
+                break
+            position += 1
+            if kind and suggestion.kind != kind:
+                continue
+            if (suggestion.kind, suggestion.value) in seen:
+                continue
+            seen.add((suggestion.kind, suggestion.value))
+            results.append(suggestion)
+        return results
+
+
+class AirportAutocomplete:
+    """Per-language prefix indexes of cities and airports."""
+
+    def __init__(self, dataset_path=AIRPORTS_PATH, refresh_interval=30.0,
+                 session_factory=None):
+        """
+        Args:
+            dataset_path (str): Bundled airport dataset.
+            refresh_interval (float): Minimum number of seconds between
+                two incremental reads of `orders`.
+            session_factory (callable | None): Returns a new SQLAlchemy
+                session for background refreshes (default:
+                `database.db_funcs.get_session`).
+        """
+        self.dataset_path = dataset_path
+        self.refresh_interval = refresh_interval
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._indexes = {}
+        self._known = set()
+        self._last_order_id = 0
+        self._next_refresh = 0.0
+        self.refreshes = 0
+
+    @property
+    def loaded(self):
+        """True once `load` has built the indexes."""
+        return bool(self._indexes)
+
+    def load(self, languages):
+        """
+        Build the indexes from the bundled dataset.
+
+        Args:
+            languages (Iterable[str]): Language codes to build indexes
+                for; names missing from the dataset fall back to English.
+
+        Returns:
+            AirportAutocomplete: self.
+        """
+        languages = set(languages) | {DEFAULT_LANGUAGE}
+        items = {language: [] for language in languages}
+        known = set()
+        for airport in load_airports(self.dataset_path):
+            code = airport["iata"]
+            city_en = airport["city"][DEFAULT_LANGUAGE]
+            known.add((AIRPORT, code))
+            known.add((CITY, city_en))
+            for language, pairs in items.items():
+                city = airport["city"].get(language, city_en)
+                name = airport["name"].get(
+                    language, airport["name"][DEFAULT_LANGUAGE]
+                )
+                airport_suggestion = Suggestion(
+                    AIRPORT, code, f"{name} ({code})"
+                )
+                city_suggestion = Suggestion(CITY, city_en, city)
+                pairs.append((code, airport_suggestion))
+                pairs.append((name, airport_suggestion))
+                pairs.append((city, city_suggestion))
+                pairs.append((city, airport_suggestion))
+                if city != city_en:
+                    pairs.append((city_en, city_suggestion))
+        indexes = {
+            language: PrefixIndex(pairs) for language, pairs in items.items()
+        }
+        with self._lock:
+            self._indexes = indexes
+            self._known = known
+            self._last_order_id = 0
+            self._next_refresh = 0.0
+        return self
+
+    def refresh(self, db):
+        """
+        Add cities and airports of orders created since the last refresh.
+
+        The queries run without the lock; it is only held while the new
+        values are merged into the indexes.
+
+        Args:
+            db (Session): SQLAlchemy session instance.
+
+        Returns:
+            int: Number of new suggestions.
+        """
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        indexes = self._indexes
+        last_id = self._last_order_id
+        max_id = db.execute(select(func.max(Order.id))).scalar()
+        if max_id is None or max_id <= last_id:
+            return 0
+        new_values = set()
+        window = Order.id.between(last_id + 1, max_id)
+        for city_column, airport_column in (
+            (Order.departureCity, Order.departureAirport),
+            (Order.arrivalCity, Order.arrivalAirport),
+        ):
+            rows = db.execute(
+                select(city_column, airport_column)
+                .where(window).distinct()
+            )
+            for city, airport in rows:
+                new_values.add((CITY, city))
+                new_values.add((AIRPORT, airport))
+
+        with self._lock:
+            if self._indexes is not indexes:
+                # `load` replaced the indexes; the next refresh starts over.
+                return 0
+            new_values -= self._known
+            pairs = [
+                (value, Suggestion(kind, value, value))
+                for kind, value in new_values
+            ]
+            if pairs:
+                for index in self._indexes.values():
+                    index.add_many(pairs)
+                self._known |= new_values
+            self._last_order_id = max(self._last_order_id, max_id)
+            self.refreshes += 1
+            return len(pairs)
+
+    def refresh_due(self):
+        """Return True if `refresh` should run before the next lookup."""
+        return time.monotonic() >= self._next_refresh
+
+    def refresh_in_background(self):
+        """Start `refresh` in a thread unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(
+            target=self._background_refresh, name="autocomplete-refresh",
+            daemon=True,
+        ).start()
+
+    def _background_refresh(self):
+        if self.session_factory is None:
+            from database.db_funcs import get_session
+            self.session_factory = get_session
+        try:
+            with self.session_factory() as db:
+                self.refresh(db)
+        except Exception:
+            # Lookups keep using the current indexes.
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            logger.exception("autocomplete refresh failed")
+        finally:
+            self._refreshing = False
+
+    def suggest(self, prefix, language=DEFAULT_LANGUAGE, kind=None,
+                limit=10):
+        """
+        Return autocomplete suggestions.
+
+        Args:
+            prefix (str): Text typed by the user.
+            language (str): Language of the labels; unknown languages use
+                English.
+            kind (str | None): Only `CITY` or `AIRPORT` suggestions.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            list[Suggestion]: Matching suggestions.
+        """
+        index = (self._indexes.get(language)
+                 or self._indexes.get(DEFAULT_LANGUAGE))
+        if index is None:
+            return []
+        return index.search(prefix, limit, kind)
+
+    def stats(self):
+        """Return index sizes and refresh counters."""
+        return {
+            "languages": len(self._indexes),
+            "entries": sum(len(index) for index in self._indexes.values()),
+            "last_order_id": self._last_order_id,
+            "refreshes": self.refreshes,
+        }
+
+
+autocomplete = AirportAutocomplete()
@@ -0,0 +1,195 @@
+"""Content-addressed document store.
+
+Contract documents are kept on the local filesystem under the SHA-256
+digest of their content, so identical uploads are stored once and a
+stored file never changes.
+
+Main features:
+- `save` streams an upload to a temporary file in fixed-size chunks,
+  hashing while writing; memory use does not depend on the file size.
+  The file is then moved into place atomically, or dropped if a file
+  with the same digest already exists.
+- Files live in `<root>/<aa>/<bb>/<digest>` to keep directories small.
+- Documents are referenced as `sha256:<digest>` URIs (the value stored
+  in `Contract.contractFileUrl`); `path_for` maps a URI back to a file
+  that can be handed to `send_file`.
+- `delete` removes a file written by an upload that could not be
+  attached to its contract.
+
+Environment variables:
+- `DOCUMENTS_DIR`: storage root (default: `storage/documents` in the
+  project directory).
+- `DOCUMENT_MAX_BYTES`: maximum upload size (default 50 MiB).
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import NamedTuple
+
+DEFAULT_DOCUMENTS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "storage", "documents"
+)
+URI_SCHEME = "sha256:"
+CHUNK_SIZE = 256 * 1024
+
+
+class DocumentTooLarge(Exception):
+    """Raised when an upload exceeds the store's size limit."""
+
+
+class InvalidDocument(ValueError):
+    """Raised when an upload does not start with the expected bytes."""
+
+
+class StoredDocument(NamedTuple):
+    """Result of `DocumentStore.save`."""
+    digest: str
+    size: int
+    created: bool
+
+    @property
+    def uri(self):
+        return URI_SCHEME + self.digest
+
+
+def parse_uri(uri):
+    """
+    Return the digest of a `sha256:<digest>` URI, or None.
+
+    Args:
+        uri (str | None): Stored document reference.
+    """
+    if not uri or not uri.startswith(URI_SCHEME):
+        return None
+    digest = uri[len(URI_SCHEME):]
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        return None
+    return digest
+
+
+class DocumentStore:
+    """Filesystem store addressed by SHA-256 digest."""
+
+    def __init__(self, root=DEFAULT_DOCUMENTS_DIR, max_bytes=50 * 1024 * 1024,
+                 chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            root (str): Storage directory, created on first write.
+            max_bytes (int): Maximum size of a stored document.
+            chunk_size (int): Bytes read from an upload at a time.
+        """
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.saved = 0
+        self.deduplicated = 0
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def save(self, stream, prefix=b""):
+        """
+        Store the content of a binary stream.
+
+        Args:
+            stream: Object with a `read(size)` method, e.g.
+                `request.stream`.
+            prefix (bytes): Bytes the content must start with, e.g.
+                `b"%PDF-"`.
+
+        Returns:
+            StoredDocument: Digest, size and whether a new file was
+            written (False for a duplicate).
+
+        Raises:
+            DocumentTooLarge: If the stream exceeds `max_bytes`.
+            InvalidDocument: If the content does not start with `prefix`.
+        """
+        staging = os.path.join(self.root, "tmp")
+        os.makedirs(staging, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=staging)
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(descriptor, "wb") as target:
+                head = b""
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DocumentTooLarge(
+                            f"document exceeds {self.max_bytes} bytes"
+                        )
+                    if len(head) < len(prefix):
+                        head += chunk[:len(prefix) - len(head)]
+                    sha.update(chunk)
+                    target.write(chunk)
+                if head != prefix:
+                    raise InvalidDocument("unexpected document content")
+                target.flush()
+                os.fsync(target.fileno())
+
+            digest = sha.hexdigest()
+            path = self._path(digest)
+            if os.path.exists(path):
+                os.unlink(temp_path)
+                self.deduplicated += 1
+                return StoredDocument(digest, size, False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            self.saved += 1
+            return StoredDocument(digest, size, True)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def path_for(self, uri):
+        """
+        Return the file of a stored document.
+
+        Args:
+            uri (str | None): `sha256:<digest>` reference.
+
+        Returns:
+            str | None: Absolute path, or None for other references and
+            missing files.
+        """
+        digest = parse_uri(uri)
+        if digest is None:
+            return None
+        path = self._path(digest)
+        return path if os.path.isfile(path) else None
+
+    def delete(self, digest):
+        """
+        Remove a stored document.
+
+        Only for a file the caller has just created (`created` was True)
+        and not referenced yet; a duplicate upload racing with the call
+        would lose its file.
+
+        Args:
+            digest (str): SHA-256 hex digest of the content.
+
+        Returns:
+            bool: Whether a file was removed.
+        """
+        try:
+            os.unlink(self._path(digest))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def stats(self):
+        """Return the number of written and deduplicated uploads."""
+        return {"saved": self.saved, "deduplicated": self.deduplicated}
+
+
+document_store = DocumentStore(
+    root=os.getenv("DOCUMENTS_DIR", DEFAULT_DOCUMENTS_DIR),
+    max_bytes=int(os.getenv("DOCUMENT_MAX_BYTES", 50 * 1024 * 1024)),
+)
@@ -0,0 +1,416 @@
+"""Live feed of new orders for server-sent events.
+
+Browsers subscribe with route, date and capacity filters and receive
+new orders as they are committed, instead of each of them polling
+`orders`.
+
+Main features:
+- One dispatcher thread per process reads new orders (`id` above the
+  last seen one) in a single query, evaluates each against all active
+  subscriptions and fans it out to the matching clients. It is woken
+  immediately when an order is committed in this process and otherwise
+  polls every `poll_interval` seconds while anyone is subscribed, so
+  orders from other workers and from `ingest-orders` arrive too.
+- Ids skipped over are re-checked for `late_window` seconds, because a
+  transaction can commit an order after one with a higher id (Postgres
+  sequences); every id is delivered at most once.
+- Subscriptions are indexed by `(departureAirport, arrivalAirport)`,
+  with `None` as a wildcard; an order is checked against at most four
+  buckets, so delivery cost follows the subscriptions on its route, not
+  the total number of subscribers.
+- Every client has a bounded queue. A client that falls `max_queue`
+  events behind is evicted: its queue is dropped and its stream ends
+  with an `evicted` event, so one slow reader cannot hold memory or
+  slow the dispatcher down.
+
+Notes:
+- A feed connection occupies a server thread for its lifetime; see
+  `controller.server` for how threads and feed clients are sized.
+
+Environment variables:
+- `FEED_MAX_CLIENTS`: subscriptions per process (default 1000).
+- `FEED_MAX_QUEUE`: pending events per client (default 100).
+- `FEED_POLL_INTERVAL`: seconds between polls for orders committed by
+  other processes (default 2).
+- `FEED_LATE_WINDOW`: seconds a skipped id is waited for (default 60).
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from model.dbModels import CargoTypeEnum, Order
+
+logger = logging.getLogger(__name__)
+
+FEED_FIELDS = (
+    "id", "orderNumber", "departureAirport", "departureCity",
+    "arrivalAirport", "arrivalCity", "departureDate", "arrivalDate",
+    "aircraftType", "departureCargoType", "departureCargoWeight",
+    "departureCargoVolume", "orderPrice", "orderCurrency",
+)
+
+
+class FeedFull(Exception):
+    """Raised when the process already serves `max_clients` clients."""
+
+
+@dataclass(frozen=True)
+class FeedFilter:
+    """
+    Predicates of one subscription; None matches anything.
+
+    Dates are naive UTC, like the `orders` columns.
+    """
+    departureAirport: Optional[str] = None
+    arrivalAirport: Optional[str] = None
+    departFrom: Optional[datetime] = None
+    departTo: Optional[datetime] = None
+    cargoType: Optional[CargoTypeEnum] = None
+    minWeight: Optional[float] = None
+    minVolume: Optional[float] = None
+
+    def matches(self, order):
+        """Check the non-route predicates against an order mapping."""
+        departure = order["departureDate"]
+        return not (
+            (self.departFrom is not None and departure < self.departFrom)
+            or (self.departTo is not None and departure > self.departTo)
+            or (self.cargoType is not None
+                and order["departureCargoType"] != self.cargoType)
+            or (self.minWeight is not None
+                and order["departureCargoWeight"] < self.minWeight)
+            or (self.minVolume is not None
+                and order["departureCargoVolume"] < self.minVolume)
+        )
+
+
+class FeedClient:
+    """One subscriber with a bounded queue of pending orders."""
+
+    def __init__(self, client_id, user_id, feed_filter, max_queue):
+        """
+        Args:
+            client_id (int): Identifier within the hub.
+            user_id (int): Subscribing user.
+            feed_filter (FeedFilter): Orders the client wants.
+            max_queue (int): Pending orders before eviction.
+        """
+        self.id = client_id
+        self.user_id = user_id
+        self.filter = feed_filter
+        self.max_queue = max_queue
+        self.evicted = False
+        self._events = deque()
+        self._ready = threading.Condition()
+
+    def offer(self, order):
+        """
+        Queue an order for the client.
+
+        Returns:
+            bool: False if the queue was full and the client is evicted.
+        """
+        with self._ready:
+            if self.evicted:
+                return False
+            if len(self._events) >= self.max_queue:
+                self.evicted = True
+                self._events.clear()
+                self._ready.notify()
+                return False
+            self._events.append(order)
+            self._ready.notify()
+            return True
+
+    def close(self):
+        """Drop pending orders and end the client's stream."""
+        with self._ready:
+            self.evicted = True
+            self._events.clear()
+            self._ready.notify()
+
+    def wait(self, timeout):
+        """
+        Wait for queued orders.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            list[dict]: Queued orders, empty on timeout or eviction.
+        """
+        with self._ready:
+            if not self._events and not self.evicted:
+                self._ready.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class FeedHub:
+    """In-process publish/subscribe hub for new orders."""
+
+    def __init__(self, session_factory=None, max_clients=1000,
+                 max_queue=100, poll_interval=2.0, batch_size=500,
+                 late_window=60.0, max_gaps=10000):
+        """
+        Args:
+            session_factory (callable | None): Returns a new SQLAlchemy
+                session for the dispatcher (default:
+                `database.db_funcs.get_session`).
+            max_clients (int): Maximum number of subscriptions.
+            max_queue (int): Pending orders per client before eviction.
+            poll_interval (float): Seconds between polls while anyone is
+                subscribed.
+            batch_size (int): Orders read per dispatcher query.
+            late_window (float): Seconds an id that was skipped over is
+                still expected to be committed.
+            max_gaps (int): Skipped ids remembered at most; the oldest
+                are given up first.
+        """
+        self.session_factory = session_factory
+        self.max_clients = max_clients
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.late_window = late_window
+        self.max_gaps = max_gaps
+        self._lock = threading.Lock()
+        # Serializes reads of new orders with re-baselining `_last_id`.
+        self._dispatch_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._clients = {}
+        self._routes = {}
+        self._ids = itertools.count(1)
+        self._last_id = None
+        # Skipped ids below `_last_id` -> monotonic deadline.
+        self._gaps = {}
+        self._thread = None
+        self.dispatched = 0
+        self.late = 0
+        self.delivered = 0
+        self.evictions = 0
+
+    def _session(self):
+        if self.session_factory is None:
+            from database.db_funcs import get_session
+            self.session_factory = get_session
+        return self.session_factory()
+
+    def subscribe(self, user_id, feed_filter):
+        """
+        Register a client.
+
+        Args:
+            user_id (int): Subscribing user.
+            feed_filter (FeedFilter): Orders the client wants.
+
+        Returns:
+            FeedClient: The client; pass it to `unsubscribe` when done.
+
+        Raises:
+            FeedFull: If `max_clients` clients are connected.
+        """
+        self._start()
+        route = (feed_filter.departureAirport, feed_filter.arrivalAirport)
+        if not self._clients:
+            # Orders committed while nobody listened are not delivered.
+            self._baseline()
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                raise FeedFull("too many feed clients")
+            client = FeedClient(
+                next(self._ids), user_id, feed_filter, self.max_queue
+            )
+            self._clients[client.id] = client
+            self._routes.setdefault(route, {})[client.id] = client
+        self._wake.set()
+        return client
+
+    def unsubscribe(self, client):
+        """Remove a client; unknown or evicted clients are ignored."""
+        route = (client.filter.departureAirport,
+                 client.filter.arrivalAirport)
+        with self._lock:
+            self._clients.pop(client.id, None)
+            bucket = self._routes.get(route)
+            if bucket is not None:
+                bucket.pop(client.id, None)
+                if not bucket:
+                    del self._routes[route]
+
+    def notify(self):
+        """Wake the dispatcher, e.g. after orders were committed."""
+        self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="order-feed", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval if self._clients else None)
+            self._wake.clear()
+            if not self._clients:
+                continue
+            try:
+                self.dispatch_new()
+            except Exception:
+                # Keep serving; the next poll retries from the last id.
+                logger.exception("order feed dispatch failed")
+
+    def _baseline(self):
+        with self._dispatch_lock, self._session() as db:
+            self._last_id = db.scalar(select(func.max(Order.id))) or 0
+            self._gaps.clear()
+
+    def _skip(self, first, last, now):
+        # Remember ids first..last - 1 as possibly committed later.
+        deadline = now + self.late_window
+        for order_id in range(max(first, last - self.max_gaps), last):
+            self._gaps[order_id] = deadline
+        while len(self._gaps) > self.max_gaps:
+            del self._gaps[next(iter(self._gaps))]
+
+    def dispatch_new(self):
+        """
+        Read orders committed since the last call and fan them out.
+
+        The first call only records the current maximum id: clients
+        receive orders created after they subscribed. Orders with an id
+        that was skipped over by an earlier call are delivered when they
+        show up within `late_window` seconds.
+
+        Returns:
+            int: Number of orders dispatched.
+        """
+        if self._last_id is None:
+            self._baseline()
+            return 0
+        columns = [getattr(Order, field) for field in FEED_FIELDS]
+        with self._dispatch_lock, self._session() as db:
+            now = time.monotonic()
+            count = 0
+            gaps = list(self._gaps)
+            for start in range(0, len(gaps), self.batch_size):
+                rows = db.execute(
+                    select(*columns)
+                    .where(Order.id.in_(gaps[start:start + self.batch_size]))
+                    .order_by(Order.id)
+                ).all()
+                for row in rows:
+                    del self._gaps[row.id]
+                    self.dispatch(dict(zip(FEED_FIELDS, row)))
+                count += len(rows)
+                self.late += len(rows)
+            for order_id, deadline in list(self._gaps.items()):
+                if deadline <= now:
+                    # Rolled back or never coming.
+                    del self._gaps[order_id]
+
+            while True:
+                rows = db.execute(
+                    select(*columns)
+                    .where(Order.id > self._last_id)
+                    .order_by(Order.id)
+                    .limit(self.batch_size)
+                ).all()
+                for row in rows:
+                    if row.id > self._last_id + 1:
+                        self._skip(self._last_id + 1, row.id, now)
+                    self._last_id = row.id
+                    self.dispatch(dict(zip(FEED_FIELDS, row)))
+                count += len(rows)
+                if len(rows) < self.batch_size:
+                    return count
+
+    def dispatch(self, order):
+        """
+        Deliver one order to the matching clients.
+
+        Args:
+            order (dict): Values of `FEED_FIELDS`.
+
+        Returns:
+            int: Number of clients the order was queued for.
+        """
+        departure = order["departureAirport"]
+        arrival = order["arrivalAirport"]
+        routes = {(departure, arrival), (departure, None),
+                  (None, arrival), (None, None)}
+        with self._lock:
+            candidates = [
+                client
+                for route in routes
+                for client in self._routes.get(route, {}).values()
+            ]
+        self.dispatched += 1
+
+        delivered = 0
+        for client in candidates:
+            try:
+                matched = client.filter.matches(order)
+            except Exception:
+                # A broken filter ends its own stream, not everyone's.
+                logger.exception("feed filter of client %s failed",
+                                 client.id)
+                client.close()
+                self.unsubscribe(client)
+                continue
+            if not matched:
+                continue
+            if client.offer(order):
+                delivered += 1
+            else:
+                self.evictions += 1
+                self.unsubscribe(client)
+        self.delivered += delivered
+        return delivered
+
+    def stats(self):
+        """Return client count and dispatch/delivery/eviction counters."""
+        return {
+            "clients": len(self._clients),
+            "routes": len(self._routes),
+            "pending_gaps": len(self._gaps),
+            "dispatched": self.dispatched,
+            "late": self.late,
+            "delivered": self.delivered,
+            "evictions": self.evictions,
+        }
+
+
+feed_hub = FeedHub(
+    max_clients=int(os.getenv("FEED_MAX_CLIENTS", 1000)),
+    max_queue=int(os.getenv("FEED_MAX_QUEUE", 100)),
+    poll_interval=float(os.getenv("FEED_POLL_INTERVAL", 2)),
+    late_window=float(os.getenv("FEED_LATE_WINDOW", 60)),
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_inserts(session, flush_context):
+    if any(isinstance(instance, Order) for instance in session.new):
+        session.info["feed_new_orders"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_feed(session):
+    # Orders committed by this process are delivered without waiting for
+    # the next poll.
+    if session.info.pop("feed_new_orders", False):
+        feed_hub.notify()
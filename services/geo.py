@@ -0,0 +1,314 @@
+"""Geospatial proximity search for orders.
+
+Orders only store airport codes, so an empty leg departing 80 km from a
+shipper's airport would never match on equality. This module finds the
+airports within a radius with a spatial index and ranks the orders
+departing there by distance and by time offset.
+
+Main features:
+- Airport coordinates from the bundled `data/airports.json`
+  (`lat`/`lon` per IATA code).
+- `KDTree`: a static KD-tree over 3-D unit vectors. On the unit sphere
+  the straight-line (chord) distance grows monotonically with the
+  great-circle distance, so a radius query in km becomes a Euclidean
+  ball query without special cases at the poles or the antimeridian.
+- `nearby_orders`: orders departing within `radius_km` of a point in a
+  date window, read from the database in batches; distances, time
+  offsets and scores of each batch are computed with NumPy and only the
+  best `limit` rows are kept.
+- Score: `distance_km + km_per_hour * |offset_hours|`, i.e. one hour
+  away from the requested time weighs as much as `km_per_hour` km.
+"""
+
+import math
+import threading
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from model.dbModels import Order
+from services.autocomplete import AIRPORTS_PATH, load_airports
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_KM_PER_HOUR = 10.0
+DEFAULT_WINDOW = timedelta(hours=72)
+
+NEARBY_FIELDS = (
+    "orderNumber", "departureAirport", "departureCity", "arrivalAirport",
+    "arrivalCity", "departureDate", "aircraftType", "departureCargoType",
+    "departureCargoWeight", "departureCargoVolume",
+)
+
+
+def unit_vectors(lat, lon):
+    """
+    Convert latitudes and longitudes in degrees to unit vectors.
+
+    Args:
+        lat (array_like): Latitudes.
+        lon (array_like): Longitudes.
+
+    Returns:
+        numpy.ndarray: Array of shape `(n, 3)`.
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack(
+        (cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat))
+    )
+
+
+def chord_to_km(chord):
+    """Great-circle distance in km for unit-sphere chord lengths."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def km_to_chord(distance_km):
+    """Unit-sphere chord length for a great-circle distance in km."""
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+class KDTree:
+    """Static KD-tree for radius queries over 3-D points."""
+
+    def __init__(self, points, leaf_size=16):
+        """
+        Args:
+            points (array_like): Array of shape `(n, 3)`.
+            leaf_size (int): Maximum number of points in a leaf.
+        """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.points))
+        # Per node: slice of `order`, children (-1 for leaves), bounds.
+        self._ranges = []
+        self._children = []
+        self._lower = []
+        self._upper = []
+        if len(self.points):
+            self._build(0, len(self.points))
+        self._lower = np.array(self._lower)
+        self._upper = np.array(self._upper)
+
+    def _build(self, start, stop):
+        node = len(self._ranges)
+        block = self.points[self.order[start:stop]]
+        lower, upper = block.min(axis=0), block.max(axis=0)
+        self._ranges.append((start, stop))
+        self._children.append((-1, -1))
+        self._lower.append(lower)
+        self._upper.append(upper)
+        if stop - start <= self.leaf_size:
+            return node
+
+        axis = int(np.argmax(upper - lower))
+        middle = (stop - start) // 2
+        split = np.argpartition(block[:, axis], middle)
+        self.order[start:stop] = self.order[start:stop][split]
+        left = self._build(start, start + middle)
+        right = self._build(start + middle, stop)
+        self._children[node] = (left, right)
+        return node
+
+    def __len__(self):
+        return len(self.points)
+
+    def query_radius(self, point, radius):
+        """
+        Find the points within a Euclidean radius.
+
+        Args:
+            point (array_like): Query point of shape `(3,)`.
+            radius (float): Search radius.
+
+        Returns:
+            tuple:
+                - numpy.ndarray: Indices into `points`.
+                - numpy.ndarray: Their distances to `point`.
+        """
+        point = np.asarray(point, dtype=float)
+        found, distances = [], []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            # Distance from the point to the node's bounding box.
+            gap = np.maximum(
+                0.0,
+                np.maximum(self._lower[node] - point,
+                           point - self._upper[node]),
+            )
+            if gap @ gap > radius * radius:
+                continue
+            left, right = self._children[node]
+            if left >= 0:
+                stack.extend((left, right))
+                continue
+            start, stop = self._ranges[node]
+            indices = self.order[start:stop]
+            distance = np.linalg.norm(self.points[indices] - point, axis=1)
+            inside = distance <= radius
+            found.append(indices[inside])
+            distances.append(distance[inside])
+        if not found:
+            return np.empty(0, dtype=int), np.empty(0)
+        return np.concatenate(found), np.concatenate(distances)
+
+
+class AirportLocator:
+    """Spatial index of the bundled airport coordinates."""
+
+    def __init__(self, dataset_path=AIRPORTS_PATH):
+        """
+        Args:
+            dataset_path (str): JSON file with `iata`, `lat` and `lon`
+                per airport.
+        """
+        self.dataset_path = dataset_path
+        self._lock = threading.Lock()
+        self._codes = None
+        self._positions = {}
+        self._tree = None
+        self.queries = 0
+
+    @property
+    def loaded(self):
+        """Whether the index has been built."""
+        return self._tree is not None
+
+    def load(self):
+        """Read the dataset and build the KD-tree."""
+        airports = [
+            airport for airport in load_airports(self.dataset_path)
+            if "lat" in airport and "lon" in airport
+        ]
+        codes = np.array([airport["iata"] for airport in airports])
+        lat = [airport["lat"] for airport in airports]
+        lon = [airport["lon"] for airport in airports]
+        tree = KDTree(unit_vectors(lat, lon))
+        with self._lock:
+            self._codes = codes
+            self._positions = {
+                code: (la, lo) for code, la, lo in zip(codes, lat, lon)
+            }
+            self._tree = tree
+
+    def _ensure_loaded(self):
+        if self._tree is None:
+            self.load()
+
+    def position(self, code):
+        """
+        Return `(lat, lon)` of an airport, or None if unknown.
+
+        Args:
+            code (str): IATA code.
+        """
+        self._ensure_loaded()
+        return self._positions.get(code.strip().upper())
+
+    def within(self, lat, lon, radius_km):
+        """
+        Find the airports within a distance of a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            radius_km (float): Great-circle radius.
+
+        Returns:
+            tuple:
+                - numpy.ndarray: IATA codes, sorted.
+                - numpy.ndarray: Distances in km, in the same order.
+        """
+        self._ensure_loaded()
+        self.queries += 1
+        indices, chords = self._tree.query_radius(
+            unit_vectors([lat], [lon])[0], km_to_chord(radius_km)
+        )
+        codes = self._codes[indices]
+        order = np.argsort(codes)
+        return codes[order], chord_to_km(chords[order])
+
+    def stats(self):
+        """Return the number of indexed airports and queries."""
+        return {
+            "airports": len(self._positions),
+            "queries": self.queries,
+        }
+
+
+airport_locator = AirportLocator()
+
+
+def nearby_orders(db, lat, lon, radius_km, when, window=DEFAULT_WINDOW,
+                  limit=20, km_per_hour=DEFAULT_KM_PER_HOUR,
+                  locator=airport_locator, batch_size=1000):
+    """
+    Rank orders departing near a point around a given time.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        lat (float): Latitude of the point, in degrees.
+        lon (float): Longitude of the point, in degrees.
+        radius_km (float): Maximum distance of the departure airport.
+        when (datetime): Requested departure time.
+        window (timedelta): Orders departing more than this before or
+            after `when` are ignored.
+        limit (int): Number of results.
+        km_per_hour (float): Weight of the time offset in the score.
+        locator (AirportLocator): Airport index.
+        batch_size (int): Rows scored at a time.
+
+    Returns:
+        list[dict]: `NEARBY_FIELDS` plus `distanceKm`, `offsetHours` and
+                    `score`, best (lowest) score first.
+    """
+    codes, distances = locator.within(lat, lon, radius_km)
+    if not len(codes):
+        return []
+
+    statement = (
+        select(*(getattr(Order, field) for field in NEARBY_FIELDS))
+        .where(
+            Order.departureAirport.in_(codes.tolist()),
+            Order.departureDate.between(when - window, when + window),
+        )
+        .execution_options(yield_per=batch_size)
+    )
+    target = np.datetime64(when, "s")
+    airport_at = NEARBY_FIELDS.index("departureAirport")
+    date_at = NEARBY_FIELDS.index("departureDate")
+
+    best_rows, best_scores, best_extra = [], np.empty(0), np.empty((0, 2))
+    for batch in db.execute(statement).partitions():
+        departure = np.array([row[airport_at] for row in batch])
+        dates = np.array([row[date_at] for row in batch],
+                         dtype="datetime64[s]")
+        distance = distances[np.searchsorted(codes, departure)]
+        offset = (dates - target) / np.timedelta64(1, "h")
+        score = distance + km_per_hour * np.abs(offset)
+
+        rows = best_rows + list(batch)
+        scores = np.concatenate((best_scores, score))
+        extra = np.concatenate(
+            (best_extra, np.column_stack((distance, offset)))
+        )
+        if len(rows) > limit:
+            keep = np.argpartition(scores, limit)[:limit]
+            rows = [rows[index] for index in keep]
+            scores, extra = scores[keep], extra[keep]
+        best_rows, best_scores, best_extra = rows, scores, extra
+
+    ranking = np.argsort(best_scores, kind="stable")
+    return [
+        {
+            **dict(zip(NEARBY_FIELDS, best_rows[index])),
+            "distanceKm": round(float(best_extra[index, 0]), 1),
+            "offsetHours": round(float(best_extra[index, 1]), 2),
+            "score": round(float(best_scores[index]), 2),
+        }
+        for index in ranking
+    ]
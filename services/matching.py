@@ -0,0 +1,604 @@
+"""Empty-leg matching engine.
+
+An order that is not a round trip leaves its aircraft flying back empty
+from `arrivalAirport` to `departureAirport`. Another open order on that
+reverse route, departing shortly after the first one arrives and whose
+cargo fits into the aircraft, can fill that empty leg.
+
+This module keeps open orders indexed so that candidates for a single
+order are found without scanning all orders.
+
+Main features:
+- Index by airport pair, with two sorted lists per pair (by departure
+  and by arrival time) searched with `bisect`.
+- Cargo capacity and cargo type compatibility filters.
+- Ranked candidate pairs for one order, in time proportional to the
+  orders on the reverse route inside the time window.
+- Incremental `add` / `remove` / `update` as orders change.
+- Batch `rematch_all` mode that sweeps every route pair once with two
+  pointers, i.e. O(n log n + matches) instead of O(n²).
+- `order_matches` answers `GET /api/orders/<number>/matches` from the
+  shared `matcher`.
+
+Keeping `matcher` current:
+- `controller.app.warm_up` loads all open orders.
+- Orders inserted, updated or deleted through the ORM are applied after
+  their transaction commits (mapper/session events below); changes of a
+  rolled back transaction are dropped.
+- `database.order_ingest` adds the rows it inserts after each commit.
+- Writes of other processes (other workers, CLI ingestion) are picked
+  up by a full reload in a background thread at most every
+  `reload_interval` seconds; lookups keep using the current index
+  while it is rebuilt.
+
+Environment variables:
+- `MATCHING_RELOAD_INTERVAL`: seconds between full reloads (default
+  300).
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import NamedTuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from model.dbModels import CargoTypeEnum, Order
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = timedelta(hours=72)
+
+# Cargo types an aircraft configured for the key type can also carry.
+COMPATIBLE_CARGO = {
+    CargoTypeEnum.general: frozenset({CargoTypeEnum.general}),
+    CargoTypeEnum.special: frozenset({
+        CargoTypeEnum.general, CargoTypeEnum.special,
+    }),
+    CargoTypeEnum.dangerous: frozenset({
+        CargoTypeEnum.general, CargoTypeEnum.dangerous,
+    }),
+    CargoTypeEnum.temperature_sensitive: frozenset({
+        CargoTypeEnum.general, CargoTypeEnum.temperature_sensitive,
+        CargoTypeEnum.perishable,
+    }),
+    CargoTypeEnum.perishable: frozenset({
+        CargoTypeEnum.general, CargoTypeEnum.perishable,
+    }),
+    CargoTypeEnum.live_animals: frozenset({
+        CargoTypeEnum.general, CargoTypeEnum.live_animals,
+    }),
+}
+
+_MAX_ID = float("inf")
+
+
+class Leg(NamedTuple):
+    """Columns of an `Order` that the matching engine needs."""
+    id: int
+    userId: int
+    departureAirport: str
+    arrivalAirport: str
+    departureDate: object
+    arrivalDate: object
+    cargoType: CargoTypeEnum
+    cargoWeight: float
+    cargoVolume: float
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a `Leg` from a mapping keyed by `orders` column names."""
+        return cls(*(row[column.key] for column in LEG_COLUMNS))
+
+    @classmethod
+    def from_order(cls, order):
+        """Build a `Leg` from an `Order` instance or a row with its columns."""
+        return cls(
+            order.id,
+            order.userId,
+            order.departureAirport,
+            order.arrivalAirport,
+            order.departureDate,
+            order.arrivalDate,
+            order.departureCargoType,
+            order.departureCargoWeight,
+            order.departureCargoVolume,
+        )
+
+
+class Match(NamedTuple):
+    """A ranked candidate pair.
+
+    `emptyLegId` is the order whose aircraft flies back empty,
+    `fillerId` is the order that can use that return flight.
+    """
+    score: float
+    emptyLegId: int
+    fillerId: int
+    gap: timedelta
+
+
+LEG_COLUMNS = (
+    Order.id,
+    Order.userId,
+    Order.departureAirport,
+    Order.arrivalAirport,
+    Order.departureDate,
+    Order.arrivalDate,
+    Order.departureCargoType,
+    Order.departureCargoWeight,
+    Order.departureCargoVolume,
+)
+
+
+def is_open(order):
+    """Return True if the order still has an unmatched empty return leg."""
+    return not order.roundTrip and not order.isEmptyLegMatch
+
+
+def fits(empty_leg: Leg, filler: Leg):
+    """
+    Check whether `filler` can fly on the empty return of `empty_leg`.
+
+    Args:
+        empty_leg (Leg): Order whose aircraft returns empty.
+        filler (Leg): Order that wants to use the return flight.
+
+    Returns:
+        bool: True if cargo type, weight and volume are compatible.
+    """
+    return (
+        empty_leg.userId != filler.userId
+        and filler.cargoType in COMPATIBLE_CARGO[empty_leg.cargoType]
+        and filler.cargoWeight <= empty_leg.cargoWeight
+        and filler.cargoVolume <= empty_leg.cargoVolume
+    )
+
+
+def score(empty_leg: Leg, filler: Leg, window: timedelta):
+    """
+    Rank a candidate pair: higher is better.
+
+    Short waiting time between arrival and the return departure and a
+    high utilisation of the aircraft capacity both increase the score.
+    """
+    gap = filler.departureDate - empty_leg.arrivalDate
+    utilisation = (
+        _ratio(filler.cargoWeight, empty_leg.cargoWeight)
+        + _ratio(filler.cargoVolume, empty_leg.cargoVolume)
+    ) / 2
+    return utilisation + 1 - gap / window, gap
+
+
+def _ratio(part, whole):
+    return part / whole if whole else 1.0
+
+
+class _RouteIndex:
+    """Sorted `(datetime, id)` lists for one directed airport pair."""
+    __slots__ = ("by_departure", "by_arrival")
+
+    def __init__(self):
+        self.by_departure = []
+        self.by_arrival = []
+
+    def insert(self, leg: Leg):
+        bisect.insort(self.by_departure, (leg.departureDate, leg.id))
+        bisect.insort(self.by_arrival, (leg.arrivalDate, leg.id))
+
+    def discard(self, leg: Leg):
+        _discard(self.by_departure, (leg.departureDate, leg.id))
+        _discard(self.by_arrival, (leg.arrivalDate, leg.id))
+
+    def __bool__(self):
+        return bool(self.by_departure)
+
+
+def _discard(items, key):
+    position = bisect.bisect_left(items, key)
+    if position < len(items) and items[position] == key:
+        del items[position]
+
+
+def _between(items, low, high):
+    """Yield ids of `(datetime, id)` entries with low <= datetime <= high."""
+    start = bisect.bisect_left(items, (low,))
+    stop = bisect.bisect_right(items, (high, _MAX_ID))
+    for position in range(start, stop):
+        yield items[position][1]
+
+
+class MatchingEngine:
+    """In-memory index of open orders answering empty-leg match queries."""
+
+    def __init__(self, window: timedelta = DEFAULT_WINDOW,
+                 reload_interval=300.0, session_factory=None):
+        """
+        Args:
+            window (timedelta): Maximum waiting time between the arrival of
+                an order and the departure of the order filling its
+                return leg.
+            reload_interval (float): Seconds between two full reloads
+                from the database.
+            session_factory (callable | None): Returns a new SQLAlchemy
+                session for background reloads (default:
+                `database.db_funcs.get_session`).
+        """
+        self.window = window
+        self.reload_interval = reload_interval
+        self.session_factory = session_factory
+        self._legs = {}
+        self._routes = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reloading = False
+        self._next_reload = 0.0
+        self.reloads = 0
+
+    @property
+    def loaded(self):
+        """True once `load` has filled the index."""
+        return self._loaded
+
+    def load(self, legs):
+        """
+        Replace the whole index.
+
+        The new index is built aside and swapped in, so concurrent
+        lookups see either the old or the new one.
+
+        Args:
+            legs (Iterable[Leg]): Open orders.
+        """
+        fresh = MatchingEngine(self.window)
+        for leg in legs:
+            fresh.add(leg)
+        with self._lock:
+            self._legs, self._routes = fresh._legs, fresh._routes
+            self._loaded = True
+            self._next_reload = time.monotonic() + self.reload_interval
+            self.reloads += 1
+
+    def reload_due(self):
+        """Return True if a full reload should be started."""
+        return time.monotonic() >= self._next_reload
+
+    def reload_in_background(self):
+        """Start a full reload in a thread unless one is running."""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(
+            target=self._background_reload, name="matching-reload",
+            daemon=True,
+        ).start()
+
+    def _background_reload(self):
+        if self.session_factory is None:
+            from database.db_funcs import get_session
+            self.session_factory = get_session
+        try:
+            with self.session_factory() as db:
+                load_open_orders(self, db)
+        except Exception:
+            # Lookups keep using the current index.
+            self._next_reload = time.monotonic() + self.reload_interval
+            logger.exception("matching engine reload failed")
+        finally:
+            self._reloading = False
+
+    def stats(self):
+        """Return index size and reload counters."""
+        return {
+            "orders": len(self._legs),
+            "routes": len(self._routes),
+            "loaded": self._loaded,
+            "reloads": self.reloads,
+        }
+
+    def __len__(self):
+        return len(self._legs)
+
+    def __contains__(self, order_id):
+        return order_id in self._legs
+
+    def add(self, order):
+        """
+        Index an order (or replace its previous version).
+
+        Orders that are round trips or already matched are removed from
+        the index instead, so this can be called on every order change.
+        """
+        if isinstance(order, Leg):
+            leg = order
+        elif is_open(order):
+            leg = Leg.from_order(order)
+        else:
+            self.remove(order.id)
+            return
+        with self._lock:
+            self._remove_locked(leg.id)
+            self._legs[leg.id] = leg
+            route = (leg.departureAirport, leg.arrivalAirport)
+            self._routes.setdefault(route, _RouteIndex()).insert(leg)
+
+    update = add
+
+    def remove(self, order_id):
+        """Drop an order from the index. Unknown ids are ignored."""
+        with self._lock:
+            self._remove_locked(order_id)
+
+    def _remove_locked(self, order_id):
+        leg = self._legs.pop(order_id, None)
+        if leg is None:
+            return
+        route = (leg.departureAirport, leg.arrivalAirport)
+        index = self._routes[route]
+        index.discard(leg)
+        if not index:
+            del self._routes[route]
+
+    def candidates(self, order, limit=10):
+        """
+        Return the best matches for one order, in both directions.
+
+        The order is matched as an empty leg (others fill its return) and
+        as a filler (it flies on the empty return of others).
+
+        Args:
+            order: `Order`, `Leg` or row with the `LEG_COLUMNS` attributes.
+            limit (int): Maximum number of matches to return.
+
+        Returns:
+            list[Match]: Matches sorted by descending score.
+        """
+        leg = order if isinstance(order, Leg) else Leg.from_order(order)
+        window = self.window
+        found = []
+        with self._lock:
+            reverse = self._routes.get((leg.arrivalAirport, leg.departureAirport))
+            if reverse is None:
+                return []
+            legs = self._legs
+
+            # Others departing after we arrive can fill our empty return.
+            for other_id in _between(
+                reverse.by_departure,
+                leg.arrivalDate,
+                leg.arrivalDate + window,
+            ):
+                other = legs[other_id]
+                if other_id != leg.id and fits(leg, other):
+                    value, gap = score(leg, other, window)
+                    found.append(Match(value, leg.id, other_id, gap))
+
+            # We can fill the empty return of others arriving before we leave.
+            for other_id in _between(
+                reverse.by_arrival,
+                leg.departureDate - window,
+                leg.departureDate,
+            ):
+                other = legs[other_id]
+                if other_id != leg.id and fits(other, leg):
+                    value, gap = score(other, leg, window)
+                    found.append(Match(value, other_id, leg.id, gap))
+
+        return heapq.nlargest(limit, found)
+
+    def rematch_all(self, per_order_limit=None):
+        """
+        Recompute matches for every indexed order.
+
+        Every route pair is swept once: empty legs sorted by arrival and
+        fillers sorted by departure are walked with two pointers, so the
+        cost is bounded by the number of pairs inside the time window
+        instead of the square of the number of orders.
+
+        Args:
+            per_order_limit (int | None): Keep only the best N matches per
+                empty leg. `None` yields all matches.
+
+        Yields:
+            Match: Matches grouped by empty leg, best first within a group.
+        """
+        with self._lock:
+            legs = dict(self._legs)
+            routes = {
+                route: list(index.by_departure)
+                for route, index in self._routes.items()
+            }
+            arrivals = {
+                route: list(index.by_arrival)
+                for route, index in self._routes.items()
+            }
+        for route, by_arrival in arrivals.items():
+            fillers = routes.get((route[1], route[0]))
+            if fillers:
+                yield from sweep_route(
+                    [legs[order_id] for _, order_id in by_arrival],
+                    [legs[order_id] for _, order_id in fillers],
+                    self.window,
+                    per_order_limit,
+                )
+
+
+def sweep_route(empty_legs, fillers, window=DEFAULT_WINDOW, limit=None):
+    """
+    Match empty legs of one route against fillers of the reverse route.
+
+    Args:
+        empty_legs (list[Leg]): Legs sorted by `arrivalDate`.
+        fillers (list[Leg]): Legs on the reverse route sorted by
+            `departureDate`.
+        window (timedelta): Maximum waiting time.
+        limit (int | None): Best N matches to keep per empty leg.
+
+    Yields:
+        Match: Matches for each empty leg, best first.
+    """
+    start = 0
+    count = len(fillers)
+    for empty_leg in empty_legs:
+        earliest = empty_leg.arrivalDate
+        latest = earliest + window
+        while start < count and fillers[start].departureDate < earliest:
+            start += 1
+        found = []
+        position = start
+        while position < count and fillers[position].departureDate <= latest:
+            filler = fillers[position]
+            if fits(empty_leg, filler):
+                value, gap = score(empty_leg, filler, window)
+                found.append(Match(value, empty_leg.id, filler.id, gap))
+            position += 1
+        if limit is not None:
+            found = heapq.nlargest(limit, found)
+        else:
+            found.sort(reverse=True)
+        yield from found
+
+
+def load_open_orders(engine: MatchingEngine, db, chunk_size=10000):
+    """
+    Replace the contents of a matching engine with all open orders from
+    the database.
+
+    Only the columns in `LEG_COLUMNS` are fetched, streamed in chunks.
+
+    Args:
+        engine (MatchingEngine): Engine to (re)load.
+        db (Session): SQLAlchemy session instance.
+        chunk_size (int): Rows fetched per round trip.
+
+    Returns:
+        int: Number of indexed orders.
+    """
+    query = (
+        db.query(*LEG_COLUMNS)
+        .filter(Order.roundTrip.is_(False), Order.isEmptyLegMatch.is_(False))
+        .execution_options(yield_per=chunk_size)
+    )
+    engine.load(Leg(*row) for row in query)
+    return len(engine)
+
+
+matcher = MatchingEngine(
+    reload_interval=float(os.getenv("MATCHING_RELOAD_INTERVAL", 300)),
+)
+
+MATCH_FIELDS = (
+    "orderNumber", "departureAirport", "arrivalAirport", "departureDate",
+    "arrivalDate", "departureCargoType", "departureCargoWeight",
+    "departureCargoVolume",
+)
+
+
+def order_matches(db, order_number, user_id, limit=10, engine=matcher):
+    """
+    Find empty-leg matches for one order of a user.
+
+    The engine is loaded on first use and reloaded in the background when
+    its reload interval has passed. Candidates are checked against the
+    database, so orders closed by another process since the last reload
+    are not returned.
+
+    Args:
+        db (Session): SQLAlchemy session instance.
+        order_number (int): Order to match.
+        user_id (int): Owner of the order.
+        limit (int): Maximum number of matches.
+        engine (MatchingEngine): Index to query.
+
+    Returns:
+        list[dict] | None: `MATCH_FIELDS` of the other order plus `role`
+                           (`filler` if it can fly on this order's empty
+                           return, `emptyLeg` if this order can fly on
+                           its return), `score` and `gapHours`, best
+                           first; None if the user has no such order.
+    """
+    order = db.execute(
+        select(*LEG_COLUMNS, Order.roundTrip, Order.isEmptyLegMatch)
+        .where(Order.orderNumber == order_number, Order.userId == user_id)
+    ).first()
+    if order is None:
+        return None
+    if not engine.loaded:
+        load_open_orders(engine, db)
+    elif engine.reload_due():
+        engine.reload_in_background()
+    if not is_open(order):
+        return []
+
+    matches = engine.candidates(Leg.from_order(order), limit=limit)
+    others = {
+        match: match.fillerId if match.emptyLegId == order.id
+        else match.emptyLegId
+        for match in matches
+    }
+    if not others:
+        return []
+    rows = {
+        row[0]: row[1:] for row in db.execute(
+            select(
+                Order.id, *(getattr(Order, field) for field in MATCH_FIELDS)
+            )
+            .where(
+                Order.id.in_(others.values()),
+                Order.roundTrip.is_(False),
+                Order.isEmptyLegMatch.is_(False),
+            )
+        )
+    }
+    return [
+        {
+            **dict(zip(MATCH_FIELDS, rows[other_id])),
+            "role": "filler" if match.emptyLegId == order.id else "emptyLeg",
+            "score": round(match.score, 3),
+            "gapHours": round(match.gap.total_seconds() / 3600, 2),
+        }
+        for match, other_id in others.items()
+        if other_id in rows
+    ]
+
+
+def _pending(target):
+    session = object_session(target)
+    return session.info.setdefault("matching_changes", [])
+
+
+@event.listens_for(Order, "after_insert")
+@event.listens_for(Order, "after_update")
+def _order_written(mapper, connection, target):
+    _pending(target).append(
+        Leg.from_order(target) if is_open(target) else target.id
+    )
+
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target):
+    _pending(target).append(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    # Only committed changes reach the index.
+    changes = session.info.pop("matching_changes", None)
+    if not changes or not matcher.loaded:
+        return
+    for change in changes:
+        if isinstance(change, Leg):
+            matcher.add(change)
+        else:
+            matcher.remove(change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("matching_changes", None)
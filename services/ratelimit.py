@@ -0,0 +1,242 @@
+"""Token-bucket rate limiting.
+
+Used to throttle login attempts per client IP and per email address
+before any database or bcrypt work is done.
+
+Main features:
+- `TokenBucketLimiter`: in-process buckets of `capacity` tokens that
+  refill at `rate` tokens per second; each attempt takes one token.
+- Lock striping: keys are spread over `stripes` independent tables,
+  each with its own lock, so concurrent requests rarely contend.
+- Compact, bounded state: a bucket is a `(tokens, timestamp)` pair in an
+  insertion-ordered table. A bucket that has been idle long enough to
+  be full again is indistinguishable from a missing one and is evicted
+  on the next access to its stripe; `max_keys` caps each stripe even
+  while an attack creates keys faster than they expire.
+- `RedisTokenBucketLimiter`: the same algorithm in a Lua script, shared
+  by all worker processes, when the `redis` package is installed. It
+  fails open: while Redis is unreachable, attempts are allowed (and
+  counted as `errors`), so an outage does not lock every user out;
+  password checks stay bounded by the hashing pool.
+
+Environment variables:
+- `RATE_LIMIT_REDIS_URL`: use Redis buckets instead of per-process ones.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # only per-process buckets are available
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """Per-process token buckets with lock striping."""
+
+    def __init__(self, capacity, rate, stripes=16, max_keys=50000,
+                 clock=time.monotonic):
+        """
+        Args:
+            capacity (float): Burst size: tokens in a full bucket.
+            rate (float): Tokens added per second.
+            stripes (int): Number of independently locked tables.
+            max_keys (int): Maximum number of buckets in all stripes.
+            clock (callable): Monotonic time source, in seconds.
+        """
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.max_keys_per_stripe = max(1, max_keys // stripes)
+        self.clock = clock
+        self._refill_seconds = self.capacity / self.rate
+        self._stripes = [
+            (threading.Lock(), OrderedDict()) for _ in range(stripes)
+        ]
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def _stripe(self, key):
+        return self._stripes[zlib.crc32(key.encode()) % len(self._stripes)]
+
+    def acquire(self, key, cost=1.0):
+        """
+        Take tokens from the bucket of a key.
+
+        Args:
+            key (str): Bucket key, e.g. an IP address.
+            cost (float): Tokens to take.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the number of
+                   seconds until enough tokens are available.
+        """
+        now = self.clock()
+        lock, buckets = self._stripe(key)
+        with lock:
+            entry = buckets.pop(key, None)
+            if entry is None:
+                tokens = self.capacity
+            else:
+                tokens, stamp = entry
+                tokens = min(self.capacity,
+                             tokens + (now - stamp) * self.rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            buckets[key] = (tokens, now)
+            self._evict(buckets, now)
+
+        if wait:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def _evict(self, buckets, now):
+        # Least recently touched buckets come first; stop at the first
+        # one that is not full yet.
+        while buckets:
+            key, (tokens, stamp) = next(iter(buckets.items()))
+            idle = now - stamp
+            if (len(buckets) <= self.max_keys_per_stripe
+                    and tokens + idle * self.rate < self.capacity):
+                break
+            del buckets[key]
+            self.evictions += 1
+
+    def reset(self, key):
+        """Forget the bucket of a key."""
+        lock, buckets = self._stripe(key)
+        with lock:
+            buckets.pop(key, None)
+
+    def stats(self):
+        """Return bucket count and allowed/rejected/eviction counters."""
+        return {
+            "keys": sum(len(buckets) for _, buckets in self._stripes),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+        }
+
+
+# KEYS[1]: bucket; ARGV: capacity, rate, cost. Uses the server clock so
+# workers on different hosts agree.
+_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity,
+        tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+end
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucketLimiter:
+    """Token buckets shared by all workers through Redis."""
+
+    def __init__(self, capacity, rate, url, prefix="ratelimit:"):
+        """
+        Args:
+            capacity (float): Burst size: tokens in a full bucket.
+            rate (float): Tokens added per second.
+            url (str): Redis URL.
+            prefix (str): Key prefix of the buckets.
+
+        Raises:
+            RuntimeError: If the `redis` package is not installed.
+        """
+        if redis is None:
+            raise RuntimeError("the redis package is required")
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._acquire = self._client.register_script(_ACQUIRE_SCRIPT)
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def acquire(self, key, cost=1.0):
+        """
+        Take tokens; see `TokenBucketLimiter.acquire`.
+
+        Returns 0 (allowed) when Redis cannot be reached.
+        """
+        try:
+            wait = float(self._acquire(
+                keys=[self.prefix + key],
+                args=[self.capacity, self.rate, cost],
+            ))
+        except redis.RedisError:
+            self.errors += 1
+            logger.exception("rate limiter %s unavailable", self.prefix)
+            return 0.0
+        if wait:
+            self.rejected += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def reset(self, key):
+        """Forget the bucket of a key."""
+        self._client.delete(self.prefix + key)
+
+    def stats(self):
+        """Return allowed/rejected/error counters of this process."""
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def make_limiter(capacity, per_minute, prefix):
+    """
+    Build a limiter allowing `per_minute` attempts after a burst.
+
+    Uses Redis when `RATE_LIMIT_REDIS_URL` is set, per-process buckets
+    otherwise.
+
+    Args:
+        capacity (float): Burst size.
+        per_minute (float): Sustained attempts per minute.
+        prefix (str): Name of the limiter, used as Redis key prefix.
+    """
+    url = os.getenv("RATE_LIMIT_REDIS_URL")
+    if url:
+        return RedisTokenBucketLimiter(
+            capacity, per_minute / 60, url, prefix=f"ratelimit:{prefix}:"
+        )
+    return TokenBucketLimiter(capacity, per_minute / 60)
+
+
+def retry_after(wait):
+    """Format a wait time for the `Retry-After` header."""
+    return str(max(1, math.ceil(wait)))
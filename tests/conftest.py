@@ -0,0 +1,92 @@
+"""Shared fixtures: one application on a seeded temporary SQLite file.
+
+The database engine is a process-wide singleton, so all test modules
+share one database; tests add the rows they need on top of the seed.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import bcrypt
+import pytest
+
+PASSWORD = "password1"
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    # The engine is created lazily, so the URL only has to be set before
+    # the first query.
+    os.environ["DATABASE_URL"] = (
+        f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    )
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # Every test logs in again; keep the login throttle out of the way.
+    os.environ.setdefault("LOGIN_IP_BURST", "10000")
+    os.environ.setdefault("LOGIN_EMAIL_BURST", "10000")
+
+    from controller.app import create_app
+    from database.db_funcs import get_session, init_db
+    from model.dbModels import User, UserTypeEnum
+
+    app = create_app({"TESTING": True, "WTF_CSRF_ENABLED": False})
+    init_db()
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4)).decode()
+    with get_session() as db:
+        owner = User(email="owner@example.com", fullName="Owner",
+                     company="A", userType=UserTypeEnum.carrier,
+                     userRep=50, password=password)
+        partner = User(email="partner@example.com", fullName="Partner",
+                       company="B", userType=UserTypeEnum.charterer,
+                       userRep=50, password=password)
+        db.add_all([owner, partner])
+        db.flush()
+        start = datetime(2025, 1, 1)
+        for number in range(1, 51):
+            date = start + timedelta(hours=number)
+            db.add(make_order(owner.id, partner.id, number, date))
+        db.commit()
+    return app
+
+
+def make_order(user_id, partner_id, number, departure,
+               departureAirport="FRA", arrivalAirport="LHR", hours=3,
+               **values):
+    """Build an open one-way `Order`; `values` override any column."""
+    from model.dbModels import (
+        CargoTypeEnum, CurrencyEnum, Order, PaymentStatusEnum,
+    )
+
+    columns = dict(
+        userId=user_id, partnerUser=partner_id, orderNumber=number,
+        orderDate=departure, aircraftType="B747",
+        flightNumber=f"XX{number}", departureDate=departure,
+        departureCity=departureAirport, departureAirport=departureAirport,
+        departureCargoType=CargoTypeEnum.general,
+        departureCargoWeight=10, departureCargoVolume=10,
+        arrivalDate=departure + timedelta(hours=hours),
+        arrivalCity=arrivalAirport, arrivalAirport=arrivalAirport,
+        arrivalCargoType=CargoTypeEnum.general,
+        arrivalCargoWeight=0, arrivalCargoVolume=0,
+        roundTrip=False, orderPrice=100 + number % 1000,
+        orderCurrency=CurrencyEnum.eur,
+        paymentStatus=PaymentStatusEnum.paid, orderStatus="open",
+        isEmptyLegMatch=False,
+    )
+    columns.update(values)
+    return Order(**columns)
+
+
+def login(app, email="owner@example.com"):
+    """Return a test client logged in as `email`."""
+    client = app.test_client()
+    response = client.post(
+        "/logIn", data={"email": email, "password": PASSWORD}
+    )
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return login(app)
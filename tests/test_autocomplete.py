@@ -0,0 +1,46 @@
+"""Autocomplete: copy-on-write index and incremental refresh."""
+
+from datetime import datetime
+
+from conftest import make_order
+from services.autocomplete import (
+    AIRPORT, CITY, AirportAutocomplete, PrefixIndex, Suggestion,
+)
+
+
+def test_add_swaps_in_a_new_array():
+    index = PrefixIndex([("Köln", Suggestion(CITY, "Cologne", "Köln"))])
+    snapshot = index._entries
+    index.add_many([
+        ("Kolkata", Suggestion(CITY, "Kolkata", "Kolkata")),
+        ("Köln", Suggestion(CITY, "Cologne", "Köln")),
+    ])
+    assert len(snapshot) == 1
+    assert len(index) == 2
+    assert [s.value for s in index.search("kol")] == ["Kolkata", "Cologne"]
+
+
+def test_refresh_adds_cities_and_airports_of_new_orders(app):
+    from database.db_funcs import get_session
+    from model.dbModels import User
+
+    autocomplete = AirportAutocomplete()
+    autocomplete.load(["en", "ru"])
+    with get_session() as db:
+        autocomplete.refresh(db)
+        assert autocomplete.suggest("qqa") == []
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        db.add(make_order(owner.id, partner.id, 9001, datetime(2026, 6, 1),
+                          "QQA", "QQB", departureCity="Qqaville"))
+        db.commit()
+
+        assert autocomplete.refresh(db) == 4
+        assert autocomplete.refresh(db) == 0
+
+    assert autocomplete.suggest("qqav", language="ru") == [
+        Suggestion(CITY, "Qqaville", "Qqaville")
+    ]
+    assert autocomplete.suggest("qqb", kind=AIRPORT) == [
+        Suggestion(AIRPORT, "QQB", "QQB")
+    ]
@@ -0,0 +1,93 @@
+"""Contract document upload: size limits and orphaned files."""
+
+import os
+from datetime import datetime
+
+import pytest
+
+PDF = b"%PDF-1.4 test document"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    from services.documents import document_store
+
+    monkeypatch.setattr(document_store, "root", str(tmp_path))
+    return document_store
+
+
+@pytest.fixture
+def contract_id(app):
+    from database.db_funcs import get_session
+    from model.dbModels import Contract, ContractStatusEnum, User
+
+    with get_session() as db:
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        contract = Contract(
+            chartererId=partner.id, carrierId=owner.id,
+            contractDate=datetime(2026, 1, 1),
+            effectiveFrom=datetime(2026, 1, 1),
+            contractStatus=ContractStatusEnum.signed,
+        )
+        db.add(contract)
+        db.commit()
+        return contract.id
+
+
+def upload(client, contract_id, body):
+    return client.put(f"/api/contracts/{contract_id}/document", data=body,
+                      content_type="application/pdf")
+
+
+def stored_files(store):
+    return [
+        name for _, _, names in os.walk(store.root) for name in names
+    ]
+
+
+def test_upload_and_download(client, store, contract_id):
+    response = upload(client, contract_id, PDF)
+    assert response.status_code == 200
+    assert response.get_json()["created"] is True
+    download = client.get(f"/api/contracts/{contract_id}/document")
+    assert download.status_code == 200
+    assert download.get_data() == PDF
+
+
+def test_declared_length_over_limit_is_rejected_unread(client, store,
+                                                       contract_id,
+                                                       monkeypatch):
+    monkeypatch.setattr(store, "max_bytes", 10)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the body must not be read")
+
+    monkeypatch.setattr(store, "save", fail)
+    response = upload(client, contract_id, PDF)
+    assert response.status_code == 413
+
+
+def test_new_file_is_deleted_when_the_contract_is_gone(client, store,
+                                                       contract_id,
+                                                       monkeypatch):
+    import controller.api
+
+    monkeypatch.setattr(controller.api, "set_contract_file",
+                        lambda *args: False)
+    response = upload(client, contract_id, PDF + b" orphan")
+    assert response.status_code == 404
+    assert stored_files(store) == []
+
+
+def test_shared_file_is_kept_when_the_contract_is_gone(client, store,
+                                                       contract_id,
+                                                       monkeypatch):
+    import controller.api
+
+    assert upload(client, contract_id, PDF).status_code == 200
+    monkeypatch.setattr(controller.api, "set_contract_file",
+                        lambda *args: False)
+    response = upload(client, contract_id, PDF)
+    assert response.status_code == 404
+    assert len(stored_files(store)) == 1
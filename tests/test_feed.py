@@ -0,0 +1,56 @@
+"""Live order feed: late commits and the single-threaded server guard."""
+
+from datetime import datetime
+
+from conftest import login, make_order
+from services.feed import FeedFilter, FeedHub
+
+
+def test_late_committed_lower_id_is_delivered_once(app):
+    from database.db_funcs import get_session
+    from model.dbModels import Order, User
+
+    hub = FeedHub(session_factory=get_session, poll_interval=3600)
+    client = hub.subscribe(1, FeedFilter(departureAirport="BCN"))
+    hub.dispatch_new()
+
+    with get_session() as db:
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        last = db.query(Order.id).order_by(Order.id.desc()).first()[0]
+        # The order with the higher id commits first.
+        db.add(make_order(owner.id, partner.id, 8002, datetime(2026, 5, 1),
+                          "BCN", "MAD", id=last + 2))
+        db.commit()
+        hub.dispatch_new()
+        db.add(make_order(owner.id, partner.id, 8001, datetime(2026, 5, 1),
+                          "BCN", "MAD", id=last + 1))
+        db.commit()
+    hub.dispatch_new()
+    hub.dispatch_new()
+
+    numbers = [order["orderNumber"] for order in client.wait(0)]
+    assert sorted(numbers) == [8001, 8002]
+    assert hub.stats()["late"] == 1
+    assert hub.stats()["pending_gaps"] == 0
+
+
+def test_expired_gaps_are_given_up(app):
+    from database.db_funcs import get_session
+
+    hub = FeedHub(session_factory=get_session, late_window=0)
+    hub._last_id = 10
+    hub._skip(11, 14, 0.0)
+    assert len(hub._gaps) == 3
+    hub._last_id = 10 ** 9
+    hub.dispatch_new()
+    assert hub.stats()["pending_gaps"] == 0
+
+
+def test_feed_disabled_returns_503(app):
+    app.config["FEED_ENABLED"] = False
+    try:
+        response = login(app).get("/api/feed/orders")
+    finally:
+        app.config["FEED_ENABLED"] = True
+    assert response.status_code == 503
@@ -0,0 +1,219 @@
+"""Empty-leg matching: index lookups, route sweeps and keeping it current."""
+
+from datetime import datetime, timedelta
+
+from conftest import login, make_order
+from model.dbModels import CargoTypeEnum
+from services.matching import (
+    Leg, MatchingEngine, fits, load_open_orders, matcher, sweep_route,
+)
+
+START = datetime(2026, 3, 1)
+WINDOW = timedelta(hours=72)
+
+
+def leg(order_id, user_id, route, departure, hours=3, weight=10, volume=10,
+        cargo=CargoTypeEnum.general):
+    departure = START + timedelta(hours=departure)
+    return Leg(order_id, user_id, route[:3], route[4:], departure,
+               departure + timedelta(hours=hours), cargo, weight, volume)
+
+
+def brute_force(legs, window):
+    # Every (empty leg, filler) pair, compared without the index.
+    return {
+        (empty.id, filler.id)
+        for empty in legs for filler in legs
+        if filler.departureAirport == empty.arrivalAirport
+        and filler.arrivalAirport == empty.departureAirport
+        and timedelta(0) <= filler.departureDate - empty.arrivalDate
+        <= window
+        and fits(empty, filler)
+    }
+
+
+def test_candidates_in_both_directions():
+    engine = MatchingEngine(WINDOW)
+    outbound = leg(1, 1, "FRA-LHR", 0)
+    engine.add(outbound)
+    engine.add(leg(2, 2, "LHR-FRA", 5))            # fills our return
+    engine.add(leg(3, 2, "LHR-FRA", -10))          # we fill its return
+    engine.add(leg(4, 2, "LHR-FRA", 100))          # outside the window
+    engine.add(leg(5, 1, "LHR-FRA", 6))            # same user
+    engine.add(leg(6, 2, "LHR-FRA", 7, weight=20))  # too heavy
+    engine.add(leg(7, 2, "LHR-CDG", 5))            # other route
+
+    matches = engine.candidates(outbound)
+
+    assert {(m.emptyLegId, m.fillerId) for m in matches} == {(1, 2), (3, 1)}
+    assert matches == sorted(matches, reverse=True)
+    assert {m.gap for m in matches} == {timedelta(hours=2),
+                                        timedelta(hours=7)}
+
+
+def test_candidates_respect_cargo_compatibility():
+    engine = MatchingEngine(WINDOW)
+    general = leg(1, 1, "FRA-LHR", 0)
+    engine.add(leg(2, 2, "LHR-FRA", 5, cargo=CargoTypeEnum.dangerous))
+    assert engine.candidates(general) == []
+
+    dangerous = leg(3, 1, "FRA-LHR", 0, cargo=CargoTypeEnum.dangerous)
+    assert [m.fillerId for m in engine.candidates(dangerous)] == [2]
+
+
+def test_add_update_remove():
+    engine = MatchingEngine(WINDOW)
+    outbound = leg(1, 1, "FRA-LHR", 0)
+    engine.add(leg(2, 2, "LHR-FRA", 5))
+    assert 2 in engine and len(engine) == 1
+
+    # Moving the order to another route takes it out of the old one.
+    engine.update(leg(2, 2, "LHR-CDG", 5))
+    assert len(engine) == 1
+    assert engine.candidates(outbound) == []
+
+    engine.update(leg(2, 2, "LHR-FRA", 6))
+    assert [m.fillerId for m in engine.candidates(outbound)] == [2]
+
+    engine.remove(2)
+    engine.remove(2)
+    assert 2 not in engine and len(engine) == 0
+    assert engine.candidates(outbound) == []
+    assert engine.stats()["routes"] == 0
+
+
+def test_load_replaces_index():
+    engine = MatchingEngine(WINDOW)
+    engine.add(leg(1, 1, "FRA-LHR", 0))
+    engine.load([leg(2, 2, "LHR-FRA", 5)])
+    assert engine.loaded
+    assert 1 not in engine and 2 in engine
+
+
+def test_rematch_all_matches_brute_force():
+    routes = ("FRA-LHR", "LHR-FRA", "FRA-CDG", "CDG-FRA")
+    legs = [
+        leg(number, number % 3, routes[number % 4], (number * 7) % 200,
+            hours=1 + number % 5, weight=5 + number % 11,
+            volume=5 + number % 7)
+        for number in range(1, 121)
+    ]
+    engine = MatchingEngine(WINDOW)
+    for item in legs:
+        engine.add(item)
+
+    found = [(m.emptyLegId, m.fillerId) for m in engine.rematch_all()]
+
+    assert len(found) == len(set(found))
+    assert set(found) == brute_force(legs, WINDOW)
+
+
+def test_sweep_route_limit_keeps_best_per_empty_leg():
+    empty = leg(1, 1, "FRA-LHR", 0)
+    fillers = [leg(number, 2, "LHR-FRA", number) for number in (4, 8, 20)]
+
+    matches = list(sweep_route([empty], fillers, WINDOW, 2))
+
+    assert [m.fillerId for m in matches] == [4, 8]
+
+
+def test_orm_changes_reach_the_matcher_after_commit(app):
+    from database.db_funcs import get_session
+    from model.dbModels import User
+
+    with get_session() as db:
+        load_open_orders(matcher, db)
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        order = make_order(partner.id, owner.id, 5001, START, "LHR", "FRA")
+        db.add(order)
+        db.flush()
+        assert order.id not in matcher
+        db.commit()
+        assert order.id in matcher
+
+        order.isEmptyLegMatch = True
+        db.commit()
+        assert order.id not in matcher
+
+        order.isEmptyLegMatch = False
+        db.flush()
+        db.rollback()
+        assert order.id not in matcher
+
+        rolled_back = make_order(partner.id, owner.id, 5002, START,
+                                 "LHR", "FRA")
+        db.add(rolled_back)
+        db.flush()
+        rolled_back_id = rolled_back.id
+        db.rollback()
+        assert rolled_back_id not in matcher
+
+
+def test_matches_api(app):
+    from database.db_funcs import get_session
+    from model.dbModels import User
+
+    with get_session() as db:
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        db.add_all([
+            make_order(owner.id, partner.id, 6001, START, "MUC", "VIE"),
+            make_order(partner.id, owner.id, 6002,
+                       START + timedelta(hours=5), "VIE", "MUC"),
+            make_order(owner.id, partner.id, 6003, START, "MUC", "ZRH",
+                       roundTrip=True),
+        ])
+        db.commit()
+
+    client = login(app)
+    response = client.get("/api/orders/6001/matches")
+    assert response.status_code == 200
+    (result,) = response.get_json()["results"]
+    assert result["orderNumber"] == 6002
+    assert result["role"] == "filler"
+    assert result["gapHours"] == 2
+
+    assert client.get("/api/orders/6003/matches").get_json() == {
+        "results": []
+    }
+    # Orders of other users are not disclosed.
+    assert client.get("/api/orders/6002/matches").status_code == 404
+    assert app.test_client().get(
+        "/api/orders/6001/matches"
+    ).status_code == 401
+
+
+def test_ingested_orders_reach_the_matcher(app, tmp_path):
+    from database.db_funcs import get_engine, get_session
+    from database.order_ingest import CONVERTERS, ingest_orders
+    from model.dbModels import Order, User
+
+    with get_session() as db:
+        load_open_orders(matcher, db)
+        owner = db.query(User).filter_by(email="owner@example.com").one()
+        partner = db.query(User).filter_by(email="partner@example.com").one()
+        rows = [
+            make_order(owner.id, partner.id, number, START, "OSL", "ARN",
+                       roundTrip=number == 7002)
+            for number in (7001, 7002)
+        ]
+    feed = tmp_path / "orders.csv"
+    feed.write_text("\n".join(
+        [",".join(CONVERTERS)] + [
+            ",".join(
+                "" if value is None else getattr(value, "name", str(value))
+                for value in (getattr(row, field) for field in CONVERTERS)
+            )
+            for row in rows
+        ]
+    ) + "\n")
+
+    assert ingest_orders(get_engine(), str(feed))["rows"] == 2
+
+    with get_session() as db:
+        ids = dict(db.query(Order.orderNumber, Order.id).filter(
+            Order.orderNumber.in_((7001, 7002))
+        ))
+    assert ids[7001] in matcher
+    assert ids[7002] not in matcher
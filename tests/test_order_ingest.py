@@ -0,0 +1,45 @@
+"""Order ingestion: record validation."""
+
+import json
+
+import pytest
+
+from database.order_ingest import coerce_order
+
+
+def record(**values):
+    base = {
+        "userId": "1", "orderNumber": "10", "orderDate": "2026-01-01T10:00",
+        "partnerUser": "2", "aircraftType": "B747", "flightNumber": "XX1",
+        "departureDate": "2026-01-02T10:00", "departureCity": "Frankfurt",
+        "departureAirport": "FRA", "departureCargoType": "general",
+        "departureCargoWeight": "10", "departureCargoVolume": "5",
+        "arrivalDate": "2026-01-02T12:00", "arrivalCity": "London",
+        "arrivalAirport": "LHR", "arrivalCargoType": "General",
+        "arrivalCargoWeight": "0", "arrivalCargoVolume": "0",
+        "roundTrip": "false", "orderPrice": "100.5", "orderCurrency": "EUR",
+        "paymentStatus": "paid", "contractOrder": "", "orderStatus": "open",
+        "isEmptyLegMatch": "0",
+    }
+    base.update(values)
+    return base
+
+
+def test_valid_record():
+    row = coerce_order(record(userId=" 7 "))
+    assert row["userId"] == 7 and row["orderNumber"] == 10
+    assert row["contractOrder"] is None
+
+
+def test_json_integers_are_accepted():
+    row = coerce_order(json.dumps(record(orderNumber=12, contractOrder=3)))
+    assert row["orderNumber"] == 12 and row["contractOrder"] == 3
+
+
+@pytest.mark.parametrize("field", ["userId", "orderNumber", "partnerUser",
+                                   "contractOrder"])
+@pytest.mark.parametrize("value", [12.9, 12.0, True, "12.9", "-3", "1e3",
+                                   "\u0663"])
+def test_non_integer_ids_are_rejected(field, value):
+    with pytest.raises(ValueError, match=field):
+        coerce_order(json.dumps(record(**{field: value})))
@@ -0,0 +1,80 @@
+"""N+1 guard: `max_queries` and the per-request `SQL_QUERY_LIMIT` check."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from monitoring.querycount import QueryLimitExceeded, max_queries
+
+
+def test_max_queries_raises_with_repeated_statement(app):
+    from database.db_funcs import get_session
+    from model.dbModels import Order
+
+    with get_session() as db:
+        with pytest.raises(QueryLimitExceeded, match="3 SQL statements"):
+            with max_queries(2):
+                for number in (1, 2, 3):
+                    db.execute(
+                        select(Order.id).where(Order.orderNumber == number)
+                    ).all()
+
+
+def test_request_over_endpoint_limit_fails(app, client):
+    app.config["SQL_QUERY_LIMITS"] = {"pages.orders_page": 0}
+    try:
+        with pytest.raises(QueryLimitExceeded):
+            client.get("/profile/orders")
+    finally:
+        app.config["SQL_QUERY_LIMITS"] = {}
+
+
+@pytest.mark.parametrize("rows", [5, 20])
+def test_orders_page_within_query_limit(app, client, rows):
+    # Partner and contract columns are loaded with the orders, so the
+    # statement count does not grow with the page size.
+    assert app.config["SQL_QUERY_LIMIT"] is not None
+    app.config["SQL_QUERY_LIMITS"] = {"pages.orders_page": 3}
+    try:
+        response = client.get(f"/profile/orders?rows={rows}")
+    finally:
+        app.config["SQL_QUERY_LIMITS"] = {}
+    assert response.status_code == 200
+    assert response.data.count(b"<tr onclick") == rows
+
+
+def test_order_detail_page_in_one_query(app, client):
+    app.config["SQL_QUERY_LIMITS"] = {"pages.order_detail_page": 1}
+    try:
+        response = client.get("/profile/orders/7")
+    finally:
+        app.config["SQL_QUERY_LIMITS"] = {}
+    assert response.status_code == 200
+    assert "Order № 7".encode() in response.data
+    assert b"Partner" in response.data
+
+
+def test_order_detail_page_shows_contract(app, client):
+    from database.db_funcs import get_session
+    from model.dbModels import Contract, ContractStatusEnum, Order
+
+    with get_session() as db:
+        order = db.query(Order).filter_by(orderNumber=8).one()
+        contract = Contract(
+            chartererId=order.partnerUser, carrierId=order.userId,
+            contractDate=datetime(2025, 1, 1),
+            effectiveFrom=datetime(2025, 1, 2),
+            contractStatus=ContractStatusEnum.signed,
+            contractFileUrl="sha256:" + "0" * 64, termsSummary="Net 30",
+        )
+        order.contract = contract
+        db.commit()
+
+    response = client.get("/profile/orders/8")
+    assert response.status_code == 200
+    assert b"Signed" in response.data and b"Net 30" in response.data
+
+
+def test_order_detail_page_hides_other_orders(app, client):
+    assert client.get("/profile/orders/999999").status_code == 404
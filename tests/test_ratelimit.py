@@ -0,0 +1,98 @@
+"""Per-process token buckets: burst, refill, eviction and threads."""
+
+import threading
+
+import pytest
+
+from services.ratelimit import TokenBucketLimiter, retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_burst_then_wait(clock):
+    limiter = TokenBucketLimiter(3, 0.5, clock=clock)
+    assert [limiter.acquire("ip") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("ip") == pytest.approx(2.0)
+    # Other keys have their own bucket.
+    assert limiter.acquire("other") == 0
+    assert limiter.stats()["allowed"] == 4
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_refill_is_capped_at_capacity(clock):
+    limiter = TokenBucketLimiter(2, 1, clock=clock)
+    limiter.acquire("ip")
+    limiter.acquire("ip")
+    clock.now += 1
+    assert limiter.acquire("ip") == 0
+    assert limiter.acquire("ip") > 0
+
+    clock.now += 3600
+    assert [limiter.acquire("ip") for _ in range(2)] == [0, 0]
+    assert limiter.acquire("ip") > 0
+
+
+def test_reset(clock):
+    limiter = TokenBucketLimiter(1, 0.01, clock=clock)
+    limiter.acquire("user@example.com")
+    assert limiter.acquire("user@example.com") > 0
+    limiter.reset("user@example.com")
+    assert limiter.acquire("user@example.com") == 0
+
+
+def test_full_buckets_are_evicted(clock):
+    limiter = TokenBucketLimiter(2, 1, stripes=1, clock=clock)
+    for index in range(10):
+        limiter.acquire(f"ip{index}")
+    assert limiter.stats()["keys"] == 10
+
+    # After 1 s every bucket is full again and the next access drops
+    # them; the new key's own bucket is not full and stays.
+    clock.now += 1
+    limiter.acquire("new")
+    assert limiter.stats()["keys"] == 1
+    assert limiter.stats()["evictions"] == 10
+
+
+def test_max_keys_bounds_each_stripe(clock):
+    limiter = TokenBucketLimiter(5, 0.001, stripes=2, max_keys=8,
+                                 clock=clock)
+    for index in range(100):
+        limiter.acquire(f"ip{index}")
+    assert limiter.stats()["keys"] <= 8
+    assert limiter.stats()["evictions"] >= 92
+
+
+def test_concurrent_acquires_never_exceed_capacity():
+    limiter = TokenBucketLimiter(100, 0.001, stripes=4)
+    results = []
+    lock = threading.Lock()
+
+    def attempt():
+        waits = [limiter.acquire(f"key{index % 3}") for index in range(90)]
+        with lock:
+            results.extend(waits)
+
+    threads = [threading.Thread(target=attempt) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 3 keys with 100 tokens each; the refill during the test is tiny.
+    assert sum(1 for wait in results if wait == 0) == 300
+
+
+def test_retry_after():
+    assert retry_after(0.2) == "1"
+    assert retry_after(2.01) == "3"
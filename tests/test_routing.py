@@ -0,0 +1,98 @@
+"""Replica routing: statement classification and per-session stickiness."""
+
+import pytest
+from sqlalchemy import (
+    Column, Integer, MetaData, String, Table, create_engine, insert, select,
+)
+
+from database.routing import (
+    REPLICA_READS, WROTE, ReplicaSet, RoutingSession, use_primary,
+)
+
+metadata = MetaData()
+origin = Table(
+    "origin", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(20)),
+)
+
+
+def make_database(path, name):
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(origin).values(name=name))
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = create_engine(make_database(tmp_path / "p.db", "primary"))
+    replicas = ReplicaSet(check_interval=60)
+    replicas.configure([
+        make_database(tmp_path / "r1.db", "replica1"),
+        make_database(tmp_path / "r2.db", "replica2"),
+    ])
+    yield primary, replicas
+    replicas.dispose()
+    primary.dispose()
+
+
+def open_session(databases, replica_reads=True):
+    primary, replicas = databases
+    session = RoutingSession(bind=primary,
+                             info={REPLICA_READS: replica_reads})
+    session.replicas = replicas
+    return session
+
+
+def read(session, **options):
+    query = select(origin.c.name).order_by(origin.c.id).limit(1)
+    if options.get("for_update"):
+        query = query.with_for_update()
+    return session.execute(query).scalar()
+
+
+def test_reads_stick_to_one_replica_per_session(databases):
+    with open_session(databases) as first, open_session(databases) as second:
+        assert {read(first) for _ in range(3)} == {"replica1"}
+        # Round robin: the next session gets the other replica.
+        assert {read(second) for _ in range(3)} == {"replica2"}
+
+
+def test_reads_after_a_write_go_to_the_primary(databases):
+    with open_session(databases) as session:
+        assert read(session) == "replica1"
+        session.execute(insert(origin).values(name="new"))
+        assert session.info[WROTE]
+        assert read(session) == "primary"
+        session.commit()
+
+
+def test_locking_reads_go_to_the_primary(databases):
+    with open_session(databases) as session:
+        assert read(session, for_update=True) == "primary"
+
+
+def test_sessions_without_replica_reads_use_the_primary(databases):
+    with open_session(databases, replica_reads=False) as session:
+        assert read(session) == "primary"
+    with open_session(databases) as session:
+        use_primary(session)
+        assert read(session) == "primary"
+
+
+def test_unhealthy_replicas_fall_back_to_the_primary(databases, tmp_path):
+    primary, replicas = databases
+    missing = f"sqlite:///{tmp_path / 'missing' / 'r.db'}"
+    replicas.configure([missing, replicas._replicas[1].url])
+    with open_session(databases) as session:
+        # The first replica fails its check; the second one answers.
+        assert read(session) == "replica2"
+    assert [state["healthy"] for state in replicas.stats()] == [False, True]
+
+    replicas.configure([missing])
+    with open_session(databases) as session:
+        assert read(session) == "primary"
@@ -0,0 +1,16 @@
+"""Order search API: filter validation."""
+
+import pytest
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-Infinity", "abc"])
+def test_non_finite_number_filters_are_rejected(client, value):
+    response = client.get(f"/api/orders/search?minWeight={value}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid value for minWeight"}
+
+
+def test_number_filter(client):
+    response = client.get("/api/orders/search?minWeight=5&maxPrice=1e3")
+    assert response.status_code == 200
+    assert response.get_json()["results"]
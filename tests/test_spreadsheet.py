@@ -0,0 +1,32 @@
+"""CSV formula neutralization and valid XLSX XML."""
+
+import io
+import zipfile
+from xml.dom import minidom
+
+from services.spreadsheet import csv_chunks, xlsx_chunks
+
+
+def test_csv_prefixes_formula_cells():
+    rows = [["=HYPERLINK(\"x\")", "+1", "-2", "@SUM(A1)", "\tx", "\rx"],
+            ["plain", -5, 1.5, None, "a-b", ""]]
+    data = b"".join(csv_chunks(["=title"], [rows])).decode("utf-8-sig")
+    lines = data.split("\r\n")
+    assert lines[0] == "'=title"
+    assert lines[1].split(",")[1:4] == ["'+1", "'-2", "'@SUM(A1)"]
+    assert lines[1].startswith("\"'=HYPERLINK(")
+    # Numbers keep their sign; text is only touched at the start.
+    assert lines[2] == "plain,-5,1.5,,a-b,"
+
+
+def test_xlsx_drops_xml_invalid_characters():
+    data = b"".join(xlsx_chunks(
+        ["name"], [[["a\x00b\x0bc\x1fd\ufffe", "tab\tand\nnewline"]]],
+        sheet_name="Orders\x01",
+    ))
+    workbook = zipfile.ZipFile(io.BytesIO(data))
+    sheet = minidom.parseString(workbook.read("xl/worksheets/sheet1.xml"))
+    texts = [node.firstChild.data
+             for node in sheet.getElementsByTagName("t")]
+    assert texts == ["name", "abcd", "tab\tand\nnewline"]
+    minidom.parseString(workbook.read("xl/workbook.xml"))
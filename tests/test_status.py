@@ -0,0 +1,24 @@
+"""Status endpoints: only `/ready` is public."""
+
+import pytest
+
+STATUS_PATHS = (
+    "/status/db-pool", "/status/replicas", "/status/feed", "/status/caches",
+)
+
+
+@pytest.mark.parametrize("path", STATUS_PATHS)
+def test_status_hidden_unless_metrics_enabled(app, path):
+    client = app.test_client()
+    app.config["METRICS_ENABLED"] = False
+    assert client.get(path).status_code == 404
+    app.config["METRICS_ENABLED"] = True
+    try:
+        assert client.get(path).status_code == 200
+    finally:
+        app.config["METRICS_ENABLED"] = False
+
+
+def test_ready_is_public(app):
+    app.config["METRICS_ENABLED"] = False
+    assert app.test_client().get("/ready").status_code in (200, 503)
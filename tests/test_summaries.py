@@ -0,0 +1,158 @@
+"""Order summaries: incremental maintenance through ORM events."""
+
+from datetime import datetime
+
+import pytest
+
+from conftest import make_order
+from database.summaries import (
+    MONTH, OWNER, PARTNER, STATUS, check_summaries, get_order_summary,
+)
+
+
+@pytest.fixture
+def users(app):
+    # A fresh pair per test, so its summaries start empty.
+    from database.db_funcs import get_session
+    from model.dbModels import User, UserTypeEnum
+
+    with get_session() as db:
+        count = db.query(User).count()
+        pair = [
+            User(email=f"summary{count + index}@example.com",
+                 fullName="Summary", company="S",
+                 userType=UserTypeEnum.carrier, userRep=50, password="x")
+            for index in (1, 2)
+        ]
+        db.add_all(pair)
+        db.commit()
+        return pair[0].id, pair[1].id
+
+
+def summary(db, user_id):
+    return get_order_summary(db, user_id)
+
+
+def test_insert(app, users):
+    from database.db_funcs import get_session
+    from model.dbModels import CurrencyEnum
+
+    owner, partner = users
+    with get_session() as db:
+        db.add(make_order(owner, partner, 20001, datetime(2026, 2, 3),
+                          orderPrice=150))
+        db.commit()
+
+        mine = summary(db, owner)
+        assert mine[OWNER][STATUS] == {"paid": {CurrencyEnum.eur: (1, 150)}}
+        assert mine[OWNER][MONTH] == {"2026-02": {CurrencyEnum.eur: (1, 150)}}
+        assert summary(db, partner)[PARTNER][STATUS] == {
+            "paid": {CurrencyEnum.eur: (1, 150)}
+        }
+
+
+def test_update_moves_bucket_currency_and_price(app, users):
+    from database.db_funcs import get_session
+    from model.dbModels import CurrencyEnum, PaymentStatusEnum
+
+    owner, partner = users
+    with get_session() as db:
+        order = make_order(owner, partner, 20002, datetime(2026, 2, 3),
+                           orderPrice=100)
+        db.add(order)
+        db.commit()
+
+        order.paymentStatus = PaymentStatusEnum.pending
+        order.orderDate = datetime(2026, 3, 1)
+        order.orderCurrency = CurrencyEnum.usd
+        order.orderPrice = 80
+        db.commit()
+
+        mine = summary(db, owner)
+        assert mine[OWNER][STATUS] == {"pending": {CurrencyEnum.usd: (1, 80)}}
+        assert mine[OWNER][MONTH] == {"2026-03": {CurrencyEnum.usd: (1, 80)}}
+
+
+def test_delete(app, users):
+    from database.db_funcs import get_session
+    from model.dbModels import CurrencyEnum
+
+    owner, partner = users
+    with get_session() as db:
+        orders = [
+            make_order(owner, partner, number, datetime(2026, 2, 3),
+                       orderPrice=10)
+            for number in (20003, 20004)
+        ]
+        db.add_all(orders)
+        db.commit()
+
+        db.delete(orders[0])
+        db.commit()
+        assert summary(db, owner)[OWNER][STATUS] == {
+            "paid": {CurrencyEnum.eur: (1, 10)}
+        }
+
+        db.delete(orders[1])
+        db.commit()
+        assert summary(db, owner)[OWNER][STATUS] == {}
+
+
+def test_rollback_leaves_no_trace(app, users):
+    from database.db_funcs import get_session
+    from model.dbModels import CurrencyEnum
+
+    owner, partner = users
+    with get_session() as db:
+        order = make_order(owner, partner, 20005, datetime(2026, 2, 3),
+                           orderPrice=10)
+        db.add(order)
+        db.commit()
+
+        order.orderPrice = 999
+        db.add(make_order(owner, partner, 20006, datetime(2026, 2, 3)))
+        db.flush()
+        db.rollback()
+
+        # The next transaction must not apply the discarded deltas.
+        order.orderStatus = "closed"
+        db.commit()
+        assert summary(db, owner)[OWNER][STATUS] == {
+            "paid": {CurrencyEnum.eur: (1, 10)}
+        }
+
+
+def test_mixed_workload_matches_group_by(app, users):
+    from database.db_funcs import get_session
+    from model.dbModels import CurrencyEnum, PaymentStatusEnum
+
+    owner, partner = users
+    with get_session() as db:
+        orders = [
+            make_order(owner if number % 2 else partner,
+                       partner if number % 2 else owner,
+                       number, datetime(2026, 1 + number % 12, 1),
+                       orderPrice=number % 97)
+            for number in range(21000, 21060)
+        ]
+        db.add_all(orders)
+        db.commit()
+
+        for index, order in enumerate(orders):
+            if index % 3 == 0:
+                order.orderCurrency = CurrencyEnum.usd
+                order.orderPrice += 1.25
+            elif index % 3 == 1:
+                order.paymentStatus = PaymentStatusEnum.pending
+                order.userId, order.partnerUser = (
+                    order.partnerUser, order.userId
+                )
+            if index % 7 == 0:
+                db.delete(order)
+        db.commit()
+
+        orders[1].orderPrice = 12345
+        db.flush()
+        db.rollback()
+
+        assert check_summaries(db) == []